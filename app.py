@@ -119,31 +119,40 @@ if selection == "Workout Planner":
             }
             
             try:
-                response = requests.post(f"{API_URL}/workout-planner/generate", json=payload)
-                if response.status_code == 200:
-                    data = response.json()
-                    if data.get("success", False):
-                        st.success("Workout plan generated successfully!")
-                        
-                        # Display the workout plan
-                        workout_plan = data.get("workout_plan", [])
+                # Stream the plan so each day's tab fills in as soon as it is ready
+                with requests.post(f"{API_URL}/workout-planner/generate/stream", json=payload, stream=True) as response:
+                    if response.status_code == 200:
+                        tabs = st.tabs(["Day 1", "Day 2", "Day 3"])
+                        placeholders = []
+                        for tab in tabs:
+                            with tab:
+                                placeholder = st.empty()
+                                placeholder.info("Generating...")
+                                placeholders.append(placeholder)
                         
-                        # Create tabs for each day
-                        if workout_plan:
-                            tabs = st.tabs([day["day"] for day in workout_plan])
+                        for line in response.iter_lines(decode_unicode=True):
+                            if not line:
+                                continue
+                            event = json.loads(line)
                             
-                            for i, day in enumerate(workout_plan):
-                                with tabs[i]:
+                            if event["type"] == "day":
+                                day = event["workout"]
+                                with placeholders[event["index"]].container():
                                     st.header(f"{day['day']} - {day['focus']}")
                                     
                                     # Display workout segments
                                     display_workout_segment(day["warm_up"], "Warm Up")
                                     display_workout_segment(day["main_routine"], "Main Routine")
                                     display_workout_segment(day["cool_down"], "Cool Down")
+                            elif event["type"] == "day_error":
+                                placeholders[event["index"]].error(f"Error: {event['error']}")
+                            elif event["type"] == "summary":
+                                if event["success"]:
+                                    st.success("Workout plan generated successfully!")
+                                else:
+                                    st.warning(f"Generated {event['days_completed']} of 3 days.")
                     else:
-                        st.error(f"Error: {data.get('error', 'Unknown error')}")
-                else:
-                    st.error(f"Error: {response.status_code} - {response.text}")
+                        st.error(f"Error: {response.status_code} - {response.text}")
             except Exception as e:
                 st.error(f"Error connecting to the API: {str(e)}")
 
@@ -151,9 +160,11 @@ elif selection == "AI Coach":
     st.title("AI Gym Coach")
     st.write("Chat with your personal AI gym coach for fitness advice and motivation.")
     
-    # Initialize chat history
+    # Initialize chat history; the API keeps the conversation context under coach_session_id
     if "messages" not in st.session_state:
         st.session_state.messages = []
+    if "coach_session_id" not in st.session_state:
+        st.session_state.coach_session_id = None
 
     # Display chat messages from history on app rerun
     for message in st.session_state.messages:
@@ -174,14 +185,26 @@ elif selection == "AI Coach":
             full_response = ""
             
             try:
-                with st.spinner("Coach is thinking..."):
-                    response = requests.post(
-                        f"{API_URL}/coach/chat",
-                        json={"message": prompt}
-                    )
-                    
+                # Stream tokens from the coach and render them as they arrive
+                with requests.post(
+                    f"{API_URL}/coach/chat/stream",
+                    json={"message": prompt, "session_id": st.session_state.coach_session_id},
+                    stream=True
+                ) as response:
                     if response.status_code == 200:
-                        full_response = response.json().get("response", "Sorry, I couldn't process your request.")
+                        for line in response.iter_lines(decode_unicode=True):
+                            if not line:
+                                continue
+                            event = json.loads(line)
+                            if event["type"] == "token":
+                                full_response += event["content"]
+                                message_placeholder.markdown(full_response + "▌")
+                            elif event["type"] == "done":
+                                st.session_state.coach_session_id = event["session_id"]
+                            elif event["type"] == "error":
+                                full_response = f"Error: {event['detail']}"
+                        if not full_response:
+                            full_response = "Sorry, I couldn't process your request."
                     else:
                         full_response = f"Error: {response.status_code} - {response.text}"
             except Exception as e:
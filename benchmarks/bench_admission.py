@@ -0,0 +1,87 @@
+"""
+Interactive latency under a burst of plan generations, with and without admission control.
+
+A burst of plan requests (several sequential completions each) and a steady stream of chat messages share one
+OpenAI connection pool against the stub upstream. Without admission control the plans take every connection
+and chats queue behind them in the pool; with it plans are capped to their lane and waiting chats go first.
+Prints p50/p95 latency per kind of request and how long the burst took to finish.
+
+Usage:
+    python -m benchmarks.bench_admission [--plans 60] [--chats 80] [--connections 16] [--latency fixed:0.2]
+"""
+import argparse
+import asyncio
+import time
+from contextlib import nullcontext
+from typing import Optional
+
+import httpx
+import numpy as np
+from openai import AsyncOpenAI
+
+from benchmarks.stub_upstream import start_stub_server
+from com.mhire.app.resilience.admission import AdmissionController
+
+_MESSAGES = [{"role": "user", "content": "How much protein should I eat?"}]
+
+
+async def run(client: AsyncOpenAI, controller: Optional[AdmissionController], args) -> dict:
+    latencies = {"chat": [], "plans": []}
+
+    async def request(lane: str, calls: int):
+        start = time.perf_counter()
+        async with controller.slot(lane) if controller else nullcontext():
+            for _ in range(calls):
+                await client.chat.completions.create(model="stub", messages=_MESSAGES)
+        latencies[lane].append(time.perf_counter() - start)
+
+    async def chat(i: int):
+        await asyncio.sleep(i * args.chat_interval)
+        await request("chat", 1)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(request("plans", args.plan_calls) for _ in range(args.plans)),
+                         *(chat(i) for i in range(args.chats)))
+    return {lane: np.percentile(values, [50, 95]) * 1000 for lane, values in latencies.items()} | {
+        "seconds": time.perf_counter() - start
+    }
+
+
+async def main(args):
+    http = httpx.AsyncClient(limits=httpx.Limits(max_connections=args.connections))
+    client = AsyncOpenAI(api_key="stub-key", base_url=f"http://127.0.0.1:{args.port}/v1", max_retries=0,
+                         http_client=http)
+    try:
+        for admission in (False, True):
+            controller = AdmissionController(
+                capacity=args.connections,
+                lane_limits={"chat": args.connections, "plans": args.connections // 2},
+                max_queued=args.plans + args.chats,
+                max_wait=600,
+                retry_after=1
+            ) if admission else None
+            result = await run(client, controller, args)
+            label = "admission" if admission else "no limits"
+            print(f"{label:<10} chat p50 {result['chat'][0]:6.0f} ms  p95 {result['chat'][1]:6.0f} ms  |  "
+                  f"plans p50 {result['plans'][0]:6.0f} ms  p95 {result['plans'][1]:6.0f} ms  |  "
+                  f"done in {result['seconds']:.1f}s")
+    finally:
+        await http.aclose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark chat latency during a plan burst with and without admission control")
+    parser.add_argument("--plans", type=int, default=60, help="Plan requests in the burst")
+    parser.add_argument("--plan-calls", type=int, default=4, help="Sequential completions per plan request")
+    parser.add_argument("--chats", type=int, default=80)
+    parser.add_argument("--chat-interval", type=float, default=0.05, help="Seconds between chat messages")
+    parser.add_argument("--connections", type=int, default=16, help="OpenAI connection pool size")
+    parser.add_argument("--latency", default="fixed:0.2", help="Stub latency spec")
+    parser.add_argument("--port", type=int, default=8790)
+    args = parser.parse_args()
+
+    server = start_stub_server(args.port, args.latency, seed=1)
+    try:
+        asyncio.run(main(args))
+    finally:
+        server.should_exit = True
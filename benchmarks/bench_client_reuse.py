@@ -0,0 +1,93 @@
+"""
+Benchmark pooled, shared upstream clients against per-request client construction.
+
+"per-request" mirrors the old WorkoutPlanner behaviour of building fresh OpenAI and
+Tavily clients for every plan; "shared" uses one ClientRegistry for the whole run.
+Each simulated request makes one chat completion and one search against the stub
+upstream. Against real HTTPS upstreams the gap widens further because every new
+connection also pays a TLS handshake.
+
+Usage:
+    python -m benchmarks.bench_client_reuse --requests 300 --concurrency 20
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+from benchmarks.stub_upstream import start_stub_server
+
+
+async def one_call(openai_client, tavily_client, model: str):
+    await openai_client.chat.completions.create(model=model, messages=[{"role": "user", "content": "hi"}])
+    await tavily_client.search(query="squat warm up exercises", max_results=5)
+
+
+async def run(mode: str, total: int, concurrency: int) -> dict:
+    from openai import AsyncOpenAI
+    from tavily import AsyncTavilyClient
+    from com.mhire.app.clients.clients import ClientRegistry
+    from com.mhire.app.config.config import Config
+
+    config = Config()
+    registry = ClientRegistry(config) if mode == "shared" else None
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def request():
+        async with semaphore:
+            start = time.perf_counter()
+            if registry is not None:
+                await one_call(registry.openai, registry.tavily, config.model_name)
+            else:
+                openai_client = AsyncOpenAI(api_key=config.openai_api_key, base_url=config.openai_base_url)
+                tavily_client = AsyncTavilyClient(api_key=config.tavily_api_key, api_base_url=config.tavily_base_url)
+                try:
+                    await one_call(openai_client, tavily_client, config.model_name)
+                finally:
+                    await openai_client.close()
+                    await tavily_client._client.aclose()
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(request() for _ in range(total)))
+    elapsed = time.perf_counter() - start
+    if registry is not None:
+        await registry.aclose()
+
+    latencies.sort()
+    return {
+        "mode": mode,
+        "throughput": total / elapsed,
+        "mean_ms": statistics.mean(latencies),
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1]
+    }
+
+
+async def main(args, stub_app):
+    print(f"{args.requests} requests, {args.concurrency} in flight, stub latency {args.latency * 1000:.0f} ms")
+    print(f"{'mode':>12} {'req/s':>8} {'mean ms':>9} {'p95 ms':>8} {'connections':>12}")
+    for mode in ("per-request", "shared"):
+        stub_app.state.peers.clear()
+        result = await run(mode, args.requests, args.concurrency)
+        print(f"{result['mode']:>12} {result['throughput']:>8.1f} {result['mean_ms']:>9.1f} "
+              f"{result['p95_ms']:>8.1f} {len(stub_app.state.peers):>12}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Connection reuse vs per-request client construction")
+    parser.add_argument("--latency", type=float, default=0.02, help="Stub upstream latency in seconds")
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--port", type=int, default=8766)
+    args = parser.parse_args()
+
+    server = start_stub_server(args.port, args.latency)
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{args.port}/v1"
+    os.environ["TAVILY_BASE_URL"] = f"http://127.0.0.1:{args.port}"
+    os.environ.setdefault("OPENAI_API_KEY", "stub-key")
+    os.environ.setdefault("TAVILY_API_KEY", "stub-key")
+    os.environ.setdefault("MODEL", "stub-model")
+
+    asyncio.run(main(args, server.config.app))
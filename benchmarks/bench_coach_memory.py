@@ -0,0 +1,90 @@
+"""
+Prompt size over a long AI Coach conversation: bounded session memory vs. resending the full history.
+
+Plays a scripted conversation against the local stub upstream (so summaries are "written" by the stub)
+and, for every turn, records the prompt tokens the coach sends. For comparison it also counts the tokens
+a naive client would send by replaying every previous turn. Summary calls are reported separately, since
+they are the price of keeping the chat prompt flat.
+
+Usage:
+    python -m benchmarks.bench_coach_memory [--turns 50] [--reply-words 120] [--port 8771]
+"""
+import argparse
+import asyncio
+import os
+
+QUESTIONS = [
+    "I'm 34, 82 kg and want to lose fat without losing muscle. Where do I start?",
+    "How many days a week should I lift with that goal?",
+    "My left knee hurts on squats. What can I do instead?",
+    "Is a 500 kcal deficit too aggressive for me?",
+    "What should my protein intake be?",
+    "Can I do cardio on lifting days?",
+    "I only have dumbbells at home on weekends, does that change anything?",
+    "How do I know if I'm recovering well enough?",
+    "What's a good breakfast before a morning session?",
+    "I plateaued on bench press, any ideas?",
+]
+
+
+async def run(args):
+    # Imported after the environment points the app at the stub
+    from com.mhire.app.clients.clients import ClientRegistry
+    from com.mhire.app.prompts.prompts import get_prompt
+    from com.mhire.app.prompts.token_budget import estimate_tokens, usage_tracker
+    from com.mhire.app.services.ai_coach.ai_coach import AICoach
+
+    clients = ClientRegistry()
+    coach = AICoach(clients)
+    session = coach.sessions.open()
+    system_tokens = estimate_tokens(get_prompt("ai_coach.system").text)
+    history = []
+    bounded_total = naive_total = 0
+
+    print(f"{'turn':>4} {'bounded':>9} {'naive':>9} {'kept turns':>11} {'summary tok':>12}")
+    for turn in range(1, args.turns + 1):
+        question = f"{QUESTIONS[(turn - 1) % len(QUESTIONS)]} (turn {turn})"
+        bounded = estimate_tokens(*(message.content for message in coach._build_messages(question, session)))
+        naive = system_tokens + sum(estimate_tokens(user, reply) for user, reply in history) + estimate_tokens(question)
+        bounded_total += bounded
+        naive_total += naive
+
+        reply = await coach.chat(question, session)
+        history.append((question, reply))
+        if not args.no_wait and session.compaction is not None:
+            await session.compaction
+
+        if turn == 1 or turn % 5 == 0:
+            print(f"{turn:>4} {bounded:>9} {naive:>9} {len(session.turns):>11} {estimate_tokens(session.summary):>12}")
+
+    summary_usage = usage_tracker.snapshot()["by_call"].get("ai_coach.summary", {"calls": 0, "prompt_tokens": 0})
+    print(f"\nchat prompt tokens over {args.turns} turns: bounded {bounded_total:,}, naive {naive_total:,} "
+          f"({bounded_total / naive_total:.0%})")
+    print(f"summary calls: {summary_usage['calls']} using {summary_usage['prompt_tokens']:,} prompt tokens; "
+          f"bounded total incl. summaries {(bounded_total + summary_usage['prompt_tokens']) / naive_total:.0%} of naive")
+    print(f"session stats: {coach.sessions.stats()}")
+    await clients.aclose()
+
+
+def main(args):
+    os.environ.setdefault("OPENAI_API_KEY", "stub")
+    os.environ.setdefault("MODEL", "stub-model")
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{args.port}/v1"
+
+    from benchmarks.stub_upstream import start_stub_server
+    reply = " ".join(["Focus on steady progress with compound lifts, enough protein and sleep."] * (args.reply_words // 12 or 1))
+    server = start_stub_server(args.port, args.latency, reply=reply)
+    try:
+        asyncio.run(run(args))
+    finally:
+        server.should_exit = True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark AI Coach prompt growth with session memory")
+    parser.add_argument("--turns", type=int, default=50)
+    parser.add_argument("--reply-words", type=int, default=120, help="Length of every stub coach reply")
+    parser.add_argument("--latency", type=float, default=0.01)
+    parser.add_argument("--port", type=int, default=8771)
+    parser.add_argument("--no-wait", action="store_true", help="Do not wait for summaries between turns")
+    main(parser.parse_args())
@@ -0,0 +1,119 @@
+"""
+Tune and measure the AI Coach semantic answer cache offline, without any model calls.
+
+The first phrasing of every intent in the labelled corpus is stored with the intent as its
+"answer"; the remaining phrasings and a set of unrelated or near-miss questions are then looked up.
+Each pair of opposite-meaning questions ("protein to lose weight" / "to gain weight", "is creatine safe" /
+"... for teenagers", "how much protein should I eat" / "how much protein is in an egg") is checked on its own:
+the first is stored and the second must miss.
+For each similarity threshold it reports:
+- hit rate on paraphrases (recall) and how many hits returned the right intent (precision)
+- false hits on unrelated questions
+- false hits on opposite-meaning pairs, with and without the mismatch guards (negation, direction, qualifier)
+Then it measures embedding and lookup latency with the index filled to capacity, and the index size.
+
+Usage:
+    python -m benchmarks.bench_coach_semantic_cache [--thresholds 0.5,0.6,0.7,0.8] [--capacity 5000]
+"""
+import argparse
+import json
+import os
+import random
+import re
+import time
+
+from com.mhire.app.services.ai_coach.coach_semantic_cache import CoachSemanticCache, embed
+
+CORPUS_PATH = os.path.join(os.path.dirname(__file__), "coach_paraphrase_corpus.json")
+
+
+def evaluate(corpus: dict, threshold: float, dim: int) -> dict:
+    cache = CoachSemanticCache(max_entries=len(corpus["intents"]), threshold=threshold, ttl=3600, dim=dim)
+    for intent, phrasings in corpus["intents"].items():
+        cache.store(phrasings[0], intent)
+
+    correct = wrong = paraphrases = 0
+    for intent, phrasings in corpus["intents"].items():
+        for phrasing in phrasings[1:]:
+            paraphrases += 1
+            answer = cache.lookup(phrasing).answer
+            if answer == intent:
+                correct += 1
+            elif answer is not None:
+                wrong += 1
+    false_hits = sum(cache.lookup(question).answer is not None for question in corpus["negatives"])
+
+    hits = correct + wrong + false_hits
+    return {
+        "recall": correct / paraphrases,
+        "precision": correct / hits if hits else 1.0,
+        "wrong_intent": wrong,
+        "false_hits": false_hits,
+        "negatives": len(corpus["negatives"]),
+        "opposite_hits": opposite_hits(corpus, threshold, dim),
+        "opposite_hits_unguarded": opposite_hits(corpus, threshold, dim, guarded=False)
+    }
+
+
+def opposite_hits(corpus: dict, threshold: float, dim: int, guarded: bool = True) -> int:
+    """How many opposite-meaning questions get the stored answer of their counterpart"""
+    hits = 0
+    for stored, asked in corpus["opposites"]:
+        if guarded:
+            cache = CoachSemanticCache(max_entries=1, threshold=threshold, ttl=3600, dim=dim)
+            cache.store(stored, "answer")
+            hits += cache.lookup(asked).answer is not None
+        else:
+            # Similarity and the numbers check alone, as before the mismatch guards
+            hits += float(embed(stored, dim) @ embed(asked, dim)) >= threshold and \
+                re.findall(r"\d+(?:\.\d+)?", stored) == re.findall(r"\d+(?:\.\d+)?", asked)
+    return hits
+
+
+def latency(corpus: dict, capacity: int, dim: int, lookups: int = 2000):
+    questions = [phrasing for phrasings in corpus["intents"].values() for phrasing in phrasings] + corpus["negatives"]
+    rng = random.Random(7)
+    cache = CoachSemanticCache(max_entries=capacity, threshold=0.8, ttl=3600, dim=dim)
+    # Fill the index with distinct synthetic variations so every slot is live
+    for i in range(capacity):
+        cache.store(f"{rng.choice(questions)} variant {i}", "answer")
+
+    start = time.perf_counter()
+    for i in range(lookups):
+        embed(questions[i % len(questions)], dim)
+    embed_us = (time.perf_counter() - start) / lookups * 1e6
+
+    start = time.perf_counter()
+    for i in range(lookups):
+        cache.lookup(questions[i % len(questions)])
+    lookup_us = (time.perf_counter() - start) / lookups * 1e6
+    return embed_us, lookup_us, cache._vectors.nbytes / 2 ** 20
+
+
+def main(args):
+    with open(CORPUS_PATH, "r", encoding="utf-8") as f:
+        corpus = json.load(f)
+    paraphrases = sum(len(phrasings) - 1 for phrasings in corpus["intents"].values())
+    opposites = len(corpus["opposites"])
+    print(f"{len(corpus['intents'])} intents, {paraphrases} paraphrases, {len(corpus['negatives'])} unrelated questions, "
+          f"{opposites} opposite-meaning pairs, dim={args.dim}\n")
+
+    print(f"{'threshold':>9} {'recall':>8} {'precision':>10} {'wrong intent':>13} {'false hits':>11} "
+          f"{'opposite hits':>14} {'unguarded':>10}")
+    for threshold in (float(value) for value in args.thresholds.split(",")):
+        result = evaluate(corpus, threshold, args.dim)
+        print(f"{threshold:>9.2f} {result['recall']:>8.1%} {result['precision']:>10.1%} {result['wrong_intent']:>13} "
+              f"{result['false_hits']:>8}/{result['negatives']} "
+              f"{result['opposite_hits'] / opposites:>14.1%} {result['opposite_hits_unguarded'] / opposites:>10.1%}")
+
+    embed_us, lookup_us, index_mib = latency(corpus, args.capacity, args.dim)
+    print(f"\nembed: {embed_us:.1f} us, lookup (embed + search of {args.capacity} entries): {lookup_us:.1f} us, "
+          f"index: {index_mib:.1f} MiB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the AI Coach semantic answer cache")
+    parser.add_argument("--thresholds", default="0.5,0.55,0.6,0.65,0.7,0.75,0.8,0.85")
+    parser.add_argument("--capacity", type=int, default=5000)
+    parser.add_argument("--dim", type=int, default=512)
+    main(parser.parse_args())
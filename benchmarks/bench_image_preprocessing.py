@@ -0,0 +1,102 @@
+"""
+Benchmark food-scanner image preprocessing: payload size and end-to-end latency.
+
+Runs every image in a folder through /food-scanner/analyze twice, with
+preprocessing disabled and enabled, against the stub upstream. The stub charges
+request size against a simulated upload bandwidth, so smaller payloads show up as
+lower latency the way they do against the real vision API.
+Without --images, a few synthetic 12 MP photos are generated.
+
+Usage:
+    python -m benchmarks.bench_image_preprocessing --images ./samples --bandwidth-mbps 20
+"""
+import argparse
+import asyncio
+import io
+import os
+import statistics
+import time
+from pathlib import Path
+
+import httpx
+import numpy as np
+from PIL import Image
+
+from benchmarks.stub_upstream import start_stub_server
+
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png", ".webp"}
+
+
+def load_images(folder: str) -> list:
+    if folder:
+        paths = sorted(p for p in Path(folder).iterdir() if p.suffix.lower() in IMAGE_SUFFIXES)
+        return [(p.name, p.read_bytes()) for p in paths]
+
+    # Synthetic camera-sized photos: smooth gradients plus sensor-like noise compress like real food shots
+    rng = np.random.default_rng(0)
+    images = []
+    for i in range(4):
+        gradient = np.linspace(0, 255, 4000, dtype=np.float32)[None, :, None]
+        pixels = np.clip(gradient * rng.uniform(0.3, 1.0, 3) + rng.normal(0, 12, (3000, 4000, 3)), 0, 255)
+        output = io.BytesIO()
+        Image.fromarray(pixels.astype(np.uint8)).save(output, format="JPEG", quality=95)
+        images.append((f"synthetic_{i}.jpg", output.getvalue()))
+    return images
+
+
+async def measure(client: httpx.AsyncClient, images: list) -> list:
+    from com.mhire.app.services.food_scanner.food_image_preprocessor import preprocess_image
+
+    results = []
+    for name, content in images:
+        processed, _ = await preprocess_image(content, "image/jpeg")
+        start = time.perf_counter()
+        await client.post("/food-scanner/analyze", files={"image": (name, content, "image/jpeg")})
+        results.append({
+            "name": name,
+            "bytes_in": len(content),
+            "bytes_out": len(processed),
+            "latency_ms": (time.perf_counter() - start) * 1000
+        })
+    return results
+
+
+async def main(args, images):
+    from com.mhire.app.config.config import Config
+    from com.mhire.app.main import app
+
+    config = Config()
+    async with app.router.lifespan_context(app), \
+            httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://testserver", timeout=300) as client:
+        config.image_preprocess_enabled = False
+        baseline = await measure(client, images)
+        config.image_preprocess_enabled = True
+        optimized = await measure(client, images)
+
+    print(f"{'image':<24} {'original KB':>12} {'sent KB':>9} {'before ms':>10} {'after ms':>9}")
+    for before, after in zip(baseline, optimized):
+        print(f"{before['name']:<24} {before['bytes_in'] / 1024:>12.0f} {after['bytes_out'] / 1024:>9.0f} "
+              f"{before['latency_ms']:>10.0f} {after['latency_ms']:>9.0f}")
+    total_in = sum(r["bytes_in"] for r in baseline)
+    total_out = sum(r["bytes_out"] for r in optimized)
+    print(f"payload reduction: {100 * (1 - total_out / total_in):.1f}%, "
+          f"median latency {statistics.median(r['latency_ms'] for r in baseline):.0f} ms -> "
+          f"{statistics.median(r['latency_ms'] for r in optimized):.0f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Image preprocessing payload and latency benchmark")
+    parser.add_argument("--images", help="Folder of sample food photos")
+    parser.add_argument("--latency", type=float, default=0.5, help="Stub vision latency in seconds")
+    parser.add_argument("--bandwidth-mbps", type=float, default=20, help="Simulated upload bandwidth")
+    parser.add_argument("--port", type=int, default=8767)
+    args = parser.parse_args()
+
+    start_stub_server(args.port, args.latency, args.bandwidth_mbps * 1_000_000 / 8)
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{args.port}/v1"
+    os.environ["TAVILY_BASE_URL"] = f"http://127.0.0.1:{args.port}"
+    os.environ.setdefault("OPENAI_API_KEY", "stub-key")
+    os.environ.setdefault("TAVILY_API_KEY", "stub-key")
+    os.environ.setdefault("MODEL", "stub-model")
+
+    asyncio.run(main(args, load_images(args.images)))
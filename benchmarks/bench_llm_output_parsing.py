@@ -0,0 +1,123 @@
+"""
+Compare the single-pass LLM output parser with the previous line parsers on a corpus of
+recorded model outputs, including malformed ones (markdown headings, numbered lists, CRLF,
+refusals, missing values).
+
+Reports, per format:
+- what each parser extracted from every corpus entry, marking entries where they differ
+- throughput (parses per second, best of several rounds); workout parses include building the
+  response segments, since the legacy parser constructs Exercise models itself
+- the legacy food parser raises ValueError when any macro is missing, which the scanner turned into an
+  error response; those entries are reported as rejected, where the single-pass parser leaves the gaps at 0
+  for the nutrition reference table to fill
+- memory allocated while parsing the corpus once (tracemalloc peak) and retained by the results; the
+  single-pass food figures include the results for entries the legacy parser rejects, and the item_details
+  list the nutrition reference lookup needs
+
+Usage:
+    python -m benchmarks.bench_llm_output_parsing [--rounds 5] [--iterations 2000]
+"""
+import argparse
+import json
+import logging
+import os
+import time
+import tracemalloc
+
+from benchmarks.legacy_parsers import LegacyFoodParser, LegacyWorkoutParser
+from com.mhire.app.parsing.llm_output_parser import parse_food_analysis, parse_workout_response
+from com.mhire.app.services.workout_planner.workout_planner_schema import WorkoutSegment
+
+CORPUS_PATH = os.path.join(os.path.dirname(__file__), "llm_output_corpus.json")
+
+
+def build_segments(segments: dict) -> dict:
+    """The response models the planner builds from parsed exercises"""
+    return {
+        segment: WorkoutSegment(motto="", exercises=exercises, duration="", video_url=None)
+        for segment, exercises in segments.items()
+    }
+
+
+def summarize_workout(segments: dict) -> str:
+    return " ".join(
+        f"{segment}={len(built.exercises)}" + ("(padded)" if built.exercises[0].name.startswith("Basic ") else "")
+        for segment, built in segments.items()
+    )
+
+
+def legacy_food(text: str):
+    """The legacy food parse, or None where it rejected the analysis"""
+    try:
+        return LegacyFoodParser()._parse_analysis(text)
+    except ValueError:
+        return None
+
+
+def summarize_food(result) -> str:
+    if result is None:
+        return "rejected (incomplete nutrition)"
+    return (f"items={len(result['food_items'])} kcal={result['calories']:g} p={result['protein']:g} "
+            f"c={result['carbs']:g} f={result['fat']:g} benefits={len(result['health_benefits'])} "
+            f"concerns={len(result['concerns'])}")
+
+
+def throughput(parse, texts, rounds: int, iterations: int) -> float:
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            for text in texts:
+                parse(text)
+        best = min(best, time.perf_counter() - start)
+    return iterations * len(texts) / best
+
+
+def allocations(parse, texts):
+    """KiB allocated at peak while parsing the corpus once, and KiB still held by the results"""
+    tracemalloc.start()
+    try:
+        results = [parse(text) for text in texts]
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del results
+    return peak / 1024, current / 1024
+
+
+def report(kind: str, legacy, current, summarize, cases, args):
+    print(f"\n== {kind} ({len(cases)} corpus entries)")
+    for case in cases:
+        before, after = summarize(legacy(case["text"])), summarize(current(case["text"]))
+        marker = "  " if before == after else "* "
+        print(f"{marker}{case['name']:<32} legacy: {before}")
+        if before != after:
+            print(f"  {'':<32} single-pass: {after}")
+
+    texts = [case["text"] for case in cases]
+    print(f"{'parser':<12} {'parses/s':>12} {'peak KiB':>10} {'kept KiB':>10}")
+    for name, parse in (("legacy", legacy), ("single-pass", current)):
+        rate = throughput(parse, texts, args.rounds, args.iterations)
+        peak, kept = allocations(parse, texts)
+        print(f"{name:<12} {rate:>12,.0f} {peak:>10.1f} {kept:>10.1f}")
+
+
+def main(args):
+    # The legacy parsers log every malformed line; keep the report readable
+    logging.disable(logging.WARNING)
+    with open(CORPUS_PATH, "r", encoding="utf-8") as f:
+        corpus = json.load(f)
+
+    legacy_workout = LegacyWorkoutParser()._parse_workout_response
+    report("workout plans", lambda text: build_segments(legacy_workout(text)),
+           lambda text: build_segments(parse_workout_response(text)), summarize_workout, corpus["workout"], args)
+    report("food analyses", legacy_food, parse_food_analysis,
+           summarize_food, corpus["food"], args)
+    print("\n* entries where the parsers extract different data")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark LLM output parsing")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--iterations", type=int, default=2000, help="Passes over the corpus per round")
+    main(parser.parse_args())
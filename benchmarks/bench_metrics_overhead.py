@@ -0,0 +1,72 @@
+"""
+Cost of the always-on metrics: a stage span, a histogram observation, the request middleware and a scrape.
+
+The middleware is measured by calling a trivial ASGI app directly, with and without MetricsMiddleware
+around it, so the difference is the per-request overhead the middleware adds.
+
+Usage:
+    python -m benchmarks.bench_metrics_overhead [--iterations 200000] [--requests 20000]
+"""
+import argparse
+import asyncio
+import time
+
+from com.mhire.app.metrics.metrics import Histogram, MetricsMiddleware, render_metrics, timed
+
+
+class _Route:
+    path = "/bench/{item_id}"
+
+
+async def _plain_app(scope, receive, send):
+    scope["route"] = _Route
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"ok"})
+
+
+async def _per_request_us(app, requests: int) -> float:
+    scope = {"type": "http", "method": "GET", "path": "/bench/1"}
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        pass
+
+    start = time.perf_counter()
+    for _ in range(requests):
+        await app(dict(scope), receive, send)
+    return (time.perf_counter() - start) / requests * 1e6
+
+
+def main(args):
+    histogram = Histogram("bench_seconds", "benchmark", ("stage",))
+    start = time.perf_counter()
+    for i in range(args.iterations):
+        histogram.observe(i % 1000 / 1000, stage="bench")
+    observe_us = (time.perf_counter() - start) / args.iterations * 1e6
+
+    start = time.perf_counter()
+    for _ in range(args.iterations):
+        with timed("bench.span"):
+            pass
+    span_us = (time.perf_counter() - start) / args.iterations * 1e6
+
+    plain_us = asyncio.run(_per_request_us(_plain_app, args.requests))
+    wrapped_us = asyncio.run(_per_request_us(MetricsMiddleware(_plain_app), args.requests))
+
+    start = time.perf_counter()
+    body = render_metrics()
+    render_ms = (time.perf_counter() - start) * 1000
+
+    print(f"histogram observe:   {observe_us:.2f} us")
+    print(f"timed() span:        {span_us:.2f} us")
+    print(f"request middleware:  {wrapped_us - plain_us:.2f} us per request ({plain_us:.2f} -> {wrapped_us:.2f} us)")
+    print(f"scrape:              {render_ms:.2f} ms for {len(body.splitlines())} lines")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the overhead of request and stage metrics")
+    parser.add_argument("--iterations", type=int, default=200000)
+    parser.add_argument("--requests", type=int, default=20000)
+    main(parser.parse_args())
@@ -0,0 +1,99 @@
+"""
+Tail latency and failure behaviour of UpstreamGuard against the stub upstream.
+
+Three runs of chat completions through a guard:
+  - heavy-tailed latency, without and with hedging: p50/p99 and the share of hedges that won
+  - an upstream failing at --error-rate: share of calls that still succeed thanks to the retries
+  - an upstream failing every call: how fast calls fail once the circuit is open
+
+Usage:
+    python -m benchmarks.bench_upstream_guard [--requests 400] [--concurrency 20] [--latency lognormal:0.1,2]
+"""
+import argparse
+import asyncio
+import time
+
+import numpy as np
+from openai import AsyncOpenAI
+
+from benchmarks.stub_upstream import start_stub_server
+from com.mhire.app.resilience.upstream import CircuitBreaker, UpstreamGuard
+
+_MESSAGES = [{"role": "user", "content": "How much protein should I eat?"}]
+
+
+def make_guard(name: str, hedge: bool = False, min_samples: int = 50) -> UpstreamGuard:
+    return UpstreamGuard(name, timeout=30, max_attempts=3, backoff_base=0.05, backoff_max=0.5,
+                         breaker=CircuitBreaker(name, failure_rate=0.5, window=50, min_calls=20, reset_timeout=30),
+                         hedge=hedge, hedge_min_samples=min_samples)
+
+
+async def run(guard: UpstreamGuard, client: AsyncOpenAI, requests: int, concurrency: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = 0
+
+    async def one():
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                await guard.call(
+                    lambda timeout: client.chat.completions.create(model="stub", messages=_MESSAGES, timeout=timeout),
+                    call="bench"
+                )
+            except Exception:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(one() for _ in range(requests)))
+    p50, p99 = np.percentile(latencies, [50, 99]) * 1000
+    return {"p50_ms": p50, "p99_ms": p99, "max_ms": max(latencies) * 1000, "errors": errors}
+
+
+async def main(args):
+    def client(port: int) -> AsyncOpenAI:
+        return AsyncOpenAI(api_key="stub-key", base_url=f"http://127.0.0.1:{port}/v1", max_retries=0)
+
+    slow = client(args.port)
+    for hedge in (False, True):
+        guard = make_guard("slow", hedge=hedge)
+        # Warm-up fills the latency window the hedge delay is taken from
+        await run(guard, slow, guard.hedge_min_samples, args.concurrency)
+        hedges_before, wins_before = guard.hedges, guard.hedge_wins
+        result = await run(guard, slow, args.requests, args.concurrency)
+        hedges, wins = guard.hedges - hedges_before, guard.hedge_wins - wins_before
+        label = "hedged" if hedge else "unhedged"
+        print(f"{label:<10} p50 {result['p50_ms']:7.0f} ms  p99 {result['p99_ms']:7.0f} ms  max {result['max_ms']:7.0f} ms"
+              + (f"  hedges {hedges / args.requests:.1%} of calls, {wins} won" if hedge else ""))
+
+    guard = make_guard("flaky")
+    result = await run(guard, client(args.port + 1), args.requests, args.concurrency)
+    print(f"flaky      {args.error_rate:.0%} upstream errors -> {result['errors'] / args.requests:.1%} failed calls "
+          f"after {guard.retries} retries")
+
+    guard = make_guard("down")
+    result = await run(guard, client(args.port + 2), args.requests, args.concurrency)
+    print(f"down       circuit {guard.breaker.state} after {guard.breaker.trips} trip(s), "
+          f"{guard.breaker.rejected} of {args.requests} calls failed fast, p50 {result['p50_ms']:.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark retries, hedging and circuit breaking against the stub upstream")
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--latency", default="lognormal:0.1,2", help="Stub latency spec for the hedging run")
+    parser.add_argument("--error-rate", type=float, default=0.2, help="Share of failing calls in the retry run")
+    parser.add_argument("--port", type=int, default=8780, help="First of three ports for the stub upstreams")
+    args = parser.parse_args()
+
+    servers = [
+        start_stub_server(args.port, args.latency, seed=1),
+        start_stub_server(args.port + 1, "fixed:0.05", error_rate=args.error_rate, seed=2),
+        start_stub_server(args.port + 2, "fixed:0.05", error_rate=1.0, seed=3)
+    ]
+    try:
+        asyncio.run(main(args))
+    finally:
+        for server in servers:
+            server.should_exit = True
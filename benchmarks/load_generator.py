@@ -0,0 +1,258 @@
+"""
+Replay a request mix against the Gym Coach API and report throughput, latency percentiles and errors per request type.
+
+A mix is a JSONL file with one request per line:
+    {"name": "coach_chat", "weight": 20, "path": "/coach/chat", "json": {...}}
+    {"name": "food_scan", "weight": 10, "path": "/food-scanner/analyze", "image": {"width": 1600, "height": 1200}}
+benchmarks/request_mix.jsonl is a hand-written mix. A file recorded from real traffic with REQUEST_RECORD_PATH has
+the same format. Uploads appear there only as "upload_bytes", and a synthetic photo of about that size is sent.
+Requests are drawn at random by weight (1 when missing). With --replay they are sent in file order instead, at the
+recorded times ("t", scaled by --speed).
+
+By default the API runs in-process against the local stub upstream (benchmarks/stub_upstream.py), so no credits
+are spent. --target sends requests to a running server instead, which should itself point at a stub started with
+`python -m benchmarks.stub_upstream`.
+
+Closed loop (--concurrency) keeps a fixed number of requests in flight. Open loop (--rate) sends Poisson arrivals
+at a fixed rate whatever the response times, and times every request from its scheduled start, so a stalled server
+shows up in the percentiles instead of slowing the load down.
+
+Usage:
+    python -m benchmarks.load_generator --requests 500 --concurrency 50
+    python -m benchmarks.load_generator --rate 20 --duration 60 --latency lognormal:0.8,4 --error-rate 0.02
+    python -m benchmarks.load_generator --mix recorded.jsonl --replay --speed 2 --target http://127.0.0.1:8000
+"""
+import argparse
+import asyncio
+import io
+import json
+import math
+import os
+import random
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+import httpx
+import numpy as np
+from PIL import Image
+
+DEFAULT_MIX = os.path.join(os.path.dirname(__file__), "request_mix.jsonl")
+# Typical phone photo compression, used to turn a recorded upload size into image dimensions
+_JPEG_BYTES_PER_PIXEL = 0.4
+
+_images: Dict[tuple, bytes] = {}
+
+
+def load_mix(path: str) -> List[dict]:
+    with open(path, "r", encoding="utf-8") as f:
+        entries = [json.loads(line) for line in f if line.strip()]
+    for entry in entries:
+        entry.setdefault("name", entry["path"])
+        entry.setdefault("method", "POST")
+        entry.setdefault("weight", 1)
+    return entries
+
+
+def synthetic_photo(width: int, height: int) -> bytes:
+    """A smooth gradient with noise, which compresses roughly like a real photo"""
+    key = (width, height)
+    if key not in _images:
+        rng = np.random.default_rng(width * 31 + height)
+        x = np.linspace(0, 255, width, dtype=np.float32)
+        y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+        pixels = np.stack([x + y * 0, y + x * 0, (x + y) / 2], axis=-1)
+        pixels += rng.normal(0, 12, pixels.shape)
+        buffer = io.BytesIO()
+        Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8)).save(buffer, "JPEG", quality=90)
+        _images[key] = buffer.getvalue()
+    return _images[key]
+
+
+def request_kwargs(entry: dict, no_cache: bool) -> dict:
+    kwargs = {"headers": dict(entry.get("headers", {}))}
+    if no_cache:
+        kwargs["headers"]["Cache-Control"] = "no-cache"
+    if "json" in entry:
+        kwargs["json"] = entry["json"]
+    elif "image" in entry or "upload_bytes" in entry:
+        if "image" in entry:
+            width, height = entry["image"]["width"], entry["image"]["height"]
+        else:
+            # 4:3 photo with about the recorded number of bytes
+            width = max(64, int(math.sqrt(entry["upload_bytes"] / _JPEG_BYTES_PER_PIXEL * 4 / 3)))
+            height = width * 3 // 4
+        field = "images" if entry["path"].endswith("-batch") else "image"
+        kwargs["files"] = [(field, ("meal.jpg", synthetic_photo(width, height), "image/jpeg"))]
+    return kwargs
+
+
+class Results:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.statuses: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+
+    def record(self, name: str, seconds: float, status: str, failed: bool):
+        self.latencies[name].append(seconds)
+        self.statuses[name][status] += 1
+        if failed:
+            self.errors[name] += 1
+
+    def report(self, elapsed: float) -> dict:
+        report = {}
+        names = sorted(self.latencies) + ["all"]
+        for name in names:
+            latencies = np.array(sum(self.latencies.values(), []) if name == "all" else self.latencies[name]) * 1000
+            errors = sum(self.errors.values()) if name == "all" else self.errors[name]
+            p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) if latencies.size else (0, 0, 0)
+            report[name] = {
+                "requests": int(latencies.size),
+                "errors": errors,
+                "error_rate": errors / latencies.size if latencies.size else 0.0,
+                "throughput": latencies.size / elapsed,
+                "p50_ms": float(p50),
+                "p95_ms": float(p95),
+                "p99_ms": float(p99),
+                "max_ms": float(latencies.max()) if latencies.size else 0.0,
+                "statuses": dict(self.statuses[name]) if name != "all" else None
+            }
+        return report
+
+
+async def send(client: httpx.AsyncClient, entry: dict, results: Results, no_cache: bool, scheduled: float):
+    """Send one request and record its latency from its scheduled start"""
+    try:
+        response = await client.request(entry["method"], entry["path"], **request_kwargs(entry, no_cache))
+        failed = response.status_code >= 400
+        if not failed and response.headers.get("content-type", "").startswith("application/json"):
+            # Some endpoints report failures in the body with a 200
+            body = response.json()
+            failed = isinstance(body, dict) and body.get("success") is False
+        status = str(response.status_code)
+    except httpx.HTTPError as e:
+        failed, status = True, type(e).__name__
+    results.record(entry["name"], time.perf_counter() - scheduled, status, failed)
+
+
+async def run_load(client: httpx.AsyncClient, mix: List[dict], args) -> dict:
+    rng = random.Random(args.seed)
+    weights = [entry["weight"] for entry in mix]
+    results = Results()
+    start = time.perf_counter()
+    deadline = start + args.duration if args.duration else None
+
+    def next_entries():
+        count = 0
+        while (args.requests is None or count < args.requests) and (deadline is None or time.perf_counter() < deadline):
+            if args.replay:
+                yield mix[count % len(mix)]
+            else:
+                yield rng.choices(mix, weights)[0]
+            count += 1
+
+    if args.rate or args.replay:
+        # Open loop: every request starts at its scheduled time however slow earlier ones are
+        in_flight = asyncio.Semaphore(args.max_in_flight)
+        tasks = []
+        scheduled = start
+        first_t = mix[0].get("t", 0)
+        for index, entry in enumerate(next_entries()):
+            if args.replay and "t" in entry:
+                cycle = index // len(mix) * (mix[-1].get("t", 0) - first_t + 1)
+                scheduled = start + (entry["t"] - first_t + cycle) / args.speed
+            elif args.rate:
+                scheduled += rng.expovariate(args.rate)
+            await asyncio.sleep(max(0.0, scheduled - time.perf_counter()))
+
+            async def limited(entry=entry, scheduled=scheduled):
+                async with in_flight:
+                    await send(client, entry, results, args.no_cache, scheduled)
+
+            tasks.append(asyncio.create_task(limited()))
+        await asyncio.gather(*tasks)
+    else:
+        entries = next_entries()
+
+        async def worker():
+            for entry in entries:
+                await send(client, entry, results, args.no_cache, time.perf_counter())
+
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+
+    return results.report(time.perf_counter() - start)
+
+
+def print_report(report: dict):
+    width = max(len(name) for name in report) + 1
+    print(f"{'request':<{width}} {'count':>6} {'req/s':>7} {'errors':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for name, row in report.items():
+        print(f"{name:<{width}} {row['requests']:>6} {row['throughput']:>7.1f} {row['error_rate']:>7.1%} "
+              f"{row['p50_ms']:>8.0f} {row['p95_ms']:>8.0f} {row['p99_ms']:>8.0f} {row['max_ms']:>8.0f}")
+
+
+async def main(args):
+    mix = load_mix(args.mix)
+    if args.requests is None and args.duration is None:
+        # One pass over a replayed file, otherwise a fixed sample
+        args.requests = len(mix) if args.replay else 200
+    if args.target:
+        async with httpx.AsyncClient(base_url=args.target, timeout=args.timeout) as client:
+            report = await run_load(client, mix, args)
+    else:
+        from com.mhire.app.main import app
+
+        # ASGITransport does not run lifespan events, so enter the app's lifespan explicitly
+        async with app.router.lifespan_context(app), \
+                httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://testserver",
+                                  timeout=args.timeout) as client:
+            report = await run_load(client, mix, args)
+
+    print_report(report)
+    if args.json_out:
+        with open(args.json_out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+def parse_args(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Replay a request mix against the Gym Coach API")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="JSONL request mix, hand-written or recorded")
+    parser.add_argument("--target", default=None, help="Base URL of a running API; in-process against the stub when omitted")
+    parser.add_argument("--requests", type=int, default=None,
+                        help="Stop after this many requests (default 200, or one pass with --replay)")
+    parser.add_argument("--duration", type=float, default=None, help="Stop sending after this many seconds")
+    parser.add_argument("--concurrency", type=int, default=20, help="Requests in flight (closed loop)")
+    parser.add_argument("--rate", type=float, default=None, help="Requests per second (open loop, Poisson arrivals)")
+    parser.add_argument("--max-in-flight", type=int, default=1000, help="Cap on open-loop requests in flight")
+    parser.add_argument("--replay", action="store_true", help="Send the mix in file order at its recorded times")
+    parser.add_argument("--speed", type=float, default=1.0, help="Replay speed-up factor")
+    parser.add_argument("--no-cache", action="store_true", help="Send Cache-Control: no-cache so plans are generated")
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json-out", default=None, help="Also write the report as JSON")
+    # In-process stub upstream
+    parser.add_argument("--port", type=int, default=8775)
+    parser.add_argument("--latency", default="lognormal:0.5,2", help="Stub chat completion latency spec")
+    parser.add_argument("--tavily-latency", default="lognormal:0.3,1", help="Stub search latency spec")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of stub upstream calls that fail")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    server = None
+    if not args.target:
+        from benchmarks.stub_upstream import start_stub_server
+
+        server = start_stub_server(args.port, args.latency, tavily_latency=args.tavily_latency,
+                                   error_rate=args.error_rate, seed=args.seed)
+        os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{args.port}/v1"
+        os.environ["TAVILY_BASE_URL"] = f"http://127.0.0.1:{args.port}"
+        os.environ.setdefault("OPENAI_API_KEY", "stub-key")
+        os.environ.setdefault("TAVILY_API_KEY", "stub-key")
+        os.environ.setdefault("MODEL", "stub-model")
+    try:
+        asyncio.run(main(args))
+    finally:
+        if server is not None:
+            server.should_exit = True
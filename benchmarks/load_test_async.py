@@ -0,0 +1,70 @@
+"""
+Load test showing that upstream calls no longer serialize on the event loop.
+
+Starts the stub upstream on a separate thread, points the app at it and fires
+batches of concurrent /coach/chat requests through one in-process app instance.
+With non-blocking clients throughput grows with the number of in-flight requests;
+with blocking clients it stays pinned at roughly 1 / latency.
+
+Usage:
+    python -m benchmarks.load_test_async --latency 0.2 --requests 200
+"""
+import argparse
+import asyncio
+import os
+import time
+
+import httpx
+
+from benchmarks.stub_upstream import start_stub_server
+
+
+async def run_level(client: httpx.AsyncClient, total: int, concurrency: int) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    errors = 0
+
+    async def one_request():
+        nonlocal errors
+        async with semaphore:
+            response = await client.post("/coach/chat", json={"message": "How much protein should I eat?"})
+            if response.status_code != 200:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one_request() for _ in range(total)))
+    elapsed = time.perf_counter() - start
+    return {"concurrency": concurrency, "elapsed": elapsed, "throughput": total / elapsed, "errors": errors}
+
+
+async def main(args):
+    from com.mhire.app.main import app
+
+    transport = httpx.ASGITransport(app=app)
+    # ASGITransport does not run lifespan events, so start the app's client registry explicitly
+    async with app.router.lifespan_context(app), \
+            httpx.AsyncClient(transport=transport, base_url="http://testserver", timeout=120) as client:
+        print(f"Upstream latency: {args.latency * 1000:.0f} ms, {args.requests} requests per level")
+        print(f"{'in-flight':>10} {'elapsed (s)':>12} {'req/s':>10} {'ideal req/s':>12} {'errors':>7}")
+        for concurrency in args.concurrency:
+            result = await run_level(client, args.requests, concurrency)
+            ideal = concurrency / args.latency
+            print(f"{result['concurrency']:>10} {result['elapsed']:>12.2f} {result['throughput']:>10.1f} "
+                  f"{ideal:>12.1f} {result['errors']:>7}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent throughput against a local stub upstream")
+    parser.add_argument("--latency", type=float, default=0.2, help="Stub upstream latency in seconds")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per concurrency level")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 50, 100])
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    start_stub_server(args.port, args.latency)
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{args.port}/v1"
+    os.environ["TAVILY_BASE_URL"] = f"http://127.0.0.1:{args.port}"
+    os.environ.setdefault("OPENAI_API_KEY", "stub-key")
+    os.environ.setdefault("TAVILY_API_KEY", "stub-key")
+    os.environ.setdefault("MODEL", "stub-model")
+
+    asyncio.run(main(args))
@@ -0,0 +1,118 @@
+"""
+Compare the original (v1) prompts with the current registry versions on a fixed profile set.
+
+Reports prompt tokens (tiktoken when its encoding is available locally, otherwise
+the ~4 chars/token estimate used for budgets) and render time per prompt. With
+--live each prompt is also sent to the configured OpenAI-compatible upstream
+(OPENAI_BASE_URL / OPENAI_API_KEY / MODEL) to measure latency and billed prompt tokens.
+
+Usage:
+    python -m benchmarks.prompt_token_report [--live]
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+from com.mhire.app.prompts.prompts import get_prompt, profile_values
+from com.mhire.app.prompts.token_budget import estimate_tokens
+from com.mhire.app.services.meal_planner.meal_planner import json_schema_response_format
+from com.mhire.app.services.meal_planner.meal_planner_schema import DailyMealPlan, UserProfile
+from com.mhire.app.services.meal_planner.nutrition_targets import compute_targets, target_prompt_values
+from com.mhire.app.services.workout_planner.workout_planner_schema import UserProfileRequest
+
+PROFILES = [
+    {"primary_goal": "Build muscle", "weight_kg": 82, "height_cm": 180, "is_meat_eater": True, "is_lactose_intolerant": False,
+     "allergies": [], "eating_style": "Balanced", "caffeine_consumption": "Regularly", "sugar_consumption": "Occasionally"},
+    {"primary_goal": "Lose weight", "weight_kg": 95, "height_cm": 172, "is_meat_eater": True, "is_lactose_intolerant": True,
+     "allergies": ["Peanuts"], "eating_style": "Keto", "caffeine_consumption": "Regularly", "sugar_consumption": "None"},
+    {"primary_goal": "Eat healthier", "weight_kg": 61, "height_cm": 165, "is_meat_eater": False, "is_lactose_intolerant": False,
+     "allergies": ["Shellfish", "Soy"], "eating_style": "Vegetarian", "caffeine_consumption": "None", "sugar_consumption": "Regularly"},
+    {"primary_goal": "Build muscle", "weight_kg": 70, "height_cm": 175, "is_meat_eater": False, "is_lactose_intolerant": True,
+     "allergies": [], "eating_style": "Vegan", "caffeine_consumption": "Occasionally", "sugar_consumption": "None"},
+]
+
+
+def token_counter():
+    try:
+        import tiktoken
+        encoding = tiktoken.get_encoding("o200k_base")
+        return lambda text: len(encoding.encode(text)), "tiktoken o200k_base"
+    except Exception:
+        return estimate_tokens, "estimate (chars / 4)"
+
+
+def prompt_cases(version):
+    """(case name, rendered prompt texts) for every prompt group and profile"""
+    meal_schema = json.dumps(json_schema_response_format(DailyMealPlan))
+    for profile_data in PROFILES:
+        meal_profile = UserProfile(**profile_data)
+        meal_values = {**profile_values(meal_profile), **target_prompt_values(compute_targets(meal_profile))}
+        workout_values = profile_values(UserProfileRequest(**profile_data))
+        yield "ai_coach.chat", [get_prompt("ai_coach.system", version).text, "How much protein should I eat per day?"]
+        yield "food_scanner.analyze", [get_prompt("food_scanner.system", version).text, get_prompt("food_scanner.user").text]
+        yield "workout_planner.daily", [
+            get_prompt("workout_planner.system").text,
+            get_prompt("workout_planner.daily", version).render(focus="Lower Body", day=2, **workout_values)
+        ]
+        if version == "v1":
+            yield "meal_planner.plan", [get_prompt("meal_planner.plan_json", "v1").render(**meal_values)]
+        else:
+            # Structured output sends the schema alongside a much shorter prompt
+            yield "meal_planner.plan", [get_prompt("meal_planner.plan").render(**meal_values), meal_schema]
+
+
+def render_time_us(version, repeats=200) -> float:
+    start = time.perf_counter()
+    for _ in range(repeats):
+        list(prompt_cases(version))
+    return (time.perf_counter() - start) / repeats / len(PROFILES) * 1e6
+
+
+async def live_latency(version) -> dict:
+    from com.mhire.app.clients.clients import ClientRegistry
+
+    registry = ClientRegistry()
+    results = {}
+    try:
+        for case, texts in prompt_cases(version):
+            start = time.perf_counter()
+            response = await registry.openai.chat.completions.create(
+                model=registry.config.model_name,
+                messages=[{"role": "user", "content": "\n".join(texts)}]
+            )
+            entry = results.setdefault(case, {"latency_ms": [], "prompt_tokens": []})
+            entry["latency_ms"].append((time.perf_counter() - start) * 1000)
+            entry["prompt_tokens"].append(getattr(response.usage, "prompt_tokens", 0))
+    finally:
+        await registry.aclose()
+    return results
+
+
+def main(args):
+    count, counter_name = token_counter()
+    totals = {}
+    for version in ("v1", "v2"):
+        for case, texts in prompt_cases(version):
+            totals.setdefault(case, {}).setdefault(version, []).append(sum(count(text) for text in texts))
+
+    print(f"Prompt tokens per call ({counter_name}), mean over {len(PROFILES)} profiles")
+    print(f"{'call':<24} {'before':>8} {'after':>8} {'saved':>7}")
+    for case, versions in totals.items():
+        before, after = statistics.mean(versions["v1"]), statistics.mean(versions["v2"])
+        print(f"{case:<24} {before:>8.0f} {after:>8.0f} {100 * (1 - after / before):>6.1f}%")
+    print(f"render time per profile: v1 {render_time_us('v1'):.1f} us, v2 {render_time_us('v2'):.1f} us")
+
+    if args.live:
+        print("\nLive upstream latency (mean ms / billed prompt tokens)")
+        before, after = asyncio.run(live_latency("v1")), asyncio.run(live_latency("v2"))
+        for case in before:
+            print(f"{case:<24} {statistics.mean(before[case]['latency_ms']):>8.0f} ms {statistics.mean(before[case]['prompt_tokens']):>6.0f} tok"
+                  f" -> {statistics.mean(after[case]['latency_ms']):>8.0f} ms {statistics.mean(after[case]['prompt_tokens']):>6.0f} tok")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Before/after prompt token report")
+    parser.add_argument("--live", action="store_true", help="Also call the configured upstream to measure latency")
+    main(parser.parse_args())
@@ -0,0 +1,364 @@
+"""
+Local stand-in for the OpenAI chat-completions (plain, streaming and vision) and Tavily search APIs.
+
+Every call is delayed by a latency drawn from a configurable distribution, and a share of calls can be
+failed, so benchmarks and load tests can exercise the Gym Coach API without spending real credits.
+Completions are canned replies in the formats the services parse, chosen from the prompt:
+- workout days (free-form and catalog-ID mode)
+- food analyses (full and identify-only)
+- meal plans and single-meal repairs that meet the targets stated in the prompt
+- coach replies and conversation summaries
+
+Run it on its own to serve a separately started API (set OPENAI_BASE_URL=http://127.0.0.1:8765/v1 and
+TAVILY_BASE_URL=http://127.0.0.1:8765 for the API):
+
+    python -m benchmarks.stub_upstream --port 8765 --latency lognormal:0.8,4 --tavily-latency 0.3 --error-rate 0.01
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+import uuid
+from typing import Optional, Union
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+STUB_REPLY = "Stay consistent and keep training!"
+
+WORKOUT_REPLY = """Warm-up:
+- Jumping Jacks | Light pace for 2 minutes
+- Arm Circles | 30 seconds in each direction
+Main Routine:
+- Push-ups | Sets: 3 | Reps: 12 | Rest: 60s | Keep a straight line from head to heels
+- Goblet Squat | Sets: 3 | Reps: 10 | Rest: 90s | Sit back and keep the chest up
+- Dumbbell Row | Sets: 3 | Reps: 10 | Rest: 60s | Pull the elbow towards the hip
+Cool-down:
+- Hamstring Stretch | Hold 30 seconds per side
+- Child's Pose | Breathe slowly for one minute"""
+
+# Totals match the nutrition reference table for these ingredients, so scans are not flagged as discrepancies
+FOOD_ANALYSIS_REPLY = """FOOD ITEMS AND INGREDIENTS:
+- Chicken rice bowl
+- Chicken breast
+- White rice
+- Broccoli
+
+TOTAL NUTRITIONAL VALUES:
+Calories: 490 kcal
+Protein: 53 g
+Carbohydrates: 51 g
+Fat: 7 g
+
+HEALTH BENEFITS:
+- High in lean protein
+- Fibre and vitamins from the broccoli
+
+DIETARY CONCERNS:
+- None"""
+
+FOOD_IDENTIFY_REPLY = """FOOD ITEMS AND INGREDIENTS:
+- chicken breast | 150 g
+- white rice | 160 g
+- broccoli | 90 g
+
+DIETARY CONCERNS:
+- None"""
+
+SUMMARY_REPLY = "- User wants to lose fat while keeping muscle\n- Coach suggested a moderate deficit and high protein"
+
+_CATALOG_OPTIONS = re.compile(r"^(Warm-up|Main Routine|Cool-down): (.*)$", re.MULTILINE)
+_CATALOG_COUNT = re.compile(r"^(warm_up|main_routine|cool_down): (\d+) IDs", re.MULTILINE)
+_DAILY_TARGETS = re.compile(r"(\d+) kcal, protein at least (\d+)g, carbs (\d+)g, fat (\d+)g")
+_MEAL_CALORIES = re.compile(r"breakfast (\d+), lunch (\d+), snack (\d+), dinner (\d+)")
+_REPAIR_TARGET = re.compile(r"replacement (\w+) of about (\d+) kcal with at least (\d+)g protein")
+_REPAIR_TYPE = re.compile(r"replacement (\w+)")
+
+# Used when the prompt carries no targets (older prompt versions)
+_DEFAULT_TARGETS = (2000, 150, 200, 67)
+_DEFAULT_MEAL_SHARES = {"breakfast": 0.25, "lunch": 0.35, "snack": 0.1, "dinner": 0.3}
+
+
+class LatencyModel:
+    """
+    Latency distribution parsed from a spec:
+    "0.2" or "fixed:0.2", "uniform:0.1,0.5", or "lognormal:MEDIAN,P99" for the long tail real upstreams have
+    """
+
+    def __init__(self, spec: Union[str, float]):
+        self.spec = str(spec)
+        kind, _, values = self.spec.partition(":") if ":" in self.spec else ("fixed", "", self.spec)
+        numbers = [float(value) for value in values.split(",")]
+        self.kind = kind
+        if kind == "fixed":
+            self.value = numbers[0]
+        elif kind == "uniform":
+            self.low, self.high = numbers
+        elif kind == "lognormal":
+            median, p99 = numbers
+            self.mu = math.log(median)
+            # The 99th percentile of a normal is 2.326 standard deviations above the median
+            self.sigma = math.log(p99 / median) / 2.326
+        else:
+            raise ValueError(f"Unknown latency distribution: {kind}")
+
+    def sample(self, rng: random.Random) -> float:
+        if self.kind == "fixed":
+            return self.value
+        if self.kind == "uniform":
+            return rng.uniform(self.low, self.high)
+        return rng.lognormvariate(self.mu, self.sigma)
+
+
+def estimate_prompt_tokens(body: dict) -> int:
+    """About 4 characters per token over the text of every message, like the API's own accounting"""
+    chars = 0
+    for message in body.get("messages", []):
+        content = message.get("content") or ""
+        if isinstance(content, list):
+            content = " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+        chars += len(content)
+    return math.ceil(chars / 4)
+
+
+def _meal(meal_type: str, calories: float, protein: float, carbs: float, fat: float) -> dict:
+    return {
+        "name": f"Stub {meal_type}",
+        "description": f"Balanced {meal_type} for load testing",
+        "calories": round(calories),
+        "protein": round(protein),
+        "carbs": round(carbs),
+        "fat": round(fat),
+        "rationale": "Fits the daily targets",
+        "preparation_steps": ["Prepare the ingredients", "Cook and serve"]
+    }
+
+
+def meal_plan_reply(prompt: str) -> str:
+    """A plan that meets the daily and per-meal targets stated in the prompt, so it passes local validation"""
+    targets = _DAILY_TARGETS.search(prompt)
+    calories, protein, carbs, fat = (float(value) for value in targets.groups()) if targets else _DEFAULT_TARGETS
+    per_meal = _MEAL_CALORIES.search(prompt)
+    if per_meal:
+        shares = {meal_type: float(value) / calories for meal_type, value in zip(_DEFAULT_MEAL_SHARES, per_meal.groups())}
+    else:
+        shares = _DEFAULT_MEAL_SHARES
+    return json.dumps({
+        meal_type: _meal(meal_type, calories * share, protein * share, carbs * share, fat * share)
+        for meal_type, share in shares.items()
+    })
+
+
+def meal_repair_reply(prompt: str) -> str:
+    target = _REPAIR_TARGET.search(prompt)
+    if target:
+        meal_type, calories, protein = target.group(1), float(target.group(2)), float(target.group(3))
+    else:
+        meal_type = (_REPAIR_TYPE.search(prompt) or [None, "meal"])[1]
+        calories, protein = 500.0, 35.0
+    # Split the energy not covered by protein between carbs and fat
+    remaining = max(calories - 4 * protein, 0)
+    return json.dumps(_meal(meal_type, calories, protein, remaining * 0.55 / 4, remaining * 0.45 / 9))
+
+
+def catalog_reply(prompt: str) -> str:
+    """The first offered IDs of every segment, as many as the prompt asks for"""
+    options = {label: [option.split("=")[0].strip() for option in ids.split(";")] for label, ids in _CATALOG_OPTIONS.findall(prompt)}
+    labels = {"warm_up": "Warm-up", "main_routine": "Main Routine", "cool_down": "Cool-down"}
+    return "\n".join(
+        f"{segment}: {', '.join(options.get(labels[segment], [])[:int(count)])}"
+        for segment, count in _CATALOG_COUNT.findall(prompt)
+    )
+
+
+def canned_reply(body: dict, reply: Optional[str] = None) -> str:
+    """The reply a real model would give to this request, in the format the calling service parses"""
+    messages = body.get("messages", [])
+    has_image = any(isinstance(message.get("content"), list) for message in messages)
+    text = "\n".join(
+        message["content"] if isinstance(message.get("content"), str)
+        else " ".join(part.get("text", "") for part in message.get("content") or [] if isinstance(part, dict))
+        for message in messages
+    )
+    if has_image:
+        return FOOD_IDENTIFY_REPLY if "Do not estimate calories" in text else FOOD_ANALYSIS_REPLY
+    if "Pick exercises for a" in text:
+        return catalog_reply(text)
+    if "workout for Day" in text:
+        return WORKOUT_REPLY
+    if "Create a replacement" in text:
+        return meal_repair_reply(text)
+    if "daily meal plan" in text:
+        return meal_plan_reply(text)
+    if "Update the running summary" in text:
+        return reply or SUMMARY_REPLY
+    return reply or STUB_REPLY
+
+
+async def stream_chunks(model: str, reply: str = STUB_REPLY, token_interval: float = 0.01,
+                        usage: Optional[dict] = None):
+    """Server-sent chat.completion.chunk events, one word at a time, plus a usage chunk when requested"""
+    completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+    words = reply.split(" ")
+    for i, word in enumerate(words):
+        chunk = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "delta": {"content": word if i == 0 else f" {word}"},
+                "finish_reason": None
+            }]
+        }
+        yield f"data: {json.dumps(chunk)}\n\n"
+        await asyncio.sleep(token_interval)
+    if usage is not None:
+        chunk = {"id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()),
+                 "model": model, "choices": [], "usage": usage}
+        yield f"data: {json.dumps(chunk)}\n\n"
+    yield "data: [DONE]\n\n"
+
+
+def create_stub_app(latency: Union[float, str, LatencyModel], upload_bytes_per_second: Optional[float] = None,
+                    reply: Optional[str] = None, tavily_latency: Union[float, str, LatencyModel, None] = None,
+                    error_rate: float = 0.0, error_status: int = 500, token_interval: float = 0.01,
+                    seed: Optional[int] = None) -> FastAPI:
+    """
+    latency (and tavily_latency, which defaults to it) is seconds or a LatencyModel spec;
+    upload_bytes_per_second, when set, adds request size / bandwidth to every chat completion;
+    reply, when set, replaces the canned coach and summary text; error_rate is the share of calls
+    answered with error_status instead
+    """
+    chat_latency = latency if isinstance(latency, LatencyModel) else LatencyModel(latency)
+    search_latency = chat_latency if tavily_latency is None else (
+        tavily_latency if isinstance(tavily_latency, LatencyModel) else LatencyModel(tavily_latency)
+    )
+    rng = random.Random(seed)
+
+    app = FastAPI(title="Stub Upstream")
+    # Distinct client (host, port) pairs seen, i.e. TCP connections opened against the stub
+    app.state.peers = set()
+    app.state.calls = {"chat": 0, "search": 0, "errors": 0}
+
+    @app.middleware("http")
+    async def track_connections(request: Request, call_next):
+        if request.client:
+            app.state.peers.add((request.client.host, request.client.port))
+        return await call_next(request)
+
+    def injected_error() -> Optional[JSONResponse]:
+        if error_rate <= 0 or rng.random() >= error_rate:
+            return None
+        app.state.calls["errors"] += 1
+        return JSONResponse(
+            status_code=error_status,
+            content={"error": {"message": "Injected upstream failure", "type": "server_error", "code": None}}
+        )
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        raw_body = await request.body()
+        body = json.loads(raw_body)
+        app.state.calls["chat"] += 1
+        upload_time = len(raw_body) / upload_bytes_per_second if upload_bytes_per_second else 0
+        await asyncio.sleep(chat_latency.sample(rng) + upload_time)
+        error = injected_error()
+        if error is not None:
+            return error
+
+        content = canned_reply(body, reply)
+        prompt_tokens = estimate_prompt_tokens(body)
+        completion_tokens = math.ceil(len(content) / 4)
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens
+        }
+        if body.get("stream"):
+            include_usage = (body.get("stream_options") or {}).get("include_usage")
+            return StreamingResponse(
+                stream_chunks(body.get("model", "stub-model"), content, token_interval, usage if include_usage else None),
+                media_type="text/event-stream"
+            )
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "stub-model"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop"
+            }],
+            "usage": usage
+        }
+
+    @app.post("/search")
+    async def search(request: Request):
+        body = await request.json()
+        app.state.calls["search"] += 1
+        delay = search_latency.sample(rng)
+        await asyncio.sleep(delay)
+        error = injected_error()
+        if error is not None:
+            return error
+        query = body.get("query", "")
+        # A stable, query-specific video id, so cached URLs differ between queries like real results
+        video_id = hashlib.sha1(query.encode("utf-8")).hexdigest()[:11]
+        return {
+            "query": query,
+            "results": [{
+                "title": "Exercise demonstration",
+                "url": f"https://www.youtube.com/watch?v={video_id}",
+                "content": "",
+                "score": 1.0
+            }],
+            "response_time": delay
+        }
+
+    return app
+
+
+def start_stub_server(port: int, latency: Union[float, str, LatencyModel], upload_bytes_per_second: Optional[float] = None,
+                      reply: Optional[str] = None, **options) -> uvicorn.Server:
+    """Run the stub upstream on its own thread and event loop; options are passed to create_stub_app"""
+    server = uvicorn.Server(uvicorn.Config(
+        create_stub_app(latency, upload_bytes_per_second, reply, **options),
+        host="127.0.0.1",
+        port=port,
+        log_level="warning"
+    ))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve a local stand-in for the OpenAI and Tavily APIs")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--latency", default="0.5", help='Chat completion latency, e.g. "0.5", "uniform:0.2,1" or "lognormal:0.8,4"')
+    parser.add_argument("--tavily-latency", default=None, help="Search latency spec (defaults to --latency)")
+    parser.add_argument("--token-interval", type=float, default=0.01, help="Seconds between streamed words")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of calls answered with --error-status")
+    parser.add_argument("--error-status", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    uvicorn.run(
+        create_stub_app(args.latency, tavily_latency=args.tavily_latency, error_rate=args.error_rate,
+                        error_status=args.error_status, token_interval=args.token_interval, seed=args.seed),
+        host=args.host,
+        port=args.port,
+        log_level="warning"
+    )
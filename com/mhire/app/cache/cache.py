@@ -0,0 +1,270 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from pydantic import BaseModel
+
+from com.mhire.app.config.config import Config
+from com.mhire.app.metrics.metrics import register_cache
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class SQLiteCache:
+    """
+    Key/value cache shared across processes through a SQLite file, with per-entry TTL and LRU eviction.
+    Reads are plain SELECTs: recency updates are batched and written with the next set() (or once
+    touch_batch of them have piled up), and expired rows are purged by set() too. Async code should use
+    aget()/aset(), which run the blocking SQLite calls in a worker thread instead of on the event loop.
+    """
+
+    def __init__(self, path: str, table: str = "cache", max_entries: int = 10000, default_ttl: float = 86400,
+                 touch_batch: int = 64):
+        self.path = path
+        self.table = table
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.touch_batch = touch_batch
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # key -> last read time, not yet written to accessed_at
+        self._touches: Dict[str, float] = {}
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=5)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_accessed_at ON {table} (accessed_at)")
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value for key, or None if it is missing or expired; blocks on SQLite"""
+        now = time.time()
+        try:
+            with self._lock:
+                row = self._conn.execute(
+                    f"SELECT value FROM {self.table} WHERE key = ? AND expires_at > ?", (key, now)
+                ).fetchone()
+                if row is None:
+                    self.misses += 1
+                    return None
+                self.hits += 1
+                self._touches[key] = now
+                if len(self._touches) >= self.touch_batch:
+                    self._flush_touches()
+            return json.loads(row[0])
+        except sqlite3.Error as e:
+            logger.warning(f"Cache read failed for {self.path}: {str(e)}")
+            self.misses += 1
+            return None
+
+    def _flush_touches(self):
+        # Called with the lock held; a lost batch only makes eviction slightly less accurate
+        touches, self._touches = self._touches, {}
+        if touches:
+            self._conn.executemany(
+                f"UPDATE {self.table} SET accessed_at = MAX(accessed_at, ?) WHERE key = ?",
+                [(accessed_at, key) for key, accessed_at in touches.items()]
+            )
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        """
+        Store a JSON-serializable value, dropping expired entries and evicting the least recently used ones
+        beyond max_entries; blocks on SQLite
+        """
+        now = time.time()
+        expires_at = now + (ttl if ttl is not None else self.default_ttl)
+        try:
+            with self._lock:
+                self._touches.pop(key, None)
+                self._flush_touches()
+                self._conn.execute(
+                    f"INSERT OR REPLACE INTO {self.table} (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                    (key, json.dumps(value), expires_at, now)
+                )
+                self._conn.execute(f"DELETE FROM {self.table} WHERE expires_at <= ?", (now,))
+                self._conn.execute(
+                    f"DELETE FROM {self.table} WHERE key IN ("
+                    f"SELECT key FROM {self.table} ORDER BY accessed_at ASC "
+                    f"LIMIT MAX((SELECT COUNT(*) FROM {self.table}) - ?, 0))",
+                    (self.max_entries,)
+                )
+        except sqlite3.Error as e:
+            logger.warning(f"Cache write failed for {self.path}: {str(e)}")
+
+    async def aget(self, key: str) -> Optional[Any]:
+        """get() in a worker thread, so a busy database file never stalls the event loop"""
+        return await asyncio.to_thread(self.get, key)
+
+    async def aset(self, key: str, value: Any, ttl: Optional[float] = None):
+        """set() in a worker thread"""
+        await asyncio.to_thread(self.set, key, value, ttl)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute(
+                f"SELECT COUNT(*) FROM {self.table} WHERE expires_at > ?", (time.time(),)
+            ).fetchone()[0]
+
+    def stats(self) -> dict:
+        """Hit/miss counters for this process plus the current number of live entries"""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "size": len(self)
+        }
+
+
+class MemoryCache:
+    """Bounded in-process LRU cache with per-entry TTL"""
+
+    def __init__(self, max_entries: int = 1024, default_ttl: float = 3600):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None or entry[1] <= time.time():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        expires_at = time.time() + (ttl if ttl is not None else self.default_ttl)
+        self._entries[key] = (value, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "size": len(self)
+        }
+
+
+class TieredCache:
+    """Memory LRU in front of an optional SQLite tier shared between worker processes"""
+
+    def __init__(self, memory: MemoryCache, disk: Optional[SQLiteCache] = None):
+        self.memory = memory
+        self.disk = disk
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        value = self.memory.get(key)
+        if value is None and self.disk is not None:
+            value = self.disk.get(key)
+            if value is not None:
+                self.memory.set(key, value)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        self.memory.set(key, value, ttl)
+        if self.disk is not None:
+            self.disk.set(key, value, ttl)
+
+    async def aget(self, key: str) -> Optional[Any]:
+        """get() with the disk tier read in a worker thread; memory hits never leave the event loop"""
+        value = self.memory.get(key)
+        if value is None and self.disk is not None:
+            value = await self.disk.aget(key)
+            if value is not None:
+                self.memory.set(key, value)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    async def aset(self, key: str, value: Any, ttl: Optional[float] = None):
+        self.memory.set(key, value, ttl)
+        if self.disk is not None:
+            await self.disk.aset(key, value, ttl)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "memory": self.memory.stats(),
+            "disk": self.disk.stats() if self.disk is not None else None
+        }
+
+
+def create_response_cache(name: str) -> TieredCache:
+    """Build a response cache from config; the disk tier is only enabled when RESPONSE_CACHE_PATH is set"""
+    config = Config()
+    memory = MemoryCache(
+        max_entries=config.response_cache_max_entries,
+        default_ttl=config.response_cache_ttl
+    )
+    disk = None
+    if config.response_cache_path:
+        disk = SQLiteCache(
+            path=config.response_cache_path,
+            table=name,
+            max_entries=config.response_cache_disk_max_entries,
+            default_ttl=config.response_cache_ttl
+        )
+    cache = TieredCache(memory, disk)
+    register_cache(name, lambda: (cache.hits, cache.misses))
+    return cache
+
+
+def _bucket(value: float, step: float) -> float:
+    return round(round(value / step) * step, 2) if step > 0 else value
+
+
+def profile_cache_key(profile: BaseModel) -> str:
+    """Hash a user profile after bucketing weight/height and normalizing allergies, so near-identical profiles share a key"""
+    config = Config()
+    data = profile.model_dump(mode="json")
+    data["weight_kg"] = _bucket(data["weight_kg"], config.cache_weight_step_kg)
+    data["height_cm"] = _bucket(data["height_cm"], config.cache_height_step_cm)
+    data["allergies"] = sorted({allergy.strip().lower() for allergy in data["allergies"] if allergy.strip()})
+    return hashlib.sha256(json.dumps(data, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def should_bypass_cache(cache_control: Optional[str]) -> bool:
+    """True when the client sent Cache-Control: no-cache (or no-store)"""
+    if not cache_control:
+        return False
+    directives = {d.strip().lower() for d in cache_control.split(",")}
+    return "no-cache" in directives or "no-store" in directives
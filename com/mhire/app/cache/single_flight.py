@@ -0,0 +1,87 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+from com.mhire.app.config.config import Config
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class _Flight:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key into one upstream call whose result (or exception)
+    every caller receives. The call runs as its own task, so a caller that disconnects does not cancel it
+    for the others; it is only cancelled once every caller has gone.
+    """
+
+    def __init__(self, name: str, enabled: bool = True):
+        self.name = name
+        self.enabled = enabled
+        self.originated = 0
+        self.coalesced = 0
+        self._flights: Dict[str, _Flight] = {}
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """Result of fn() for this key and whether it was shared with a call already in flight"""
+        if not self.enabled:
+            self.originated += 1
+            return await fn(), False
+
+        flight = self._flights.get(key)
+        shared = flight is not None
+        if shared:
+            self.coalesced += 1
+        else:
+            self.originated += 1
+            flight = _Flight(asyncio.ensure_future(fn()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda _: self._forget(key, flight))
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task), shared
+        except asyncio.CancelledError:
+            if not flight.task.done() and flight.waiters == 1:
+                logger.info(f"Cancelling {self.name} call abandoned by all of its callers")
+                flight.task.cancel()
+            raise
+        finally:
+            flight.waiters -= 1
+
+    def _forget(self, key: str, flight: _Flight):
+        # A later call may already have started a new flight under the same key
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+    def stats(self) -> dict:
+        calls = self.originated + self.coalesced
+        return {
+            "originated": self.originated,
+            "coalesced": self.coalesced,
+            "coalesced_rate": self.coalesced / calls if calls else 0.0,
+            "in_flight": len(self._flights)
+        }
+
+
+_groups: Dict[str, SingleFlight] = {}
+
+
+def create_single_flight(name: str) -> SingleFlight:
+    """A named coalescing group, enabled unless SINGLE_FLIGHT_ENABLED=false; its counters appear in single_flight_stats()"""
+    group = SingleFlight(name, enabled=Config().single_flight_enabled)
+    _groups[name] = group
+    return group
+
+
+def single_flight_stats() -> dict:
+    return {name: group.stats() for name, group in _groups.items()}
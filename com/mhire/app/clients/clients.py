@@ -0,0 +1,99 @@
+import logging
+from typing import Dict, Optional
+
+import httpx
+from langchain_openai import ChatOpenAI
+from openai import AsyncOpenAI
+from tavily import AsyncTavilyClient
+
+from com.mhire.app.config.config import Config
+from com.mhire.app.resilience.token_limiter import get_token_limiter
+from com.mhire.app.resilience.upstream import create_upstream_guard
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class ClientRegistry:
+    """Holds one keep-alive connection pool per upstream, shared by every service"""
+
+    def __init__(self, config: Optional[Config] = None):
+        config = config or Config()
+        self.config = config
+
+        self.openai_http = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=config.openai_max_connections,
+                max_keepalive_connections=config.openai_max_keepalive,
+                keepalive_expiry=config.http_keepalive_expiry
+            ),
+            timeout=httpx.Timeout(config.openai_timeout, connect=config.http_connect_timeout)
+        )
+        self.openai = AsyncOpenAI(
+            api_key=config.openai_api_key,
+            base_url=config.openai_base_url,
+            timeout=config.openai_timeout,
+            # Retries happen in openai_guard, where they also count towards the circuit breaker
+            max_retries=0,
+            http_client=self.openai_http
+        )
+
+        self.tavily_http = httpx.AsyncClient(
+            base_url=config.tavily_base_url or "https://api.tavily.com",
+            limits=httpx.Limits(
+                max_connections=config.tavily_max_connections,
+                max_keepalive_connections=config.tavily_max_keepalive,
+                keepalive_expiry=config.http_keepalive_expiry
+            ),
+            timeout=httpx.Timeout(config.tavily_timeout, connect=config.http_connect_timeout)
+        )
+        self.tavily = AsyncTavilyClient(api_key=config.tavily_api_key, client=self.tavily_http)
+        self.tavily_timeout = config.tavily_timeout
+
+        # Timeouts, retries, circuit breaking and hedging for every call made through the clients above; OpenAI
+        # calls also draw from the process-wide tokens-per-minute limiter
+        self.openai_guard = create_upstream_guard("openai", config.openai_timeout, limiter=get_token_limiter())
+        self.tavily_guard = create_upstream_guard("tavily", config.tavily_timeout)
+
+        self._chat_llms: Dict[float, ChatOpenAI] = {}
+        logger.info("Initialized shared upstream client registry")
+
+    def chat_llm(self, temperature: float = 1) -> ChatOpenAI:
+        """LangChain chat model whose async calls go through the shared OpenAI pool, one per temperature"""
+        if temperature not in self._chat_llms:
+            self._chat_llms[temperature] = ChatOpenAI(
+                openai_api_key=self.config.openai_api_key,
+                model=self.config.model_name,
+                temperature=temperature,
+                base_url=self.config.openai_base_url,
+                timeout=self.config.openai_timeout,
+                stream_usage=True,
+                root_async_client=self.openai,
+                async_client=self.openai.chat.completions
+            )
+        return self._chat_llms[temperature]
+
+    async def aclose(self):
+        await self.openai_http.aclose()
+        await self.tavily_http.aclose()
+        logger.info("Closed shared upstream client registry")
+
+
+_registry: Optional[ClientRegistry] = None
+
+
+def get_client_registry() -> ClientRegistry:
+    """Return the process-wide client registry, creating it on first use"""
+    global _registry
+    if _registry is None:
+        _registry = ClientRegistry()
+    return _registry
+
+
+async def close_client_registry():
+    """Close the pooled connections; called from the FastAPI lifespan on shutdown"""
+    global _registry
+    if _registry is not None:
+        await _registry.aclose()
+        _registry = None
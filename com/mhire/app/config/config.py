@@ -3,6 +3,11 @@ from dotenv import load_dotenv
             
 load_dotenv()
 
+def _parse_mapping(value):
+    """Parse "name=value,name=value" settings into a dict"""
+    pairs = [item.split("=", 1) for item in (value or "").split(",") if "=" in item]
+    return {key.strip(): val.strip() for key, val in pairs}
+
 class Config:
     _instance = None
 
@@ -12,5 +17,132 @@ class Config:
             cls._instance.openai_api_key = os.getenv("OPENAI_API_KEY")
             cls._instance.model_name = os.getenv("MODEL")
             cls._instance.tavily_api_key = os.getenv("TAVILY_API_KEY")
+            # Optional upstream overrides (e.g. a local stub server for load testing)
+            cls._instance.openai_base_url = os.getenv("OPENAI_BASE_URL")
+            cls._instance.tavily_base_url = os.getenv("TAVILY_BASE_URL")
+            # Connection pools and timeouts per upstream
+            cls._instance.openai_max_connections = int(os.getenv("OPENAI_MAX_CONNECTIONS", "200"))
+            cls._instance.openai_max_keepalive = int(os.getenv("OPENAI_MAX_KEEPALIVE", "50"))
+            cls._instance.openai_timeout = float(os.getenv("OPENAI_TIMEOUT", "60"))
+            cls._instance.tavily_max_connections = int(os.getenv("TAVILY_MAX_CONNECTIONS", "50"))
+            cls._instance.tavily_max_keepalive = int(os.getenv("TAVILY_MAX_KEEPALIVE", "20"))
+            cls._instance.tavily_timeout = float(os.getenv("TAVILY_TIMEOUT", "30"))
+            cls._instance.http_connect_timeout = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+            cls._instance.http_keepalive_expiry = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+            # Max upstream calls a single workout plan may have in flight
+            cls._instance.workout_max_concurrency = int(os.getenv("WORKOUT_MAX_CONCURRENCY", "12"))
+            # Persistent exercise video lookup cache
+            cls._instance.video_cache_path = os.getenv("VIDEO_CACHE_PATH", "cache/video_cache.sqlite3")
+            cls._instance.video_cache_ttl = float(os.getenv("VIDEO_CACHE_TTL", str(7 * 24 * 3600)))
+            cls._instance.video_cache_max_entries = int(os.getenv("VIDEO_CACHE_MAX_ENTRIES", "1000"))
+            # Queries Tavily found no video for are remembered this long, so they are not searched on every plan
+            cls._instance.video_cache_miss_ttl = float(os.getenv("VIDEO_CACHE_MISS_TTL", "3600"))
+            # Food scanner image preprocessing
+            cls._instance.image_preprocess_enabled = os.getenv("IMAGE_PREPROCESS_ENABLED", "true").lower() == "true"
+            cls._instance.image_max_edge = int(os.getenv("IMAGE_MAX_EDGE", "1024"))
+            cls._instance.image_format = os.getenv("IMAGE_FORMAT", "JPEG")
+            cls._instance.image_quality = int(os.getenv("IMAGE_QUALITY", "85"))
+            cls._instance.image_workers = int(os.getenv("IMAGE_WORKERS", "4"))
+            # Food scan dedupe cache (perceptual mode also matches re-compressed copies of a photo)
+            cls._instance.food_scan_cache_max_entries = int(os.getenv("FOOD_SCAN_CACHE_MAX_ENTRIES", "2048"))
+            cls._instance.food_scan_cache_ttl = float(os.getenv("FOOD_SCAN_CACHE_TTL", "86400"))
+            cls._instance.food_scan_perceptual_dedupe = os.getenv("FOOD_SCAN_PERCEPTUAL_DEDUPE", "false").lower() == "true"
+            cls._instance.food_scan_hamming_threshold = int(os.getenv("FOOD_SCAN_HAMMING_THRESHOLD", "4"))
+            # Batch food scanning
+            cls._instance.food_scan_batch_max_images = int(os.getenv("FOOD_SCAN_BATCH_MAX_IMAGES", "20"))
+            cls._instance.food_scan_batch_concurrency = int(os.getenv("FOOD_SCAN_BATCH_CONCURRENCY", "4"))
+            # "full" asks the model for totals, "identify" only for items and portions and takes macros from the
+            # bundled nutrition table; totals further than the tolerance (a fraction) from the table are flagged
+            cls._instance.food_scan_mode = os.getenv("FOOD_SCAN_MODE", "full").lower()
+            cls._instance.food_scan_discrepancy_tolerance = float(os.getenv("FOOD_SCAN_DISCREPANCY_TOLERANCE", "0.35"))
+            # Meal planner native JSON-schema output (disable for models without structured outputs)
+            cls._instance.meal_planner_structured_output = os.getenv("MEAL_PLANNER_STRUCTURED_OUTPUT", "true").lower() == "true"
+            # Workout content source: "llm" writes exercises freely, "catalog" has the LLM pick exercise
+            # catalog IDs, "local" builds plans from the catalog without any LLM call
+            cls._instance.workout_plan_mode = os.getenv("WORKOUT_PLAN_MODE", "llm").lower()
+            # Check meal plans against the locally computed calorie/macro targets (tolerance is a fraction); meals
+            # that miss are repaired or have their portions scaled, and what still misses is listed in target_misses
+            cls._instance.meal_plan_validation = os.getenv("MEAL_PLAN_VALIDATION", "true").lower() == "true"
+            cls._instance.meal_plan_target_tolerance = float(os.getenv("MEAL_PLAN_TARGET_TOLERANCE", "0.15"))
+            # Prompt registry version pins and token budgets
+            cls._instance.prompt_versions = _parse_mapping(os.getenv("PROMPT_VERSIONS"))
+            cls._instance.prompt_token_budget = int(os.getenv("PROMPT_TOKEN_BUDGET", "3000"))
+            cls._instance.completion_token_budgets = {
+                call: int(limit) for call, limit in _parse_mapping(os.getenv("COMPLETION_TOKEN_BUDGETS")).items()
+            }
+            # AI Coach semantic answer cache: a message whose hashed embedding has at least the threshold cosine
+            # similarity to a stored one, and the same numbers, negation, direction and narrowing qualifiers (age group,
+            # injury, condition), gets its answer; a sampled share of hits is re-answered to estimate precision
+            cls._instance.coach_semantic_cache_enabled = os.getenv("COACH_SEMANTIC_CACHE_ENABLED", "false").lower() == "true"
+            cls._instance.coach_semantic_cache_threshold = float(os.getenv("COACH_SEMANTIC_CACHE_THRESHOLD", "0.6"))
+            cls._instance.coach_semantic_cache_max_entries = int(os.getenv("COACH_SEMANTIC_CACHE_MAX_ENTRIES", "5000"))
+            cls._instance.coach_semantic_cache_ttl = float(os.getenv("COACH_SEMANTIC_CACHE_TTL", "86400"))
+            cls._instance.coach_semantic_cache_dim = int(os.getenv("COACH_SEMANTIC_CACHE_DIM", "512"))
+            cls._instance.coach_semantic_cache_verify_rate = float(os.getenv("COACH_SEMANTIC_CACHE_VERIFY_RATE", "0"))
+            # AI Coach conversation sessions: recent turns are kept verbatim up to the token cap and turn limit, older
+            # ones are rolled into a running summary; idle sessions expire and the oldest go when over the memory budget
+            cls._instance.coach_session_max_turns = int(os.getenv("COACH_SESSION_MAX_TURNS", "12"))
+            cls._instance.coach_history_token_cap = int(os.getenv("COACH_HISTORY_TOKEN_CAP", "1200"))
+            cls._instance.coach_summary_token_cap = int(os.getenv("COACH_SUMMARY_TOKEN_CAP", "250"))
+            cls._instance.coach_session_memory_budget_mb = float(os.getenv("COACH_SESSION_MEMORY_BUDGET_MB", "64"))
+            cls._instance.coach_session_idle_ttl = float(os.getenv("COACH_SESSION_IDLE_TTL", "3600"))
+            # Background plan generation jobs: workers and queue bound per job type, finished jobs kept for polling
+            cls._instance.job_workers = int(os.getenv("JOB_WORKERS", "4"))
+            cls._instance.job_max_queued = int(os.getenv("JOB_MAX_QUEUED", "200"))
+            cls._instance.job_result_ttl = float(os.getenv("JOB_RESULT_TTL", "3600"))
+            cls._instance.job_max_retained = int(os.getenv("JOB_MAX_RETAINED", "5000"))
+            cls._instance.job_max_wait = float(os.getenv("JOB_MAX_WAIT", "30"))
+            # Plan requests answered with a template plan once generation would miss the deadline (seconds, 0 = none);
+            # the reserve is kept back for building the template and sending the response
+            cls._instance.workout_plan_deadline = float(os.getenv("WORKOUT_PLAN_DEADLINE", "45"))
+            cls._instance.meal_plan_deadline = float(os.getenv("MEAL_PLAN_DEADLINE", "30"))
+            cls._instance.deadline_reserve = float(os.getenv("DEADLINE_RESERVE", "0.25"))
+            # OpenAI/Tavily calls: attempts per call (timeouts, connection errors, 429 and 5xx are retried with jittered
+            # exponential backoff); an upstream's circuit opens for the reset timeout once the failure rate over its
+            # last CIRCUIT_WINDOW calls (at least CIRCUIT_MIN_CALLS of them) reaches CIRCUIT_FAILURE_RATE
+            cls._instance.upstream_max_attempts = int(os.getenv("UPSTREAM_MAX_ATTEMPTS", "3"))
+            cls._instance.upstream_backoff_base = float(os.getenv("UPSTREAM_BACKOFF_BASE", "0.2"))
+            cls._instance.upstream_backoff_max = float(os.getenv("UPSTREAM_BACKOFF_MAX", "2"))
+            cls._instance.circuit_failure_rate = float(os.getenv("CIRCUIT_FAILURE_RATE", "0.5"))
+            cls._instance.circuit_window = int(os.getenv("CIRCUIT_WINDOW", "50"))
+            cls._instance.circuit_min_calls = int(os.getenv("CIRCUIT_MIN_CALLS", "20"))
+            cls._instance.circuit_reset_timeout = float(os.getenv("CIRCUIT_RESET_TIMEOUT", "30"))
+            # Upstreams ("openai,tavily") that get a second request once the first has run past the quantile of
+            # recent latencies for its call type; off by default since a hedged LLM call can be billed twice
+            cls._instance.upstream_hedge = {name.strip() for name in os.getenv("UPSTREAM_HEDGE", "").split(",") if name.strip()}
+            cls._instance.hedge_quantile = float(os.getenv("HEDGE_QUANTILE", "0.95"))
+            cls._instance.hedge_min_delay = float(os.getenv("HEDGE_MIN_DELAY", "0.05"))
+            cls._instance.hedge_min_samples = int(os.getenv("HEDGE_MIN_SAMPLES", "20"))
+            # Admission control for the POST routes that call the upstreams: at most ADMISSION_MAX_CONCURRENCY run at
+            # once, each lane (chat, scan, plans, jobs) within its own limit (lanes left out only get the overall cap);
+            # up to ADMISSION_MAX_QUEUED more wait in priority order (chat first) for up to ADMISSION_MAX_WAIT seconds
+            # before a 503 with Retry-After
+            cls._instance.admission_enabled = os.getenv("ADMISSION_ENABLED", "true").lower() == "true"
+            cls._instance.admission_max_concurrency = int(os.getenv("ADMISSION_MAX_CONCURRENCY", "64"))
+            cls._instance.admission_lane_limits = {
+                lane: int(limit)
+                for lane, limit in _parse_mapping(os.getenv("ADMISSION_LANE_LIMITS", "chat=48,scan=16,plans=12,jobs=8")).items()
+            }
+            cls._instance.admission_max_queued = int(os.getenv("ADMISSION_MAX_QUEUED", "100"))
+            cls._instance.admission_max_wait = float(os.getenv("ADMISSION_MAX_WAIT", "5"))
+            cls._instance.admission_retry_after = float(os.getenv("ADMISSION_RETRY_AFTER", "2"))
+            # Tokens per minute shared by every OpenAI call in the process; set to the account's quota (0 = unlimited).
+            # Requests are turned away at admission once calls would wait more than OPENAI_TPM_MAX_WAIT seconds for
+            # tokens; calls without a completion budget are expected to use COMPLETION_TOKEN_ESTIMATE tokens
+            cls._instance.openai_tokens_per_minute = float(os.getenv("OPENAI_TOKENS_PER_MINUTE", "0"))
+            cls._instance.openai_tpm_max_wait = float(os.getenv("OPENAI_TPM_MAX_WAIT", "10"))
+            cls._instance.completion_token_estimate = int(os.getenv("COMPLETION_TOKEN_ESTIMATE", "600"))
+            # Append a sample of POST requests to a JSONL file for replay by the load generator (off unless a path is set)
+            cls._instance.request_record_path = os.getenv("REQUEST_RECORD_PATH")
+            cls._instance.request_record_sample_rate = float(os.getenv("REQUEST_RECORD_SAMPLE_RATE", "1.0"))
+            # Share one upstream call between concurrent identical plan/chat requests
+            cls._instance.single_flight_enabled = os.getenv("SINGLE_FLIGHT_ENABLED", "true").lower() == "true"
+            # Profile-keyed response cache for generated plans (disk tier only when a path is set)
+            cls._instance.response_cache_ttl = float(os.getenv("RESPONSE_CACHE_TTL", "3600"))
+            cls._instance.response_cache_max_entries = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1024"))
+            cls._instance.response_cache_path = os.getenv("RESPONSE_CACHE_PATH")
+            cls._instance.response_cache_disk_max_entries = int(os.getenv("RESPONSE_CACHE_DISK_MAX_ENTRIES", "20000"))
+            cls._instance.cache_weight_step_kg = float(os.getenv("CACHE_WEIGHT_STEP_KG", "2.5"))
+            cls._instance.cache_height_step_cm = float(os.getenv("CACHE_HEIGHT_STEP_CM", "5"))
 
-        return cls._instance
\ No newline at end of file
+        return cls._instance
@@ -0,0 +1,269 @@
+import asyncio
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import nullcontext
+from enum import Enum
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from com.mhire.app.config.config import Config
+from com.mhire.app.metrics.metrics import observe_stage
+from com.mhire.app.resilience.admission import AdmissionController, get_admission_controller
+from com.mhire.app.resilience.token_limiter import yield_tokens
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class JobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+FINISHED = (JobStatus.SUCCEEDED, JobStatus.FAILED, JobStatus.CANCELLED)
+
+
+class QueueFullError(RuntimeError):
+    pass
+
+
+class IdempotencyConflictError(ValueError):
+    pass
+
+
+class Job:
+    """One submitted generation; every change bumps `version` and wakes long-polling readers"""
+
+    def __init__(self, kind: str, run: Callable[["Job"], Awaitable[Any]], fingerprint: str,
+                 idempotency_key: Optional[str] = None):
+        self.job_id = uuid.uuid4().hex
+        self.kind = kind
+        self.run = run
+        self.fingerprint = fingerprint
+        self.idempotency_key = idempotency_key
+        self.status = JobStatus.QUEUED
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.completed_steps = 0
+        self.total_steps: Optional[int] = None
+        self.partial_results: List[Any] = []
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.version = 0
+        self.task: Optional[asyncio.Task] = None
+        self._changed = asyncio.Event()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED
+
+    def _touch(self):
+        self.version += 1
+        # Wake everyone waiting on the previous version, then start a fresh event for the next change
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def set_progress(self, completed: int, total: Optional[int] = None):
+        self.completed_steps = completed
+        if total is not None:
+            self.total_steps = total
+        self._touch()
+
+    def add_partial(self, item: Any):
+        """Publish one finished piece of the result (e.g. a workout day) before the whole job is done"""
+        self.partial_results.append(item)
+        self.completed_steps += 1
+        self._touch()
+
+    def _finish(self, status: JobStatus, result: Any = None, error: Optional[str] = None):
+        self.status = status
+        self.result = result
+        self.error = error
+        self.finished_at = time.time()
+        self._touch()
+
+    async def wait(self, timeout: float, after_version: int = -1):
+        """Return once the job has moved past after_version (or finished), or the timeout passed"""
+        deadline = time.monotonic() + timeout
+        while not self.finished and self.version <= after_version:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            try:
+                await asyncio.wait_for(self._changed.wait(), remaining)
+            except asyncio.TimeoutError:
+                return
+
+    def view(self) -> dict:
+        return {
+            "job_id": self.job_id,
+            "kind": self.kind,
+            "status": self.status.value,
+            "version": self.version,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "progress": {"completed": self.completed_steps, "total": self.total_steps},
+            "partial_results": self.partial_results,
+            "result": self.result,
+            "error": self.error
+        }
+
+
+class JobManager:
+    """
+    Runs submitted jobs on a fixed pool of worker tasks fed by a bounded queue, so long generations
+    never hold an HTTP request open. Finished jobs are kept for result_ttl seconds for polling.
+    Jobs live in this process: with several server processes, polls must reach the one that accepted the job.
+    With an admission controller each running job also holds a slot of its lowest-priority "jobs" lane, so
+    background generations only take capacity that interactive requests leave free.
+    """
+
+    def __init__(self, name: str, workers: int, max_queued: int, result_ttl: float, max_retained: int,
+                 admission: Optional[AdmissionController] = None):
+        self.name = name
+        self.workers = max(1, workers)
+        self.result_ttl = result_ttl
+        self.max_retained = max_retained
+        self.admission = admission
+        self.submitted = 0
+        self.deduplicated = 0
+        self.rejected = 0
+        self._queue: "asyncio.Queue[Job]" = asyncio.Queue(maxsize=max_queued)
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._by_idempotency_key: Dict[str, str] = {}
+        self._worker_tasks: List[asyncio.Task] = []
+        self._stopping = False
+
+    def start(self):
+        self._worker_tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        logger.info(f"Started {self.workers} {self.name} job workers")
+
+    async def stop(self):
+        # Cancelling a worker also cancels the job it is awaiting
+        self._stopping = True
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+        for job in self._jobs.values():
+            if not job.finished:
+                job._finish(JobStatus.CANCELLED, error="Server shutting down")
+
+    def submit(self, run: Callable[[Job], Awaitable[Any]], fingerprint: str,
+               idempotency_key: Optional[str] = None) -> Job:
+        """
+        Queue a job. A retry with the same idempotency key returns the original job instead of starting
+        another generation; reusing the key for a different request is an error.
+        """
+        self._expire()
+        if idempotency_key is not None:
+            job = self._jobs.get(self._by_idempotency_key.get(idempotency_key, ""))
+            if job is not None:
+                if job.fingerprint != fingerprint:
+                    raise IdempotencyConflictError("Idempotency key was already used for a different request")
+                self.deduplicated += 1
+                return job
+
+        job = Job(self.name, run, fingerprint, idempotency_key)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            self.rejected += 1
+            raise QueueFullError(f"Too many queued {self.name} jobs, retry later")
+        self._jobs[job.job_id] = job
+        if idempotency_key is not None:
+            self._by_idempotency_key[idempotency_key] = job.job_id
+        self.submitted += 1
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        self._expire()
+        return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        job = self.get(job_id)
+        if job is None or job.finished:
+            return job
+        if job.task is not None:
+            job.task.cancel()
+        else:
+            # Still queued: the worker skips it when it comes up
+            job._finish(JobStatus.CANCELLED, error="Cancelled before it started")
+        return job
+
+    @staticmethod
+    async def _run(job: Job) -> Any:
+        # Runs in the job task's own copy of the context
+        yield_tokens.set(True)
+        return await job.run(job)
+
+    async def _worker(self):
+        while True:
+            job = await self._queue.get()
+            try:
+                if job.finished:
+                    continue
+                async with self.admission.slot("jobs", background=True) if self.admission else nullcontext():
+                    # The job may have been cancelled while waiting for capacity
+                    if job.finished:
+                        continue
+                    job.status = JobStatus.RUNNING
+                    job.started_at = time.time()
+                    job._touch()
+                    observe_stage(f"jobs.{self.name}.queue_wait", job.started_at - job.created_at)
+                    job.task = asyncio.create_task(self._run(job))
+                    try:
+                        job._finish(JobStatus.SUCCEEDED, result=await job.task)
+                    except asyncio.CancelledError:
+                        if self._stopping:
+                            job._finish(JobStatus.CANCELLED, error="Server shutting down")
+                            raise
+                        job._finish(JobStatus.CANCELLED, error="Cancelled")
+                    except Exception as e:
+                        logger.error(f"{self.name} job {job.job_id} failed: {str(e)}")
+                        job._finish(JobStatus.FAILED, error=str(getattr(e, "detail", None) or e))
+            finally:
+                self._queue.task_done()
+
+    def _expire(self):
+        now = time.time()
+        for job_id, job in list(self._jobs.items()):
+            over_limit = len(self._jobs) > self.max_retained
+            if not job.finished or (job.finished_at + self.result_ttl > now and not over_limit):
+                continue
+            del self._jobs[job_id]
+            if job.idempotency_key is not None and self._by_idempotency_key.get(job.idempotency_key) == job_id:
+                del self._by_idempotency_key[job.idempotency_key]
+
+    def stats(self) -> dict:
+        by_status = {status.value: 0 for status in JobStatus}
+        for job in self._jobs.values():
+            by_status[job.status.value] += 1
+        return {
+            "workers": self.workers,
+            "queued": self._queue.qsize(),
+            "submitted": self.submitted,
+            "deduplicated": self.deduplicated,
+            "rejected": self.rejected,
+            "retained": len(self._jobs),
+            "by_status": by_status
+        }
+
+
+def create_job_manager(name: str) -> JobManager:
+    config = Config()
+    return JobManager(
+        name,
+        workers=config.job_workers,
+        max_queued=config.job_max_queued,
+        result_ttl=config.job_result_ttl,
+        max_retained=config.job_max_retained,
+        admission=get_admission_controller()
+    )
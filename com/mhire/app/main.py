@@ -1,20 +1,60 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi import status
 
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import PlainTextResponse
 
+from com.mhire.app.cache.single_flight import single_flight_stats
+from com.mhire.app.clients.clients import close_client_registry, get_client_registry
+from com.mhire.app.jobs.jobs import create_job_manager
+from com.mhire.app.metrics.metrics import MetricsMiddleware, render_metrics
+from com.mhire.app.metrics.request_recorder import RequestRecorderMiddleware, request_recorder_options
+from com.mhire.app.prompts.token_budget import EndpointContextMiddleware, usage_tracker
+from com.mhire.app.resilience.admission import AdmissionMiddleware, get_admission_controller
+from com.mhire.app.resilience.upstream import upstream_guard_stats
+from com.mhire.app.services.ai_coach.ai_coach import AICoach
+from com.mhire.app.services.food_scanner.food_scanner import FoodScanner
+from com.mhire.app.services.meal_planner.meal_planner import MealPlanner
+from com.mhire.app.services.workout_planner.workout_planner import WorkoutPlanner
 from com.mhire.app.services.ai_coach.ai_coach_router import router as ai_coach_router
 from com.mhire.app.services.food_scanner.food_scanner_router import router as food_scanner_router
 from com.mhire.app.services.meal_planner.meal_planner_router import router as meal_planner_router
 from com.mhire.app.services.workout_planner.workout_planner_router import router as workout_planner_router
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One pooled client per upstream, shared by every service for the app's lifetime
+    clients = get_client_registry()
+    app.state.clients = clients
+    app.state.ai_coach = AICoach(clients)
+    app.state.food_scanner = FoodScanner(clients)
+    app.state.meal_planner = MealPlanner(clients)
+    app.state.workout_planner = WorkoutPlanner(clients)
+    # Long plan generations submitted as jobs run on bounded worker pools instead of holding requests open
+    app.state.meal_plan_jobs = create_job_manager("meal_plans")
+    app.state.workout_plan_jobs = create_job_manager("workout_plans")
+    app.state.meal_plan_jobs.start()
+    app.state.workout_plan_jobs.start()
+    yield
+    await app.state.meal_plan_jobs.stop()
+    await app.state.workout_plan_jobs.stop()
+    await close_client_registry()
+
 app = FastAPI(
     title="Gym Coach API",
     description="AI-powered Gym and Health coaching application",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
+# Per-lane concurrency limits and priority queueing for the upstream-calling routes; innermost, so its
+# 503s still get CORS headers and show up in the request metrics
+admission_controller = get_admission_controller()
+if admission_controller is not None:
+    app.add_middleware(AdmissionMiddleware, controller=admission_controller)
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -24,6 +64,17 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Attribute upstream token usage to the endpoint that caused it
+app.add_middleware(EndpointContextMiddleware)
+
+# Capture real traffic for replay by benchmarks/load_generator.py when REQUEST_RECORD_PATH is set
+recorder_options = request_recorder_options()
+if recorder_options is not None:
+    app.add_middleware(RequestRecorderMiddleware, **recorder_options)
+
+# Outermost, so request latency covers every other middleware too
+app.add_middleware(MetricsMiddleware)
+
 # Register routers
 app.include_router(ai_coach_router)
 app.include_router(food_scanner_router)
@@ -32,4 +83,40 @@ app.include_router(workout_planner_router)
 
 @app.get("/", status_code=status.HTTP_200_OK, response_class=PlainTextResponse)
 async def health_check():
-    return "Server is running and healthy"
\ No newline at end of file
+    return "Server is running and healthy"
+
+@app.get("/token-usage", status_code=status.HTTP_200_OK)
+async def token_usage():
+    """
+    Prompt and completion tokens spent per upstream call type and per endpoint since startup
+    """
+    return usage_tracker.snapshot()
+
+@app.get("/metrics", status_code=status.HTTP_200_OK, response_class=PlainTextResponse)
+async def metrics():
+    """
+    Request and per-stage latency histograms, upstream error, token and cache hit counters in Prometheus text format
+    """
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+@app.get("/coalescing/stats", status_code=status.HTTP_200_OK)
+async def coalescing_stats():
+    """
+    Upstream calls originated vs. shared with an identical request already in flight, per endpoint group
+    """
+    return single_flight_stats()
+
+@app.get("/upstreams/stats", status_code=status.HTTP_200_OK)
+async def upstream_stats():
+    """
+    Circuit breaker state, retries, hedges sent and hedges that answered first, per upstream
+    """
+    return upstream_guard_stats()
+
+@app.get("/admission/stats", status_code=status.HTTP_200_OK)
+async def admission_stats():
+    """
+    Running and queued requests, admissions and rejections per lane, and the OpenAI token limiter's balance
+    """
+    controller = get_admission_controller()
+    return controller.stats() if controller is not None else {"enabled": False}
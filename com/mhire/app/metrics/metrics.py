@@ -0,0 +1,224 @@
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# Request and stage latencies from a cache hit (milliseconds) up to a slow multi-call plan (minutes)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+
+_PREFIX = "gym_coach_"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Counter:
+    """Monotonic count per label combination"""
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = _PREFIX + name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[tuple, float] = {}
+
+    def inc(self, amount: float = 1, **labels: str):
+        key = tuple(labels[name] for name in self.labelnames)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(tuple(labels[name] for name in self.labelnames), 0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for key, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_labels(self.labelnames, key)} {_number(value)}")
+        return lines
+
+
+class Gauge(Counter):
+    """Value that goes up and down, e.g. requests in flight"""
+
+    def dec(self, amount: float = 1, **labels: str):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels: str):
+        self._values[tuple(labels[name] for name in self.labelnames)] = value
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        lines[1] = f"# TYPE {self.name} gauge"
+        return lines
+
+
+class Histogram:
+    """
+    Bucketed observations per label combination. Only per-bucket counts, the sum and the count are kept,
+    so an observation is a bisect and three additions whatever the traffic.
+    """
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = _PREFIX + name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts (last one is +Inf), sum]
+        self._series: Dict[tuple, list] = {}
+
+    def observe(self, value: float, **labels: str):
+        key = tuple(labels[name] for name in self.labelnames)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def count(self, **labels: str) -> int:
+        series = self._series.get(tuple(labels[name] for name in self.labelnames))
+        return sum(series[0]) if series else 0
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key, (counts, total) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = f'le="{_number(bound)}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {repr(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+http_request_seconds = Histogram(
+    "http_request_duration_seconds", "Time from request start to the last response byte, per route",
+    ("method", "route", "status")
+)
+http_requests_in_flight = Gauge("http_requests_in_flight", "Requests currently being served")
+stage_seconds = Histogram(
+    "stage_duration_seconds", "Time spent in one step of a service call (upstream call, search, parse, build)",
+    ("stage",)
+)
+upstream_errors = Counter(
+    "upstream_errors_total", "Failed OpenAI/Tavily calls by upstream, stage and exception type",
+    ("upstream", "stage", "error")
+)
+upstream_tokens = Counter("upstream_tokens_total", "Prompt and completion tokens per upstream call type", ("call", "type"))
+degraded_responses = Counter(
+    "degraded_responses_total", "Responses served from templates because generation would miss the deadline", ("service",)
+)
+upstream_retries = Counter("upstream_retries_total", "Upstream calls retried after a transient failure", ("upstream",))
+upstream_hedges = Counter("upstream_hedges_total", "Hedge requests sent after the first one exceeded the p95 latency", ("upstream",))
+upstream_hedge_wins = Counter("upstream_hedge_wins_total", "Hedge requests that answered before the first one", ("upstream",))
+circuit_state = Gauge("upstream_circuit_state", "Upstream circuit breaker state: 0 closed, 1 half open, 2 open", ("upstream",))
+circuit_rejections = Counter("upstream_circuit_rejections_total", "Calls failed fast while the circuit was open", ("upstream",))
+admission_rejections = Counter("admission_rejections_total", "Requests turned away by admission control", ("lane", "reason"))
+
+_METRICS = [
+    http_request_seconds, http_requests_in_flight, stage_seconds, upstream_errors, upstream_tokens, degraded_responses,
+    upstream_retries, upstream_hedges, upstream_hedge_wins, circuit_state, circuit_rejections, admission_rejections
+]
+
+# cache name -> callable returning (hits, misses); read only when /metrics is scraped
+_cache_counters: Dict[str, Callable[[], Tuple[int, int]]] = {}
+
+
+def register_cache(name: str, counts: Callable[[], Tuple[int, int]]):
+    """Expose a cache's own hit/miss counters; registering a name again replaces the previous cache"""
+    _cache_counters[name] = counts
+
+
+class timed:
+    """
+    Context manager recording how long a stage took into stage_duration_seconds. With `upstream` set,
+    a failure inside the block is also counted in upstream_errors_total.
+
+        with timed("workout_planner.llm", upstream="openai"):
+            response = await ...
+    """
+
+    __slots__ = ("stage", "upstream", "_start")
+
+    def __init__(self, stage: str, upstream: Optional[str] = None):
+        self.stage = stage
+        self.upstream = upstream
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        stage_seconds.observe(time.perf_counter() - self._start, stage=self.stage)
+        # A cancelled call or closed stream (client gone, job cancelled) is not an upstream failure
+        if exc_type is not None and self.upstream is not None and issubclass(exc_type, Exception):
+            upstream_errors.inc(upstream=self.upstream, stage=self.stage, error=exc_type.__name__)
+        return False
+
+
+def observe_stage(stage: str, seconds: float):
+    """Record a stage measured outside a `with timed(...)` block, e.g. time to the first streamed token"""
+    stage_seconds.observe(seconds, stage=stage)
+
+
+def render_metrics() -> str:
+    """All metrics in the Prometheus text exposition format"""
+    lines = []
+    for metric in _METRICS:
+        lines += metric.render()
+    hits = [f"# HELP {_PREFIX}cache_hits_total Cache lookups served from cache", f"# TYPE {_PREFIX}cache_hits_total counter"]
+    misses = [f"# HELP {_PREFIX}cache_misses_total Cache lookups that missed", f"# TYPE {_PREFIX}cache_misses_total counter"]
+    for name, counts in sorted(_cache_counters.items()):
+        hit_count, miss_count = counts()
+        hits.append(f'{_PREFIX}cache_hits_total{{cache="{_escape(name)}"}} {hit_count}')
+        misses.append(f'{_PREFIX}cache_misses_total{{cache="{_escape(name)}"}} {miss_count}')
+    return "\n".join(lines + hits + misses) + "\n"
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware timing every HTTP request. Requests are labelled with the route template
+    (/workout-planner/jobs/{job_id}), never the raw path, so ids do not create new series.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status = 500
+        start = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        http_requests_in_flight.inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            http_requests_in_flight.dec()
+            # The router stores the matched route in the scope it was given
+            route = scope.get("route")
+            http_request_seconds.observe(
+                time.perf_counter() - start,
+                method=scope["method"],
+                route=getattr(route, "path", "unmatched"),
+                status=str(status)
+            )
@@ -0,0 +1,81 @@
+import json
+import logging
+import os
+import random
+import time
+from typing import Optional
+
+from com.mhire.app.config.config import Config
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# JSON bodies larger than this are recorded without their body
+_MAX_JSON_BYTES = 256 * 1024
+# Request headers that change how the API serves a request and so belong in a replay
+_REPLAYED_HEADERS = (b"cache-control",)
+
+
+class RequestRecorderMiddleware:
+    """
+    ASGI middleware appending a sample of POST requests to a JSONL file that benchmarks/load_generator.py
+    replays. JSON bodies are stored as sent; uploads only by size, and the replay sends a synthetic image of
+    that size. Bodies hold user profiles and chat messages, so only enable it where that data may be kept.
+    """
+
+    def __init__(self, app, path: str, sample_rate: float = 1.0):
+        self.app = app
+        self.sample_rate = sample_rate
+        self.started = time.time()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(path, "a", encoding="utf-8", buffering=1)
+        logger.info(f"Recording {sample_rate:.0%} of POST requests to {path}")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or random.random() >= self.sample_rate:
+            return await self.app(scope, receive, send)
+
+        headers = dict(scope["headers"])
+        content_type = headers.get(b"content-type", b"").decode("latin-1")
+        chunks = []
+        size = 0
+
+        async def recording_receive():
+            nonlocal size
+            message = await receive()
+            if message["type"] == "http.request":
+                body = message.get("body", b"")
+                size += len(body)
+                if size <= _MAX_JSON_BYTES and content_type.startswith("application/json"):
+                    chunks.append(body)
+            return message
+
+        entry = {"t": round(time.time() - self.started, 3), "method": "POST", "path": scope["path"]}
+        replayed = {name.decode(): headers[name].decode("latin-1") for name in _REPLAYED_HEADERS if name in headers}
+        if replayed:
+            entry["headers"] = replayed
+        try:
+            await self.app(scope, recording_receive, send)
+        finally:
+            self._write(entry, content_type, b"".join(chunks), size)
+
+    def _write(self, entry: dict, content_type: str, body: bytes, size: int):
+        if content_type.startswith("multipart/form-data"):
+            entry["upload_bytes"] = size
+        elif body and size <= _MAX_JSON_BYTES:
+            try:
+                entry["json"] = json.loads(body)
+            except ValueError:
+                return
+        self._file.write(json.dumps(entry) + "\n")
+
+
+def request_recorder_options() -> Optional[dict]:
+    """Middleware options when REQUEST_RECORD_PATH is set, otherwise None"""
+    config = Config()
+    if not config.request_record_path:
+        return None
+    return {"path": config.request_record_path, "sample_rate": config.request_record_sample_rate}
@@ -0,0 +1,183 @@
+import re
+from typing import Dict, List
+
+# Both formats are read line by line in a single pass. Section headers are recognised by one anchored,
+# case-insensitive regex that rejects ordinary lines within a character or two, so no line is lower-cased
+# or scanned for several substrings. Lines are dispatched on their first character: only lines that can start
+# a header are matched against the header regex, and dash bullets are stripped without a regex. Exercises are
+# returned as plain dicts; the response models validate them in one call instead of constructing a pydantic
+# object per line.
+
+_BULLET = re.compile(r"^(?:[-•*○]+|\d+[.)])\s*")
+_BULLET_MARKS = "-•*○"
+_NUMBER = re.compile(r"\d{1,3}(?:,\d{3})+(?:\.\d+)?|\d+(?:\.\d+)?")
+
+# Workout plan text
+WORKOUT_SEGMENTS = ("warm_up", "main_routine", "cool_down")
+_SEGMENT_BY_INITIAL = {"w": "warm_up", "m": "main_routine", "c": "cool_down"}
+# "Warm-up:", "**Main Routine (30 min):**" or a markdown heading such as "### Cool-down"
+_WORKOUT_HEADER = re.compile(
+    r"[#*\s]*(warm[- ]?up|main (?:routine|workout)|cool[- ]?down)(?:\s*\([^)]*\))?[\s*#]*(?::|$)", re.IGNORECASE
+)
+# First characters a header line can start with (stripped lines only)
+_HEADER_STARTS = frozenset("#*wWmMcC")
+_EXERCISE_FIELDS = {"sets", "reps", "rest"}
+
+# Food analysis text
+_FOOD_HEADER = re.compile(
+    r"[#*\s]*(food items and ingredients|total nutritional values|health benefits|dietary concerns)", re.IGNORECASE
+)
+_SECTION_BY_INITIAL = {"f": "items", "t": "nutrition", "h": "benefits", "d": "concerns"}
+_FOOD_HEADER_STARTS = frozenset("#*fFtThHdD")
+_NUTRIENT = re.compile(r"^[^:]*?(calorie|protein|carb|fat)[^:]*:(.*)$", re.IGNORECASE)
+_MACRO_BY_KEYWORD = {"calorie": "calories", "protein": "protein", "carb": "carbs", "fat": "fat"}
+_ITEM_NOISE = re.compile(r"food items|ingredients", re.IGNORECASE)
+
+
+# Placeholder for a segment the model left empty; safe to share because models copy dict input
+_BASIC_EXERCISES = {
+    segment: {
+        "name": f"Basic {segment.replace('_', ' ').title()}",
+        "sets": 1,
+        "reps": "As needed",
+        "rest": "None",
+        "instructions": "Perform at a comfortable pace"
+    }
+    for segment in WORKOUT_SEGMENTS
+}
+
+
+def _main_exercise(name: str, parts: List[str]) -> dict:
+    sets, reps, rest, instructions = 3, "10-12", "60s", ""
+    for part in parts:
+        part = part.strip()
+        key = part[:4].lower()
+        colon = part.find(":")
+        if key not in _EXERCISE_FIELDS or colon == -1:
+            instructions = part
+            continue
+        value = part[colon + 1:].strip()
+        if key == "sets":
+            # "3-4" means 3 sets; without any number the default stays
+            number = value if value.isdigit() else _NUMBER.search(value)
+            if number:
+                sets = int(number if isinstance(number, str) else float(number.group().replace(",", "")))
+        elif key == "reps":
+            reps = value
+        else:
+            rest = value
+    return {"name": name, "sets": sets, "reps": reps, "rest": rest, "instructions": instructions}
+
+
+def parse_workout_response(content: str) -> Dict[str, List[dict]]:
+    """Exercise fields per segment from "- Name | Sets: 3 | Reps: 10 | Rest: 60s | Instructions" style text"""
+    segments: Dict[str, List[dict]] = {segment: [] for segment in WORKOUT_SEGMENTS}
+    current = exercises = None
+
+    for line in content.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+
+        first = line[0]
+        if first in _HEADER_STARTS:
+            header = _WORKOUT_HEADER.match(line)
+            if header:
+                current = _SEGMENT_BY_INITIAL[header.group(1)[0].lower()]
+                exercises = segments[current]
+                continue
+        if exercises is None:
+            continue
+        if first in _BULLET_MARKS:
+            body = line.lstrip(_BULLET_MARKS).lstrip()
+        elif first.isdigit():
+            bullet = _BULLET.match(line)
+            if bullet is None:
+                continue
+            body = line[bullet.end():]
+        else:
+            continue
+
+        parts = body.split("|")
+        name = parts[0].strip() or "Unnamed Exercise"
+        if current == "main_routine":
+            exercises.append(_main_exercise(name, parts[1:]))
+        else:
+            instructions = parts[1].strip() if len(parts) > 1 else ""
+            exercises.append({
+                "name": name,
+                "sets": 1,
+                "reps": "As needed",
+                "rest": "None",
+                "instructions": instructions or "Perform at a comfortable pace"
+            })
+
+    # Every segment needs at least one exercise
+    for segment, exercises in segments.items():
+        if not exercises:
+            exercises.append(_BASIC_EXERCISES[segment])
+    return segments
+
+
+def parse_food_analysis(text: str) -> dict:
+    """Items, total macros, benefits and concerns from the food scanner's sectioned text"""
+    result = {
+        "food_items": [],
+        "item_details": [],
+        "calories": 0.0,
+        "protein": 0.0,
+        "carbs": 0.0,
+        "fat": 0.0,
+        "health_benefits": [],
+        "concerns": []
+    }
+    section = None
+    seen_macros = set()
+
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+
+        if line[0] in _FOOD_HEADER_STARTS:
+            header = _FOOD_HEADER.match(line)
+            if header:
+                section = _SECTION_BY_INITIAL[header.group(1)[0].lower()]
+                continue
+
+        if section == "nutrition":
+            nutrient = _NUTRIENT.match(line)
+            if nutrient:
+                macro = _MACRO_BY_KEYWORD[nutrient.group(1).lower()]
+                # The first value wins, so a later "Saturated fat" line cannot replace total fat
+                if macro not in seen_macros:
+                    number = _NUMBER.search(nutrient.group(2))
+                    if number:
+                        result[macro] = float(number.group().replace(",", ""))
+                        seen_macros.add(macro)
+            continue
+
+        if section is None:
+            continue
+        if line[0] in _BULLET_MARKS:
+            entry = line.lstrip(_BULLET_MARKS).strip()
+        else:
+            bullet = _BULLET.match(line)
+            if bullet is None:
+                continue
+            entry = line[bullet.end():].strip()
+        if not entry:
+            continue
+
+        if section == "items":
+            if not _ITEM_NOISE.search(entry):
+                # "Chicken breast | 150 g": the name is listed, the portion is kept for the table lookup;
+                # without a portion both lists share the one string
+                result["food_items"].append(entry.split("|", 1)[0].strip() if "|" in entry else entry)
+                result["item_details"].append(entry)
+        elif section == "benefits":
+            result["health_benefits"].append(entry)
+        else:
+            result["concerns"].append(entry)
+
+    return result
@@ -0,0 +1,215 @@
+import textwrap
+from enum import Enum
+from typing import Dict, Optional
+
+from pydantic import BaseModel
+
+from com.mhire.app.config.config import Config
+from com.mhire.app.prompts import prompts_v1
+
+
+def _minimize(text: str) -> str:
+    """Strip indentation and trailing spaces from every line and collapse runs of blank lines"""
+    lines = []
+    for line in textwrap.dedent(text).strip().splitlines():
+        line = line.strip()
+        if line or (lines and lines[-1]):
+            lines.append(line)
+    return "\n".join(lines)
+
+
+class PromptTemplate:
+    """A named, versioned prompt; whitespace is minimized once when the template is registered"""
+
+    def __init__(self, name: str, version: str, text: str, minimize: bool = True):
+        self.name = name
+        self.version = version
+        self.text = _minimize(text) if minimize else text
+
+    @property
+    def key(self) -> str:
+        return f"{self.name}@{self.version}"
+
+    def render(self, **values) -> str:
+        return self.text.format_map(values)
+
+
+_registry: Dict[str, Dict[str, PromptTemplate]] = {}
+
+
+def register(template: PromptTemplate) -> PromptTemplate:
+    _registry.setdefault(template.name, {})[template.version] = template
+    return template
+
+
+def _version_number(version: str) -> int:
+    """Numeric part of a version tag, so v10 sorts after v2 rather than between v1 and v2"""
+    return int(version.lstrip("v"))
+
+
+def get_prompt(name: str, version: Optional[str] = None) -> PromptTemplate:
+    """Return a prompt by name: the requested version, the one pinned in PROMPT_VERSIONS, or the latest"""
+    versions = _registry[name]
+    version = version or Config().prompt_versions.get(name) or max(versions, key=_version_number)
+    return versions[version]
+
+
+def profile_values(profile: BaseModel) -> dict:
+    """Template values for a user profile, with enums as their plain values"""
+    values = {field: value.value if isinstance(value, Enum) else value for field, value in profile}
+    values["allergies"] = ", ".join(profile.allergies) or "None"
+    return values
+
+
+# AI Coach
+register(PromptTemplate("ai_coach.system", "v1", prompts_v1.COACH_SYSTEM, minimize=False))
+register(PromptTemplate("ai_coach.system", "v2", prompts_v1.COACH_SYSTEM))
+register(PromptTemplate("ai_coach.history", "v1", "Summary of the conversation so far:\n{summary}"))
+register(PromptTemplate("ai_coach.summary", "v1", """
+    Update the running summary of a conversation between a user and their fitness coach.
+    Keep what the coach needs later: the user's goals, body stats, injuries, preferences and equipment, advice already given and open questions.
+    Write at most {max_words} words as short bullet points and nothing else.
+
+    Current summary:
+    {summary}
+
+    New turns:
+    {turns}
+"""))
+
+# Food scanner
+register(PromptTemplate("food_scanner.system", "v1", prompts_v1.FOOD_SCANNER_SYSTEM, minimize=False))
+register(PromptTemplate("food_scanner.system", "v2", prompts_v1.FOOD_SCANNER_SYSTEM))
+register(PromptTemplate("food_scanner.user", "v1", prompts_v1.FOOD_SCANNER_USER))
+# Identify-only mode: nutrition comes from the local reference table, so the model only names foods and portions
+register(PromptTemplate("food_scanner.identify_system", "v1", """
+    You are a nutritionist identifying food in photos. List every visible food item and ingredient with its estimated weight, then any allergens or dietary concerns.
+    Use common food names (e.g. "white rice", "chicken breast") and this EXACT format:
+
+    FOOD ITEMS AND INGREDIENTS:
+    - [Food name] | [X] g
+
+    DIETARY CONCERNS:
+    - [Allergen or concern]
+
+    Do not estimate calories or macros.
+"""))
+register(PromptTemplate("food_scanner.identify_user", "v1", "Identify the foods in this image and estimate the weight of each."))
+
+# Workout planner
+register(PromptTemplate("workout_planner.system", "v1", prompts_v1.WORKOUT_SYSTEM))
+register(PromptTemplate("workout_planner.daily", "v1", prompts_v1.WORKOUT_DAILY, minimize=False))
+register(PromptTemplate("workout_planner.daily", "v2", """
+    Create a detailed {focus} workout for Day {day} for this user:
+    Goal: {primary_goal}; Weight: {weight_kg}kg; Height: {height_cm}cm; Diet: {eating_style}; Meat eater: {is_meat_eater}; Lactose intolerant: {is_lactose_intolerant}; Allergies: {allergies}; Caffeine: {caffeine_consumption}; Sugar: {sugar_consumption}
+
+    Use exactly this format, one line per exercise:
+    Warm-up:
+    - [Exercise Name] | [Instructions]
+    Main Routine:
+    - [Exercise Name] | Sets: [X] | Reps: [X] | Rest: [Xs] | [Instructions]
+    Cool-down:
+    - [Exercise Name] | [Instructions]
+"""))
+
+register(PromptTemplate("workout_planner.catalog", "v1", """
+    Pick exercises for a {focus} workout for Day {day} for this user:
+    Goal: {primary_goal}; Weight: {weight_kg}kg; Height: {height_cm}cm; Intensity: {intensity}
+
+    Choose only from these catalog IDs:
+    Warm-up: {warm_up_options}
+    Main Routine: {main_routine_options}
+    Cool-down: {cool_down_options}
+
+    Reply with exactly these three lines and nothing else:
+    warm_up: {warm_up_count} IDs, comma separated
+    main_routine: {main_routine_count} IDs, comma separated
+    cool_down: {cool_down_count} IDs, comma separated
+"""))
+
+# Meal planner
+_MEAL_PROFILE = """
+    Goal: {primary_goal}; Weight: {weight_kg}kg; Height: {height_cm}cm; Meat eater: {is_meat_eater}; Lactose intolerant: {is_lactose_intolerant}; Allergies: {allergies}; Eating style: {eating_style}; Caffeine: {caffeine_consumption}; Sugar: {sugar_consumption}
+"""
+
+register(PromptTemplate("meal_planner.plan", "v1", """
+    Create a personalized daily meal plan (breakfast, lunch, snack, dinner) based on these user details:
+""" + _MEAL_PROFILE + """
+    IMPORTANT:
+    - Create realistic, nutritionally appropriate meals for this user's specific profile and goal
+    - Nutritional values are plain numbers: calories in kcal, protein/carbs/fat in grams
+    - preparation_steps holds clear cooking/preparation instructions
+    - For a user trying to {primary_goal}, adjust calories and macros accordingly
+"""))
+
+register(PromptTemplate("meal_planner.plan_json", "v1", prompts_v1.MEAL_PLAN_JSON, minimize=False))
+register(PromptTemplate("meal_planner.plan_json", "v2", """
+    Create a personalized daily meal plan based on these user details:
+""" + _MEAL_PROFILE + """
+    Return ONLY a JSON object {{"breakfast": MEAL, "lunch": MEAL, "snack": MEAL, "dinner": MEAL}} where each MEAL is:
+    {{"name": str, "description": str, "calories": number, "protein": number, "carbs": number, "fat": number, "rationale": str, "preparation_steps": [str]}}
+
+    IMPORTANT:
+    - Create realistic, nutritionally appropriate meals for this user's specific profile and goal
+    - Nutritional values are plain numbers without units: calories in kcal, protein/carbs/fat in grams
+    - rationale explains why the meal fits the user; preparation_steps are clear cooking instructions
+    - No text outside the JSON
+    - For a user trying to {primary_goal}, adjust calories and macros accordingly
+"""))
+
+# Targets computed locally by nutrition_targets, given to the model as hard limits (plan v2, plan_json v3)
+_MEAL_TARGETS = """
+    Daily targets (hard limits, the plan is rejected when it misses them): {target_calories} kcal, protein at least {target_protein}g, carbs {target_carbs}g, fat {target_fat}g
+    Calories per meal: breakfast {breakfast_calories}, lunch {lunch_calories}, snack {snack_calories}, dinner {dinner_calories}
+"""
+# Since plans that miss the targets are repaired or rescaled rather than rejected (plan v3, plan_json v4)
+_MEAL_TARGETS_ADJUSTED = """
+    Daily targets (meet them closely; a plan that misses has its meals replaced or its portions rescaled): {target_calories} kcal, protein at least {target_protein}g, carbs {target_carbs}g, fat {target_fat}g
+    Calories per meal: breakfast {breakfast_calories}, lunch {lunch_calories}, snack {snack_calories}, dinner {dinner_calories}
+"""
+_MEAL_PLAN_RULES = """
+    IMPORTANT:
+    - Create realistic meals for this user's specific profile and goal that add up to the targets
+    - Nutritional values are plain numbers: calories in kcal, protein/carbs/fat in grams
+    - Each meal's calories must match its macros (4 kcal/g protein and carbs, 9 kcal/g fat)
+    - preparation_steps holds clear cooking/preparation instructions
+"""
+_MEAL_PLAN_JSON_RULES = """
+    Return ONLY a JSON object {{"breakfast": MEAL, "lunch": MEAL, "snack": MEAL, "dinner": MEAL}} where each MEAL is:
+    {{"name": str, "description": str, "calories": number, "protein": number, "carbs": number, "fat": number, "rationale": str, "preparation_steps": [str]}}
+
+    IMPORTANT:
+    - Create realistic meals for this user's specific profile and goal that add up to the targets
+    - Nutritional values are plain numbers without units: calories in kcal, protein/carbs/fat in grams
+    - Each meal's calories must match its macros (4 kcal/g protein and carbs, 9 kcal/g fat)
+    - rationale explains why the meal fits the user; preparation_steps are clear cooking instructions
+    - No text outside the JSON
+"""
+
+register(PromptTemplate("meal_planner.plan", "v2", """
+    Create a personalized daily meal plan (breakfast, lunch, snack, dinner) based on these user details:
+""" + _MEAL_PROFILE + _MEAL_TARGETS + _MEAL_PLAN_RULES))
+register(PromptTemplate("meal_planner.plan", "v3", """
+    Create a personalized daily meal plan (breakfast, lunch, snack, dinner) based on these user details:
+""" + _MEAL_PROFILE + _MEAL_TARGETS_ADJUSTED + _MEAL_PLAN_RULES))
+
+register(PromptTemplate("meal_planner.plan_json", "v3", """
+    Create a personalized daily meal plan based on these user details:
+""" + _MEAL_PROFILE + _MEAL_TARGETS + _MEAL_PLAN_JSON_RULES))
+register(PromptTemplate("meal_planner.plan_json", "v4", """
+    Create a personalized daily meal plan based on these user details:
+""" + _MEAL_PROFILE + _MEAL_TARGETS_ADJUSTED + _MEAL_PLAN_JSON_RULES))
+
+register(PromptTemplate("meal_planner.repair", "v1", """
+    The {meal_type} in a generated meal plan was invalid: {invalid_meal}
+    Create a replacement {meal_type} for this user:
+""" + _MEAL_PROFILE + """
+    Return ONLY a JSON object with name, description, calories, protein, carbs, fat (plain numbers), rationale and preparation_steps (array of strings).
+"""))
+
+register(PromptTemplate("meal_planner.repair", "v2", """
+    The {meal_type} in a generated meal plan was invalid: {invalid_meal}
+    Create a replacement {meal_type} of about {meal_calories} kcal with at least {meal_protein}g protein for this user:
+""" + _MEAL_PROFILE + """
+    Return ONLY a JSON object with name, description, calories, protein, carbs, fat (plain numbers), rationale and preparation_steps (array of strings).
+"""))
@@ -0,0 +1,88 @@
+import math
+from collections import defaultdict
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+from com.mhire.app.config.config import Config
+from com.mhire.app.metrics.metrics import upstream_tokens
+
+# Endpoint of the request being served, so upstream token usage can be attributed to it
+current_endpoint: ContextVar[str] = ContextVar("current_endpoint", default="background")
+
+
+class TokenBudgetExceeded(ValueError):
+    pass
+
+
+def estimate_tokens(*texts: str) -> int:
+    """Cheap token estimate (~4 characters per token) used to enforce budgets before a call"""
+    return sum(math.ceil(len(text) / 4) for text in texts)
+
+
+def check_prompt_budget(call: str, *texts: str) -> int:
+    """Reject a call whose prompt would exceed the configured prompt token budget"""
+    estimated = estimate_tokens(*texts)
+    budget = Config().prompt_token_budget
+    if budget and estimated > budget:
+        raise TokenBudgetExceeded(f"Prompt for {call} is ~{estimated} tokens, over the budget of {budget}")
+    return estimated
+
+
+def completion_budget(call: str) -> dict:
+    """Keyword arguments capping completion tokens for a call, if a budget is configured for it"""
+    budget = Config().completion_token_budgets.get(call)
+    return {"max_completion_tokens": budget} if budget else {}
+
+
+def expected_call_tokens(call: str, *texts: str) -> int:
+    """Tokens a call is expected to use: its estimated prompt plus its completion budget, reserved before the call"""
+    config = Config()
+    return estimate_tokens(*texts) + config.completion_token_budgets.get(call, config.completion_token_estimate)
+
+
+class TokenUsageTracker:
+    """Prompt/completion token totals per upstream call type and per endpoint"""
+
+    def __init__(self):
+        self.by_call: Dict[str, Dict[str, int]] = defaultdict(lambda: {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0})
+        self.by_endpoint: Dict[str, Dict[str, int]] = defaultdict(lambda: {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0})
+
+    def record(self, call: str, prompt_tokens: Optional[int], completion_tokens: Optional[int]):
+        for bucket in (self.by_call[call], self.by_endpoint[current_endpoint.get()]):
+            bucket["calls"] += 1
+            bucket["prompt_tokens"] += prompt_tokens or 0
+            bucket["completion_tokens"] += completion_tokens or 0
+        upstream_tokens.inc(prompt_tokens or 0, call=call, type="prompt")
+        upstream_tokens.inc(completion_tokens or 0, call=call, type="completion")
+
+    def record_openai(self, call: str, response):
+        """Record the usage block of an OpenAI chat completion"""
+        usage = getattr(response, "usage", None)
+        self.record(call, getattr(usage, "prompt_tokens", 0), getattr(usage, "completion_tokens", 0))
+
+    def record_langchain(self, call: str, message):
+        """Record the usage metadata of a LangChain AI message or final stream chunk"""
+        usage = getattr(message, "usage_metadata", None) or {}
+        self.record(call, usage.get("input_tokens", 0), usage.get("output_tokens", 0))
+
+    def snapshot(self) -> dict:
+        return {"by_call": dict(self.by_call), "by_endpoint": dict(self.by_endpoint)}
+
+
+usage_tracker = TokenUsageTracker()
+
+
+class EndpointContextMiddleware:
+    """ASGI middleware that tags everything a request does with its path"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        token = current_endpoint.set(scope["path"])
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            current_endpoint.reset(token)
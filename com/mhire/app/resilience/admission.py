@@ -0,0 +1,249 @@
+import asyncio
+import itertools
+import logging
+import math
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, List, Optional
+
+from fastapi.responses import JSONResponse
+
+from com.mhire.app.config.config import Config
+from com.mhire.app.metrics.metrics import admission_rejections, observe_stage
+from com.mhire.app.resilience.token_limiter import TokenRateLimiter, get_token_limiter
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Lower is served first: interactive chat, then food scans, plan generation and background plan jobs
+LANE_PRIORITIES = {"chat": 0, "scan": 1, "plans": 2, "jobs": 3}
+
+# POST paths that call the upstreams, by prefix, first match wins; anything else (stats, polling, job
+# submission, local generation) is not limited
+ROUTE_LANES = (
+    ("/workout-planner/generate/local", None),
+    ("/coach/chat", "chat"),
+    ("/food-scanner/", "scan"),
+    ("/meal-planner/generate", "plans"),
+    ("/workout-planner/generate", "plans")
+)
+
+
+def lane_for_path(path: str) -> Optional[str]:
+    for prefix, lane in ROUTE_LANES:
+        if path.startswith(prefix):
+            return lane
+    return None
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class _Lane:
+    __slots__ = ("name", "priority", "limit", "active", "queued", "admitted", "rejected")
+
+    def __init__(self, name: str, priority: int, limit: int):
+        self.name = name
+        self.priority = priority
+        self.limit = limit
+        self.active = 0
+        self.queued = 0
+        self.admitted = 0
+        self.rejected = 0
+
+
+class _Waiter:
+    __slots__ = ("lane", "seq", "future", "sheddable")
+
+    def __init__(self, lane: _Lane, seq: int, sheddable: bool):
+        self.lane = lane
+        self.seq = seq
+        self.future = asyncio.get_running_loop().create_future()
+        self.sheddable = sheddable
+
+
+class AdmissionController:
+    """
+    Shares `capacity` concurrent slots between lanes, each also capped at its own limit. Work over the caps
+    waits in one priority queue: whenever a slot frees up, the most urgent waiter whose lane is under its
+    limit goes next, oldest first within a priority. At most `max_queued` requests wait, each for at most
+    `max_wait` seconds; a full queue sheds its least urgent request for a more urgent one, and anything
+    that cannot wait is rejected with a Retry-After hint.
+    """
+
+    def __init__(self, capacity: int, lane_limits: Dict[str, int], max_queued: int, max_wait: float,
+                 retry_after: float, token_limiter: Optional[TokenRateLimiter] = None):
+        self.capacity = max(1, capacity)
+        self.max_queued = max_queued
+        self.max_wait = max_wait
+        self.retry_after = retry_after
+        self.token_limiter = token_limiter
+        self.lanes = {
+            name: _Lane(name, priority, max(1, lane_limits.get(name, self.capacity)))
+            for name, priority in LANE_PRIORITIES.items()
+        }
+        self.active = 0
+        self._waiters: List[_Waiter] = []
+        self._seq = itertools.count()
+
+    def _has_room(self, lane: _Lane) -> bool:
+        return self.active < self.capacity and lane.active < lane.limit
+
+    def _admit(self, lane: _Lane):
+        self.active += 1
+        lane.active += 1
+        lane.admitted += 1
+
+    def _remove(self, waiter: _Waiter):
+        self._waiters.remove(waiter)
+        waiter.lane.queued -= 1
+
+    def _reject(self, lane: _Lane, reason: str, message: str, retry_after: Optional[float] = None) -> AdmissionRejected:
+        lane.rejected += 1
+        admission_rejections.inc(lane=lane.name, reason=reason)
+        return AdmissionRejected(message, self.retry_after if retry_after is None else retry_after)
+
+    def _dispatch(self):
+        while self.active < self.capacity:
+            runnable = [waiter for waiter in self._waiters if waiter.lane.active < waiter.lane.limit]
+            if not runnable:
+                return
+            waiter = min(runnable, key=lambda waiter: (waiter.lane.priority, waiter.seq))
+            self._remove(waiter)
+            self._admit(waiter.lane)
+            waiter.future.set_result(None)
+
+    async def acquire(self, lane_name: str, background: bool = False):
+        """
+        Take a slot in a lane, waiting in the queue for up to max_wait seconds; raises AdmissionRejected when
+        the slot cannot be had. Background work (plan jobs) waits as long as it takes instead, outside the
+        queue bound, and is never shed. Every successful acquire must be paired with release().
+        """
+        lane = self.lanes[lane_name]
+        sheddable = not background
+        max_wait = self.max_wait if sheddable else None
+        if sheddable and self.token_limiter is not None and self.token_limiter.saturated:
+            wait = self.token_limiter.wait_time()
+            raise self._reject(lane, "token_rate", f"OpenAI token rate limit reached, retry in {wait:.0f}s",
+                               retry_after=wait)
+
+        # Free capacity goes to this request unless a waiter at least as urgent could use it
+        if self._has_room(lane) and not any(
+            waiter.lane.priority <= lane.priority and waiter.lane.active < waiter.lane.limit for waiter in self._waiters
+        ):
+            self._admit(lane)
+            return
+
+        if sheddable and sum(waiter.sheddable for waiter in self._waiters) >= self.max_queued:
+            victim = max((waiter for waiter in self._waiters if waiter.sheddable),
+                         key=lambda waiter: (waiter.lane.priority, waiter.seq))
+            if victim.lane.priority <= lane.priority:
+                raise self._reject(lane, "queue_full", f"Too many {lane_name} requests waiting, retry later")
+            self._remove(victim)
+            victim.future.set_exception(self._reject(
+                victim.lane, "shed", f"{victim.lane.name} request gave way to more urgent work, retry later"
+            ))
+
+        waiter = _Waiter(lane, next(self._seq), sheddable)
+        self._waiters.append(waiter)
+        lane.queued += 1
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(waiter.future, max_wait)
+        except BaseException as e:
+            if waiter in self._waiters:
+                self._remove(waiter)
+            elif waiter.future.done() and not waiter.future.cancelled() and waiter.future.exception() is None:
+                # Admitted just as the wait ended
+                self.release(lane_name)
+            if isinstance(e, TimeoutError):
+                raise self._reject(lane, "timeout", f"No {lane_name} capacity within {max_wait:.0f}s, retry later")
+            raise
+        finally:
+            observe_stage(f"admission.{lane_name}.queue_wait", time.perf_counter() - start)
+
+    def release(self, lane_name: str):
+        lane = self.lanes[lane_name]
+        lane.active -= 1
+        self.active -= 1
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, lane_name: str, background: bool = False):
+        await self.acquire(lane_name, background)
+        try:
+            yield
+        finally:
+            self.release(lane_name)
+
+    def stats(self) -> dict:
+        return {
+            "capacity": self.capacity,
+            "active": self.active,
+            "queued": len(self._waiters),
+            "lanes": {
+                name: {
+                    "priority": lane.priority,
+                    "limit": lane.limit,
+                    "active": lane.active,
+                    "queued": lane.queued,
+                    "admitted": lane.admitted,
+                    "rejected": lane.rejected
+                }
+                for name, lane in self.lanes.items()
+            },
+            "token_limiter": self.token_limiter.stats() if self.token_limiter is not None else None
+        }
+
+
+class AdmissionMiddleware:
+    """
+    ASGI middleware holding an admission slot for every POST to an upstream-calling route until its response,
+    streamed bodies included, has been sent. Requests that cannot be admitted get a 503 with Retry-After.
+    """
+
+    def __init__(self, app, controller: Optional[AdmissionController] = None):
+        self.app = app
+        self.controller = controller or get_admission_controller()
+
+    async def __call__(self, scope, receive, send):
+        lane = lane_for_path(scope["path"]) if scope["type"] == "http" and scope["method"] == "POST" else None
+        if lane is None or self.controller is None:
+            return await self.app(scope, receive, send)
+
+        try:
+            await self.controller.acquire(lane)
+        except AdmissionRejected as e:
+            response = JSONResponse(
+                status_code=503,
+                content={"detail": str(e)},
+                headers={"Retry-After": str(max(1, math.ceil(e.retry_after)))}
+            )
+            return await response(scope, receive, send)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release(lane)
+
+
+_controller: Optional[AdmissionController] = None
+
+
+def get_admission_controller() -> Optional[AdmissionController]:
+    """The process-wide admission controller, or None when ADMISSION_ENABLED is false"""
+    global _controller
+    config = Config()
+    if _controller is None and config.admission_enabled:
+        _controller = AdmissionController(
+            capacity=config.admission_max_concurrency,
+            lane_limits=config.admission_lane_limits,
+            max_queued=config.admission_max_queued,
+            max_wait=config.admission_max_wait,
+            retry_after=config.admission_retry_after,
+            token_limiter=get_token_limiter()
+        )
+    return _controller
@@ -0,0 +1,61 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from com.mhire.app.config.config import Config
+
+# Monotonic time by which the request being served has to be answered; tasks started for it inherit it
+current_deadline: ContextVar[Optional[float]] = ContextVar("current_deadline", default=None)
+
+
+class DeadlineExceeded(TimeoutError):
+    pass
+
+
+@contextmanager
+def deadline_scope(seconds: Optional[float]):
+    """Run the block with a deadline `seconds` from now; a tighter deadline already in place is kept"""
+    if seconds is None:
+        yield
+        return
+    deadline = time.monotonic() + seconds
+    outer = current_deadline.get()
+    token = current_deadline.set(deadline if outer is None else min(outer, deadline))
+    try:
+        yield
+    finally:
+        current_deadline.reset(token)
+
+
+def request_deadline(requested: Optional[float], default: float) -> Optional[float]:
+    """
+    Seconds a request may take: the client's X-Request-Timeout when given, never more than the
+    endpoint's configured deadline; None when neither is set (0 disables the configured one)
+    """
+    limits = [value for value in (requested, default) if value]
+    return min(limits) if limits else None
+
+
+def time_left() -> Optional[float]:
+    deadline = current_deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def upstream_timeout(default: float) -> float:
+    """Timeout for one upstream call: the configured one, cut to the time left before the request's deadline"""
+    left = time_left()
+    if left is None:
+        return default
+    if left <= 0:
+        raise DeadlineExceeded("Request deadline passed before the upstream call")
+    return min(default, left)
+
+
+def generation_budget() -> Optional[float]:
+    """
+    Time a generation may run before the caller must switch to its fallback: what is left of the deadline
+    minus DEADLINE_RESERVE for building the fallback and sending it. None when there is no deadline.
+    """
+    left = time_left()
+    return None if left is None else max(0.0, left - Config().deadline_reserve)
@@ -0,0 +1,118 @@
+import asyncio
+import logging
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from com.mhire.app.config.config import Config
+from com.mhire.app.resilience.deadline import DeadlineExceeded, time_left
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Set for background work (plan jobs), whose calls only spend tokens that interactive requests leave unused
+yield_tokens: ContextVar[bool] = ContextVar("yield_tokens", default=False)
+
+
+class TokenRateLimiter:
+    """
+    Token bucket of `tokens_per_minute` shared by every OpenAI call in the process, refilled continuously.
+    A call reserves its expected tokens before it starts and may drive the balance below zero; the next call
+    then waits until the balance has refilled, so calls are paced in arrival order instead of hitting 429s.
+    Background calls (see yield_tokens) instead wait until the bucket holds their tokens, so they never run up
+    a debt interactive calls would queue behind. Once a call's usage is known its reservation is settled against it.
+    """
+
+    def __init__(self, tokens_per_minute: float, max_wait: float):
+        self.capacity = tokens_per_minute
+        self.rate = tokens_per_minute / 60
+        self.max_wait = max_wait
+        self.available = float(tokens_per_minute)
+        self.charged = 0
+        self.waits = 0
+        self.waited_seconds = 0.0
+        self._updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.available = min(self.capacity, self.available + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self) -> float:
+        """Seconds a call starting now would wait for its tokens"""
+        self._refill()
+        return max(0.0, -self.available / self.rate)
+
+    @property
+    def saturated(self) -> bool:
+        """Whether new work should be turned away because its calls would wait longer than max_wait"""
+        return self.wait_time() > self.max_wait
+
+    async def acquire(self, tokens: int) -> int:
+        """
+        Reserve tokens, waiting for them if the bucket is in debt (short of them, for background calls);
+        returns the amount reserved.
+        Raises DeadlineExceeded straight away when the wait would outlast the request deadline.
+        """
+        # A call larger than the whole bucket still goes through, just a minute's refill apart
+        tokens = min(tokens, int(self.capacity))
+        if yield_tokens.get():
+            # Interactive calls may take the refill first, so look again after every wait
+            while True:
+                self._refill()
+                if self.available >= tokens:
+                    break
+                await self._wait((tokens - self.available) / self.rate)
+            self.available -= tokens
+            self.charged += tokens
+            return tokens
+
+        self._refill()
+        self.available -= tokens
+        self.charged += tokens
+        wait = max(0.0, -self.available / self.rate)
+        if wait > 0:
+            try:
+                await self._wait(wait)
+            except BaseException:
+                self.settle(tokens, 0)
+                raise
+        return tokens
+
+    async def _wait(self, wait: float):
+        left = time_left()
+        if left is not None and wait > left:
+            raise DeadlineExceeded(f"OpenAI token rate limit would delay the call by {wait:.1f}s")
+        self.waits += 1
+        self.waited_seconds += wait
+        await asyncio.sleep(wait)
+
+    def settle(self, reserved: int, used: int):
+        """Give back what a call reserved but did not use, or charge what it used beyond its reservation"""
+        self._refill()
+        self.available += reserved - used
+        self.charged += used - reserved
+
+    def stats(self) -> dict:
+        return {
+            "tokens_per_minute": self.capacity,
+            "available": round(self.available),
+            "wait_seconds": round(self.wait_time(), 3),
+            "tokens_charged": self.charged,
+            "waits": self.waits,
+            "waited_seconds": round(self.waited_seconds, 3)
+        }
+
+
+_limiter: Optional[TokenRateLimiter] = None
+
+
+def get_token_limiter() -> Optional[TokenRateLimiter]:
+    """The process-wide OpenAI token limiter, or None when OPENAI_TOKENS_PER_MINUTE is 0"""
+    global _limiter
+    config = Config()
+    if _limiter is None and config.openai_tokens_per_minute > 0:
+        _limiter = TokenRateLimiter(config.openai_tokens_per_minute, config.openai_tpm_max_wait)
+        logger.info(f"Limiting OpenAI calls to {config.openai_tokens_per_minute:.0f} tokens per minute")
+    return _limiter
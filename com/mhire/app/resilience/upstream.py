@@ -0,0 +1,391 @@
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+from typing import AsyncIterator, Awaitable, Callable, Deque, Dict, Optional, TypeVar
+
+import httpx
+import openai
+from tavily.errors import TimeoutError as TavilyTimeoutError
+
+from com.mhire.app.config.config import Config
+from com.mhire.app.metrics.metrics import (
+    circuit_rejections, circuit_state, upstream_hedge_wins, upstream_hedges, upstream_retries
+)
+from com.mhire.app.resilience.deadline import DeadlineExceeded, time_left, upstream_timeout
+from com.mhire.app.resilience.token_limiter import TokenRateLimiter
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+CLOSED = "closed"
+HALF_OPEN = "half_open"
+OPEN = "open"
+# Values of the upstream_circuit_state gauge
+_STATE_CODES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+# Successful call latencies kept per call type for the hedge delay
+_LATENCY_WINDOW = 256
+
+
+class CircuitOpenError(Exception):
+    """Raised without calling the upstream while its circuit is open"""
+
+
+def is_transient(error: BaseException) -> bool:
+    """Whether a failed upstream call is worth retrying: timeouts, connection errors, 429 and 5xx responses"""
+    if isinstance(error, DeadlineExceeded):
+        return False
+    if isinstance(error, (TimeoutError, TavilyTimeoutError, httpx.TransportError, openai.APIConnectionError)):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code in (408, 409, 429) or error.status_code >= 500
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code == 429 or error.response.status_code >= 500
+    return False
+
+
+class CircuitBreaker:
+    """
+    Opens once at least `failure_rate` of the last `window` calls (and no fewer than `min_calls`) failed
+    transiently, so calls fail straight away instead of each waiting out its timeout. After `reset_timeout`
+    seconds one probe call is let through (half open): success closes the circuit, failure opens it again.
+    A rate over recent calls rather than a run of consecutive failures keeps concurrent calls that fail
+    together from tripping it on an upstream that mostly works.
+    """
+
+    def __init__(self, name: str, failure_rate: float, window: int, min_calls: int, reset_timeout: float):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_calls = min(min_calls, window)
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        # True for each recent failure, False for each success
+        self._outcomes: Deque[bool] = deque(maxlen=window)
+        self._failures = 0
+        self.opened_at = 0.0
+        self.trips = 0
+        self.rejected = 0
+        self._probing = False
+        circuit_state.set(_STATE_CODES[CLOSED], upstream=name)
+
+    def _set_state(self, state: str):
+        if state != self.state:
+            logger.log(logging.WARNING if state == OPEN else logging.INFO, f"{self.name} circuit {self.state} -> {state}")
+            self.state = state
+            circuit_state.set(_STATE_CODES[state], upstream=self.name)
+
+    def before_call(self):
+        """Raise CircuitOpenError unless a call may go to the upstream now"""
+        if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self._set_state(HALF_OPEN)
+        if self.state == OPEN or (self.state == HALF_OPEN and self._probing):
+            self.rejected += 1
+            circuit_rejections.inc(upstream=self.name)
+            raise CircuitOpenError(f"{self.name} circuit is open, retrying after {self.reset_timeout:.0f}s")
+        if self.state == HALF_OPEN:
+            self._probing = True
+
+    def _record(self, failed: bool):
+        if len(self._outcomes) == self._outcomes.maxlen:
+            self._failures -= self._outcomes[0]
+        self._outcomes.append(failed)
+        self._failures += failed
+
+    def record_success(self):
+        self._probing = False
+        if self.state == HALF_OPEN:
+            self._outcomes.clear()
+            self._failures = 0
+            self._set_state(CLOSED)
+        elif self.state == CLOSED:
+            self._record(False)
+        # Calls started before the circuit opened say nothing about whether it should close
+
+    def record_failure(self):
+        self._probing = False
+        if self.state == CLOSED:
+            self._record(True)
+        if self.state == HALF_OPEN or (
+            self.state == CLOSED and len(self._outcomes) >= self.min_calls
+            and self._failures >= self.failure_rate * len(self._outcomes)
+        ):
+            self.trips += 1
+            self.opened_at = time.monotonic()
+            self._set_state(OPEN)
+
+    def release(self):
+        """A call ended without telling anything about the upstream's health (cancelled, or cut short by the deadline)"""
+        self._probing = False
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "recent_failure_rate": self._failures / len(self._outcomes) if self._outcomes else 0.0,
+            "trips": self.trips,
+            "rejected": self.rejected
+        }
+
+
+def used_tokens(result) -> Optional[int]:
+    """Total tokens of an OpenAI response or LangChain message/chunk, None when it carries no usage"""
+    usage = getattr(result, "usage", None)
+    if usage is not None and getattr(usage, "total_tokens", None) is not None:
+        return usage.total_tokens
+    metadata = getattr(result, "usage_metadata", None)
+    if metadata:
+        return metadata.get("total_tokens")
+    return None
+
+
+class UpstreamGuard:
+    """
+    Wraps every call to one upstream with a per-attempt timeout (cut to the request deadline), bounded retries
+    with jittered exponential backoff for transient failures, a circuit breaker and, when enabled, a hedged
+    second request once the first has taken longer than the recent p95 latency of the same call type.
+
+    Calls are passed as a function of the attempt's timeout, so retries and hedges make a fresh request:
+
+        response = await clients.openai_guard.call(
+            lambda timeout: client.chat.completions.create(..., timeout=timeout), call="workout_planner.daily"
+        )
+
+    With a token limiter every request first reserves the `tokens` the call is expected to use, waiting for
+    them if the upstream's tokens-per-minute quota is spent, and is settled against its reported usage.
+    """
+
+    def __init__(self, name: str, timeout: float, max_attempts: int, backoff_base: float, backoff_max: float,
+                 breaker: CircuitBreaker, hedge: bool = False, hedge_quantile: float = 0.95,
+                 hedge_min_delay: float = 0.05, hedge_min_samples: int = 20,
+                 limiter: Optional[TokenRateLimiter] = None):
+        self.name = name
+        self.timeout = timeout
+        self.max_attempts = max(1, max_attempts)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = breaker
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_delay = hedge_min_delay
+        self.hedge_min_samples = hedge_min_samples
+        self.limiter = limiter
+        self.calls = 0
+        self.retries = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self._latencies: Dict[str, Deque[float]] = {}
+
+    def _attempt_timeout(self) -> tuple:
+        """(timeout, whether the request deadline cut it below the configured one)"""
+        timeout = upstream_timeout(self.timeout)
+        return timeout, timeout < self.timeout
+
+    def _backoff(self, attempt: int) -> float:
+        # Full jitter, so clients that failed together do not retry together
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def _record_latency(self, call: str, seconds: float):
+        window = self._latencies.get(call)
+        if window is None:
+            window = self._latencies[call] = deque(maxlen=_LATENCY_WINDOW)
+        window.append(seconds)
+
+    def hedge_delay(self, call: str) -> Optional[float]:
+        """How long to wait for the first request before sending a hedge; None until enough latencies are known"""
+        window = self._latencies.get(call)
+        if not self.hedge or window is None or len(window) < self.hedge_min_samples:
+            return None
+        ordered = sorted(window)
+        return max(self.hedge_min_delay, ordered[min(len(ordered) - 1, int(len(ordered) * self.hedge_quantile))])
+
+    async def _reserve(self, tokens: int) -> int:
+        return await self.limiter.acquire(tokens) if self.limiter is not None and tokens else 0
+
+    def _settle(self, reserved: int, used: Optional[int]):
+        # Unknown usage keeps the reservation as the best guess
+        if reserved:
+            self.limiter.settle(reserved, reserved if used is None else used)
+
+    async def _attempt(self, fn: Callable[[float], Awaitable[T]], call: str, tokens: int = 0) -> T:
+        """One request to the upstream, bounded by its timeout and recorded in the breaker"""
+        self.breaker.before_call()
+        try:
+            reserved = await self._reserve(tokens)
+        except BaseException:
+            self.breaker.release()
+            raise
+        timeout, cut = self._attempt_timeout()
+        start = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(fn(timeout), timeout)
+        except Exception as e:
+            self._settle(reserved, 0)
+            if cut and isinstance(e, (TimeoutError, TavilyTimeoutError, openai.APITimeoutError)):
+                # Out of request time, not an upstream failure
+                self.breaker.release()
+                raise DeadlineExceeded(f"Request deadline passed during the {self.name} call") from e
+            if is_transient(e):
+                self.breaker.record_failure()
+            else:
+                # The upstream answered, it just refused this request
+                self.breaker.record_success()
+            raise
+        except BaseException:
+            self._settle(reserved, 0)
+            self.breaker.release()
+            raise
+        self._settle(reserved, used_tokens(result))
+        self.breaker.record_success()
+        self._record_latency(call, time.perf_counter() - start)
+        return result
+
+    async def _hedged_attempt(self, fn: Callable[[float], Awaitable[T]], call: str, tokens: int = 0) -> T:
+        delay = self.hedge_delay(call)
+        if delay is None:
+            return await self._attempt(fn, call, tokens)
+
+        first = asyncio.ensure_future(self._attempt(fn, call, tokens))
+        started = [first]
+        tasks = {first}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done and self.breaker.state == CLOSED:
+                self.hedges += 1
+                upstream_hedges.inc(upstream=self.name)
+                started.append(asyncio.ensure_future(self._attempt(fn, call, tokens)))
+                tasks.add(started[-1])
+            # The first success wins; a failure only counts once no request is left
+            error = None
+            while tasks:
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not first:
+                            self.hedge_wins += 1
+                            upstream_hedge_wins.inc(upstream=self.name)
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in started:
+                if not task.done():
+                    task.cancel()
+                elif not task.cancelled():
+                    # Mark the loser's failure as seen so asyncio does not log it
+                    task.exception()
+
+    async def call(self, fn: Callable[[float], Awaitable[T]], call: str, tokens: int = 0) -> T:
+        """
+        Result of fn(timeout), retried on transient failures; raises CircuitOpenError while the circuit is open.
+        `tokens` is the call's expected usage, reserved from the token limiter for every request made.
+        """
+        self.calls += 1
+        for attempt in range(self.max_attempts):
+            try:
+                return await self._hedged_attempt(fn, call, tokens)
+            except Exception as e:
+                # Once the failure has opened the circuit a retry would only be rejected
+                if attempt + 1 >= self.max_attempts or not is_transient(e) or self.breaker.state == OPEN:
+                    raise
+                delay = self._backoff(attempt)
+                left = time_left()
+                if left is not None and left <= delay:
+                    raise
+                self.retries += 1
+                upstream_retries.inc(upstream=self.name)
+                logger.warning(f"{self.name} call {call} failed ({type(e).__name__}), retry {attempt + 1} in {delay:.2f}s")
+                await asyncio.sleep(delay)
+
+    async def stream(self, fn: Callable[[float], AsyncIterator[T]], call: str, tokens: int = 0) -> AsyncIterator[T]:
+        """
+        Chunks of the stream fn(timeout) returns. A stream that fails before its first chunk is retried like
+        call(); once chunks have been passed on a failure is raised, since the caller has already used them.
+        Streams are never hedged.
+        """
+        self.calls += 1
+        for attempt in range(self.max_attempts):
+            self.breaker.before_call()
+            try:
+                reserved = await self._reserve(tokens)
+            except BaseException:
+                self.breaker.release()
+                raise
+            timeout, _ = self._attempt_timeout()
+            started = False
+            used = None
+            try:
+                async for chunk in fn(timeout):
+                    if not started:
+                        started = True
+                        self.breaker.record_success()
+                    used = used_tokens(chunk) or used
+                    yield chunk
+                if not started:
+                    self.breaker.record_success()
+                self._settle(reserved, used)
+                return
+            except Exception as e:
+                self._settle(reserved, used if started else 0)
+                if started:
+                    raise
+                if is_transient(e):
+                    self.breaker.record_failure()
+                else:
+                    self.breaker.record_success()
+                if attempt + 1 >= self.max_attempts or not is_transient(e) or self.breaker.state == OPEN:
+                    raise
+                self.retries += 1
+                upstream_retries.inc(upstream=self.name)
+                logger.warning(f"{self.name} stream {call} failed before its first chunk ({type(e).__name__}), retrying")
+                await asyncio.sleep(self._backoff(attempt))
+            except BaseException:
+                self._settle(reserved, used if started else 0)
+                if not started:
+                    self.breaker.release()
+                raise
+
+    def stats(self) -> dict:
+        return {
+            "circuit": self.breaker.stats(),
+            "calls": self.calls,
+            "retries": self.retries,
+            "hedging": self.hedge,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "hedge_delays": {call: self.hedge_delay(call) for call in sorted(self._latencies)} if self.hedge else {}
+        }
+
+
+_guards: Dict[str, UpstreamGuard] = {}
+
+
+def create_upstream_guard(name: str, timeout: float, limiter: Optional[TokenRateLimiter] = None) -> UpstreamGuard:
+    """
+    The guard for one upstream, configured from the UPSTREAM_* and CIRCUIT_* settings; hedging is on for the
+    upstreams listed in UPSTREAM_HEDGE. Its counters appear in upstream_guard_stats().
+    """
+    config = Config()
+    guard = UpstreamGuard(
+        name,
+        timeout=timeout,
+        max_attempts=config.upstream_max_attempts,
+        backoff_base=config.upstream_backoff_base,
+        backoff_max=config.upstream_backoff_max,
+        breaker=CircuitBreaker(name, config.circuit_failure_rate, config.circuit_window, config.circuit_min_calls,
+                               config.circuit_reset_timeout),
+        hedge=name in config.upstream_hedge,
+        hedge_quantile=config.hedge_quantile,
+        hedge_min_delay=config.hedge_min_delay,
+        hedge_min_samples=config.hedge_min_samples,
+        limiter=limiter
+    )
+    _guards[name] = guard
+    return guard
+
+
+def upstream_guard_stats() -> Dict[str, dict]:
+    return {name: guard.stats() for name, guard in _guards.items()}
@@ -1,52 +1,153 @@
+import asyncio
 import logging
+import time
+from typing import AsyncIterator, List, Optional
 
 from fastapi import HTTPException
 
-from langchain_openai import ChatOpenAI
-from langchain.prompts import ChatPromptTemplate
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
 
-from com.mhire.app.config.config import Config
+from com.mhire.app.clients.clients import ClientRegistry, get_client_registry
+from com.mhire.app.metrics.metrics import observe_stage, timed
+from com.mhire.app.prompts.prompts import get_prompt
+from com.mhire.app.prompts.token_budget import (
+    check_prompt_budget, completion_budget, expected_call_tokens, usage_tracker
+)
+from com.mhire.app.services.ai_coach.coach_semantic_cache import CacheLookup, create_coach_semantic_cache
+from com.mhire.app.services.ai_coach.conversation_memory import (
+    ConversationSession, ConversationTurn, create_conversation_store, fallback_summary
+)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class AICoach:
-    def __init__(self):
+    def __init__(self, clients: Optional[ClientRegistry] = None):
         try:
-            config = Config()
-            self.llm = ChatOpenAI(
-                openai_api_key=config.openai_api_key,
-                model=config.model_name,
-                temperature=1
-            )
+            clients = clients or get_client_registry()
+            self.llm = clients.chat_llm(temperature=1)
+            self.summary_llm = clients.chat_llm(temperature=0)
+            self.openai_guard = clients.openai_guard
+            self.answer_cache = create_coach_semantic_cache()
+            self.sessions = create_conversation_store()
         except Exception as e:
             logger.error(f"Error initializing AICoach: {str(e)}")
             raise HTTPException(status_code=500, detail=f"Failed to initialize AI Coach: {str(e)}")
 
-    async def chat(self, user_message: str) -> str:
+    def _build_messages(self, user_message: str, session: Optional[ConversationSession] = None):
+        messages = [SystemMessage(content=get_prompt("ai_coach.system").text)]
+        if session is not None:
+            if session.summary:
+                messages.append(SystemMessage(content=get_prompt("ai_coach.history").render(summary=session.summary)))
+            for turn in session.turns:
+                messages += [HumanMessage(content=turn.user), AIMessage(content=turn.assistant)]
+        messages.append(HumanMessage(content=user_message))
+        check_prompt_budget("ai_coach.chat", *(message.content for message in messages))
+        return messages
+
+    def _cache_lookup(self, user_message: str, session: Optional[ConversationSession]) -> Optional[CacheLookup]:
+        # Stored answers only fit an opening question; later turns depend on the conversation
+        if self.answer_cache is None or (session is not None and not session.is_empty):
+            return None
+        with timed("ai_coach.cache_lookup"):
+            return self.answer_cache.lookup(user_message)
+
+    async def chat(self, user_message: str, session: Optional[ConversationSession] = None) -> str:
+        """Reply to a message, continuing the session's conversation when one is given"""
         try:
-            # Define the base system prompt for a friendly AI gym coach
-            system_prompt = """You are a friendly and supportive AI gym coach named Coach AI. Your role is to:
-            1. Provide helpful fitness and nutrition advice in a conversational, friendly manner
-            2. Naturally incorporate motivational encouragement in your responses
-            3. Answer health-related questions clearly while maintaining a supportive tone
-            4. Give scientifically-backed recommendations in an easy-to-understand way
-            5. Be empathetic and understanding while helping users achieve their fitness goals
-            
-            Always maintain a friendly, conversational tone while being helpful and professional."""
-
-            # Create the chat prompt
-            prompt = ChatPromptTemplate.from_messages([
-                ("system", system_prompt),
-                ("human", user_message)
-            ])
-
-            # Get the response from the model
-            response = self.llm.invoke(prompt.format_messages())
-            
-            return response.content
+            lookup = self._cache_lookup(user_message, session)
+            if lookup is not None and lookup.answer is not None and not self.answer_cache.should_verify(lookup):
+                reply = lookup.answer
+            else:
+                # Get the response from the model
+                messages = self._build_messages(user_message, session)
+                with timed("ai_coach.llm", upstream="openai"):
+                    response = await self.openai_guard.call(
+                        lambda timeout: self.llm.ainvoke(messages, timeout=timeout, **completion_budget("ai_coach.chat")),
+                        call="ai_coach.chat",
+                        tokens=expected_call_tokens("ai_coach.chat", *(message.content for message in messages))
+                    )
+                usage_tracker.record_langchain("ai_coach.chat", response)
+                reply = response.content
+
+                if lookup is not None:
+                    if lookup.answer is not None:
+                        # A sampled hit: the cached answer stays, the fresh one only feeds the precision estimate
+                        self.answer_cache.record_verification(lookup.answer, reply)
+                        reply = lookup.answer
+                    else:
+                        self.answer_cache.store(user_message, reply, lookup.vector)
 
         except Exception as e:
             logger.error(f"Error getting AI response: {str(e)}")
-            raise HTTPException(status_code=500, detail=f"Failed to get AI response: {str(e)}")
\ No newline at end of file
+            raise HTTPException(status_code=500, detail=f"Failed to get AI response: {str(e)}")
+
+        if session is not None:
+            self.remember(session, user_message, reply)
+        return reply
+
+    async def stream_chat(self, user_message: str, session: Optional[ConversationSession] = None) -> AsyncIterator[str]:
+        """Yield response tokens as the model produces them; a cached answer is sent as a single chunk"""
+        try:
+            lookup = self._cache_lookup(user_message, session)
+            if lookup is not None and lookup.answer is not None:
+                tokens = [lookup.answer]
+                yield lookup.answer
+            else:
+                messages = self._build_messages(user_message, session)
+                tokens = []
+                start = time.perf_counter()
+                with timed("ai_coach.stream", upstream="openai"):
+                    chunks = self.openai_guard.stream(
+                        lambda timeout: self.llm.astream(messages, timeout=timeout, **completion_budget("ai_coach.chat")),
+                        call="ai_coach.chat",
+                        tokens=expected_call_tokens("ai_coach.chat", *(message.content for message in messages))
+                    )
+                    async for chunk in chunks:
+                        if chunk.usage_metadata:
+                            usage_tracker.record_langchain("ai_coach.chat", chunk)
+                        if chunk.content:
+                            if not tokens:
+                                observe_stage("ai_coach.first_token", time.perf_counter() - start)
+                            tokens.append(chunk.content)
+                            yield chunk.content
+                if lookup is not None:
+                    self.answer_cache.store(user_message, "".join(tokens), lookup.vector)
+        except Exception as e:
+            logger.error(f"Error streaming AI response: {str(e)}")
+            raise HTTPException(status_code=500, detail=f"Failed to stream AI response: {str(e)}")
+
+        if session is not None:
+            self.remember(session, user_message, "".join(tokens))
+
+    def remember(self, session: ConversationSession, user_message: str, reply: str):
+        """Add a finished turn to the session and start rolling old turns into its summary when over the cap"""
+        overflow = self.sessions.record_turn(session, user_message, reply)
+        if overflow and (session.compaction is None or session.compaction.done()):
+            session.compaction = asyncio.create_task(self._compact(session, overflow))
+
+    async def _compact(self, session: ConversationSession, turns: List[ConversationTurn]):
+        cap = self.sessions.summary_token_cap
+        try:
+            prompt = get_prompt("ai_coach.summary").render(
+                max_words=cap * 3 // 4,
+                summary=session.summary or "None yet",
+                turns="\n".join(f"User: {turn.user}\nCoach: {turn.assistant}" for turn in turns)
+            )
+            check_prompt_budget("ai_coach.summary", prompt)
+            with timed("ai_coach.summary_llm", upstream="openai"):
+                response = await self.openai_guard.call(
+                    lambda timeout: self.summary_llm.ainvoke(
+                        prompt, timeout=timeout, **{"max_completion_tokens": cap, **completion_budget("ai_coach.summary")}
+                    ),
+                    call="ai_coach.summary",
+                    tokens=expected_call_tokens("ai_coach.summary", prompt)
+                )
+            usage_tracker.record_langchain("ai_coach.summary", response)
+            summary = response.content
+        except Exception as e:
+            logger.warning(f"Error summarizing coach session {session.session_id}, keeping a plain summary: {str(e)}")
+            self.sessions.summary_failures += 1
+            summary = fallback_summary(session.summary, turns, cap)
+        self.sessions.apply_summary(session, len(turns), summary)
@@ -1,7 +1,12 @@
+import hashlib
+import json
 import logging
+import time
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
 
+from com.mhire.app.cache.single_flight import create_single_flight
 from com.mhire.app.services.ai_coach.ai_coach import AICoach
 from .ai_coach_schema import ChatRequest, ChatResponse
 
@@ -15,17 +20,86 @@ router = APIRouter(
     responses={404: {"description": "Not found"}}
 )
 
-# Initialize AI Coach
-ai_coach = AICoach()
+chat_flights = create_single_flight("coach_chat")
+
+def get_ai_coach(request: Request) -> AICoach:
+    """AI Coach built once in the app lifespan on the shared client registry"""
+    return request.app.state.ai_coach
 
 @router.post("/chat", response_model=ChatResponse)
-async def chat_with_coach(request: ChatRequest):
+async def chat_with_coach(request: ChatRequest, response: Response, ai_coach: AICoach = Depends(get_ai_coach)):
     """
-    Chat with the friendly AI fitness coach for personalized guidance and motivation
+    Chat with the friendly AI fitness coach for personalized guidance and motivation.
+    Send the returned `session_id` with the next message to continue the conversation.
+    Concurrent opening messages that are exactly the same share one reply.
     """
     try:
-        response = await ai_coach.chat(request.message)
-        return ChatResponse(response=response)
+        session = ai_coach.sessions.open(request.session_id)
+        shared = False
+        if session.is_empty:
+            message_key = hashlib.sha256(request.message.encode("utf-8")).hexdigest()
+            reply, shared = await chat_flights.do(message_key, lambda: ai_coach.chat(request.message))
+            ai_coach.remember(session, request.message, reply)
+        else:
+            reply = await ai_coach.chat(request.message, session)
+        response.headers["X-Coalesced"] = "true" if shared else "false"
+        return ChatResponse(response=reply, session_id=session.session_id)
     except Exception as e:
         logger.error(f"Error in chat endpoint: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/chat/stream")
+async def stream_chat_with_coach(request: ChatRequest, ai_coach: AICoach = Depends(get_ai_coach)):
+    """
+    Stream the coach's reply as newline-delimited JSON events:
+    {"type": "token", "content": ...} per token, then
+    {"type": "done", "session_id": ..., "time_to_first_token_ms": ..., "total_ms": ...}
+    or {"type": "error", "detail": ...} if the model fails mid-stream
+    """
+    session = ai_coach.sessions.open(request.session_id)
+
+    async def event_stream():
+        start = time.perf_counter()
+        time_to_first_token = None
+        try:
+            async for token in ai_coach.stream_chat(request.message, session):
+                if time_to_first_token is None:
+                    time_to_first_token = (time.perf_counter() - start) * 1000
+                    logger.info(f"Coach stream time to first token: {time_to_first_token:.0f} ms")
+                yield json.dumps({"type": "token", "content": token}) + "\n"
+            yield json.dumps({
+                "type": "done",
+                "session_id": session.session_id,
+                "time_to_first_token_ms": time_to_first_token,
+                "total_ms": (time.perf_counter() - start) * 1000
+            }) + "\n"
+        except HTTPException as e:
+            logger.error(f"Error in chat stream endpoint: {e.detail}")
+            yield json.dumps({"type": "error", "detail": e.detail}) + "\n"
+
+    return StreamingResponse(event_stream(), media_type="application/x-ndjson")
+
+@router.get("/cache/stats")
+async def coach_cache_stats(ai_coach: AICoach = Depends(get_ai_coach)):
+    """
+    Exact/semantic hit counters, estimated precision and size of the coach answer cache
+    """
+    if ai_coach.answer_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **ai_coach.answer_cache.stats()}
+
+@router.delete("/sessions/{session_id}")
+async def delete_coach_session(session_id: str, ai_coach: AICoach = Depends(get_ai_coach)):
+    """
+    Forget a conversation's history and summary
+    """
+    if not ai_coach.sessions.delete(session_id):
+        raise HTTPException(status_code=404, detail="Session not found")
+    return {"deleted": session_id}
+
+@router.get("/sessions/stats")
+async def coach_session_stats(ai_coach: AICoach = Depends(get_ai_coach)):
+    """
+    Live sessions, stored turns, memory use against the budget, evictions and summary compactions
+    """
+    return ai_coach.sessions.stats()
\ No newline at end of file
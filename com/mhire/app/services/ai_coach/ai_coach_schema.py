@@ -1,7 +1,12 @@
-from pydantic import BaseModel
+from typing import Optional
+
+from pydantic import BaseModel, Field
 
 class ChatRequest(BaseModel):
     message: str
+    # Continue this conversation; omitted (or unknown) starts a new one
+    session_id: Optional[str] = Field(None, max_length=64)
 
 class ChatResponse(BaseModel):
-    response: str
\ No newline at end of file
+    response: str
+    session_id: Optional[str] = None
\ No newline at end of file
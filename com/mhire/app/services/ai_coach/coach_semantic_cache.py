@@ -0,0 +1,294 @@
+import random
+import re
+import time
+import zlib
+from typing import Dict, FrozenSet, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from com.mhire.app.config.config import Config
+from com.mhire.app.metrics.metrics import register_cache
+
+_TOKEN = re.compile(r"[a-z]+|\d+(?:\.\d+)?")
+_NUMBER = re.compile(r"\d+(?:\.\d+)?")
+
+# Words that carry no meaning for matching coaching questions; "in" is kept, "protein in an egg" asks about a food
+_STOPWORDS = frozenset(
+    "a an the i im i'm me my we our you your it its is are am was were be been do does did can could should would "
+    "will shall to of on at for with about from by and or if so what how much many which when why who "
+    "there this that these those just really some any get got tell give please hi hey coach per each "
+    # Intake verbs only frame a quantity question: "how much protein should I eat" asks what "protein per day?" does
+    "eat eats eating ate intake consume need needs needed".split()
+)
+# Domain wording that means the same thing, mapped to one token before hashing
+_SYNONYMS = {
+    "daily": "day", "everyday": "day",
+    "gram": "g", "grams": "g", "kilo": "kg", "kilos": "kg", "pounds": "lb", "lbs": "lb",
+    "workout": "train", "training": "train", "exercise": "train", "exercising": "train", "gym": "train",
+    "lift": "train", "lifting": "train", "weights": "train", "running": "cardio", "run": "cardio",
+    "lose": "loss", "losing": "loss", "cut": "loss", "cutting": "loss", "bulk": "gain", "bulking": "gain",
+    "build": "gain", "building": "gain", "recovery": "rest", "recover": "rest", "sore": "soreness",
+    "doms": "soreness", "aching": "soreness", "hydration": "water", "drink": "water", "carbohydrate": "carb",
+    "kcal": "calorie", "often": "frequency", "times": "frequency", "weekly": "week",
+    "motivated": "motivation", "motivate": "motivation", "safety": "safe", "meal": "food"
+}
+# Words that turn a question into its opposite ("should I (not) train when sore")
+_NEGATIONS = frozenset(
+    "not no never without cannot cant dont doesnt didnt isnt arent wasnt shouldnt wont wouldnt couldnt".split()
+)
+# Words that set the direction of a question on one axis; two questions only match with the same directions,
+# so "protein to lose weight" never answers "protein to gain weight"
+_DIRECTIONS = {
+    **dict.fromkeys("lose losing loss lost cut cutting burn burning shed shedding drop deficit rid".split(), ("goal", "down")),
+    **dict.fromkeys("gain gaining bulk bulking build building grow growing growth surplus".split(), ("goal", "up")),
+    **dict.fromkeys("before pre".split(), ("timing", "before")),
+    **dict.fromkeys("after post".split(), ("timing", "after")),
+    **dict.fromkeys("empty fasted fasting".split(), ("stomach", "empty")),
+    **dict.fromkeys("full fed".split(), ("stomach", "full")),
+    **dict.fromkeys("morning am".split(), ("time_of_day", "morning")),
+    **dict.fromkeys("night evening bedtime pm".split(), ("time_of_day", "night")),
+    **dict.fromkeys("more increase increasing raise".split(), ("amount", "more")),
+    **dict.fromkeys("less fewer decrease decreasing reduce reducing".split(), ("amount", "less")),
+    **dict.fromkeys("low lower".split(), ("level", "low")),
+    **dict.fromkeys("high higher".split(), ("level", "high")),
+    **dict.fromkeys("heavy heavier".split(), ("load", "heavy")),
+    **dict.fromkeys("light lighter".split(), ("load", "light")),
+    **dict.fromkeys("hot warm".split(), ("temperature", "hot")),
+    "cold": ("temperature", "cold")
+}
+# Words that narrow a question to a group, injury, condition or situation the general answer may not cover
+# ("is creatine safe for teenagers", "knee pain" vs "back pain"), mapped to one form; two questions only match
+# with the same qualifiers. Matched on normalized words, so "running" is "cardio" and "teenagers" is "teenager"
+_QUALIFIERS = {
+    **dict.fromkeys("teen teenager adolescent kid child children youth".split(), "teenager"),
+    **dict.fromkeys("senior elderly older".split(), "senior"),
+    **dict.fromkeys("beginner novice".split(), "beginner"),
+    "advanced": "advanced",
+    **dict.fromkeys("pregnant pregnancy".split(), "pregnant"),
+    **dict.fromkeys("breastfeeding nursing postpartum".split(), "breastfeeding"),
+    **dict.fromkeys("pain painful hurt injury injured".split(), "pain"),
+    **{part: part for part in "knee back shoulder hip wrist ankle neck elbow foot".split()},
+    **{condition: condition for condition in "asthma arthritis hernia pcos thyroid cholesterol anemia".split()},
+    **dict.fromkeys("diabetes diabetic".split(), "diabetes"),
+    **dict.fromkeys("hypertension pressure heart".split(), "heart"),
+    **dict.fromkeys("vegan vegetarian".split(), "vegetarian"),
+    "sick": "sick",
+    **{goal: goal for goal in "strength endurance powerlifting marathon".split()},
+    "cardio": "cardio"
+}
+
+
+def _words(text: str) -> List[str]:
+    words = []
+    for word in _TOKEN.findall(text.lower()):
+        if word in _STOPWORDS:
+            continue
+        word = _SYNONYMS.get(word, word)
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            word = _SYNONYMS.get(word[:-1], word[:-1])
+        if word:
+            words.append(word)
+    return words
+
+
+class _MatchKey(NamedTuple):
+    """What two messages must share, beyond embedding similarity, for one's answer to serve the other"""
+    numbers: Tuple[str, ...]
+    negated: bool
+    directions: FrozenSet[Tuple[str, str]]
+    qualifiers: FrozenSet[str]
+
+
+def _match_key(text: str) -> _MatchKey:
+    # Contractions are joined ("don't" -> "dont") so the negation is not split off
+    text = text.lower().replace("'", "").replace("\u2019", "")
+    raw = _TOKEN.findall(text)
+    return _MatchKey(
+        numbers=tuple(_NUMBER.findall(text)),
+        negated=any(word in _NEGATIONS for word in raw),
+        directions=frozenset(_DIRECTIONS[word] for word in raw if word in _DIRECTIONS),
+        qualifiers=frozenset(_QUALIFIERS[word] for word in _words(text) if word in _QUALIFIERS)
+    )
+
+
+def _mismatch(key: _MatchKey, other: _MatchKey) -> Optional[str]:
+    """Why a stored answer cannot serve a message despite a similar embedding, or None when it can"""
+    if key.numbers != other.numbers:
+        return "numbers"
+    if key.negated != other.negated:
+        return "negation"
+    if key.directions != other.directions:
+        return "direction"
+    # A qualifier ("for teenagers", "with knee pain") narrows the question to one the answer may not cover
+    if key.qualifiers != other.qualifiers:
+        return "qualifier"
+    return None
+
+
+def _features(text: str) -> List[Tuple[str, float]]:
+    """Weighted features: normalized words, adjacent word pairs, and character trigrams for spelling variants"""
+    words = _words(text)
+    features = [(word, 1.0) for word in words]
+    features += [(f"{first} {second}", 0.5) for first, second in zip(words, words[1:])]
+    features += [(f"#{word[i:i + 3]}", 0.2) for word in words if len(word) > 3 for i in range(len(word) - 2)]
+    return features
+
+
+def embed(text: str, dim: int) -> np.ndarray:
+    """Unit-length signed hashing embedding; dim must be a power of two"""
+    vector = np.zeros(dim, dtype=np.float32)
+    for feature, weight in _features(text):
+        # crc32 is stable across processes, unlike hash()
+        code = zlib.crc32(feature.encode("utf-8"))
+        vector[code & (dim - 1)] += weight if code & 0x80000000 else -weight
+    norm = float(np.linalg.norm(vector))
+    return vector / norm if norm else vector
+
+
+class CacheLookup(NamedTuple):
+    answer: Optional[str]
+    similarity: float
+    exact: bool
+    vector: np.ndarray
+
+
+class CoachSemanticCache:
+    """
+    Stored coach answers looked up by cosine similarity of hashed message embeddings.
+    Vectors live in one preallocated matrix, so a lookup is a single matrix-vector product; the least recently
+    used slot is overwritten when the cache is full. A similar embedding is not enough for a hit: the messages
+    must also have the same numbers ("I weigh 60 kg" vs "80 kg"), both or neither be negated, ask in the same
+    direction (lose vs gain, before vs after) and name the same narrowing qualifiers, so a question about a
+    group, injury or condition ("is creatine safe for teenagers") never gets the general answer.
+    """
+
+    def __init__(self, max_entries: int, threshold: float, ttl: float, dim: int = 512, verify_rate: float = 0.0):
+        if dim & (dim - 1):
+            raise ValueError("Embedding dimension must be a power of two")
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self.ttl = ttl
+        self.dim = dim
+        # Share of semantic hits that are still answered by the model to estimate the cache's precision
+        self.verify_rate = verify_rate
+
+        self._vectors = np.zeros((max_entries, dim), dtype=np.float32)
+        self._last_used = np.zeros(max_entries, dtype=np.float64)
+        self._expires_at = np.zeros(max_entries, dtype=np.float64)
+        self._messages: List[Optional[str]] = [None] * max_entries
+        self._answers: List[Optional[str]] = [None] * max_entries
+        self._keys: List[Optional[_MatchKey]] = [None] * max_entries
+        self._size = 0
+
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.verified = 0
+        self.confirmed = 0
+        self.guard_misses: Dict[str, int] = {"numbers": 0, "negation": 0, "direction": 0, "qualifier": 0}
+        self._hit_similarity = 0.0
+
+    def lookup(self, message: str) -> CacheLookup:
+        """Cached answer for a close enough message (answer is None on a miss) and the message embedding"""
+        vector = embed(message, self.dim)
+        if not self._size or not vector.any():
+            self.misses += 1
+            return CacheLookup(None, 0.0, False, vector)
+
+        now = time.time()
+        similarities = self._vectors[:self._size] @ vector
+        # Expired slots can never win; they are reused by the next store
+        similarities[self._expires_at[:self._size] <= now] = -1.0
+        best = float(similarities.max())
+        # Most similar first; a candidate asking something different is passed over for the next one
+        candidates = np.flatnonzero(similarities >= self.threshold)
+        key = _match_key(message) if candidates.size else None
+        slot = None
+        for candidate in candidates[np.argsort(-similarities[candidates])]:
+            reason = _mismatch(key, self._keys[candidate])
+            if reason is None:
+                slot = int(candidate)
+                break
+            self.guard_misses[reason] += 1
+        if slot is None:
+            self.misses += 1
+            return CacheLookup(None, best, False, vector)
+        similarity = float(similarities[slot])
+
+        self._last_used[slot] = now
+        exact = self._messages[slot] == message
+        if exact:
+            self.exact_hits += 1
+        else:
+            self.semantic_hits += 1
+            self._hit_similarity += similarity
+        return CacheLookup(self._answers[slot], similarity, exact, vector)
+
+    def should_verify(self, lookup: CacheLookup) -> bool:
+        """Whether a semantic hit should be re-answered by the model for the precision estimate"""
+        return not lookup.exact and self.verify_rate > 0 and random.random() < self.verify_rate
+
+    def record_verification(self, cached_answer: str, fresh_answer: str, agreement_threshold: float = 0.5):
+        """Count a sampled hit as confirmed when the fresh answer covers the same ground as the cached one"""
+        self.verified += 1
+        if float(embed(cached_answer, self.dim) @ embed(fresh_answer, self.dim)) >= agreement_threshold:
+            self.confirmed += 1
+
+    def store(self, message: str, answer: str, vector: Optional[np.ndarray] = None):
+        if vector is None:
+            vector = embed(message, self.dim)
+        if not vector.any() or not answer:
+            return
+        now = time.time()
+        if self._size < self.max_entries:
+            slot = self._size
+            self._size += 1
+        else:
+            # Reuse an expired slot before evicting the least recently used live entry
+            expired = np.flatnonzero(self._expires_at <= now)
+            slot = int(expired[0]) if expired.size else int(np.argmin(self._last_used))
+        self._vectors[slot] = vector
+        self._last_used[slot] = now
+        self._expires_at[slot] = now + self.ttl
+        self._messages[slot] = message
+        self._answers[slot] = answer
+        self._keys[slot] = _match_key(message)
+
+    def __len__(self) -> int:
+        return int(np.count_nonzero(self._expires_at[:self._size] > time.time()))
+
+    def stats(self) -> dict:
+        hits = self.exact_hits + self.semantic_hits
+        lookups = hits + self.misses
+        return {
+            "exact_hits": self.exact_hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "mean_semantic_similarity": self._hit_similarity / self.semantic_hits if self.semantic_hits else None,
+            "verified_hits": self.verified,
+            "confirmed_hits": self.confirmed,
+            # Estimated share of semantic hits whose cached answer a fresh generation agrees with
+            "precision": self.confirmed / self.verified if self.verified else None,
+            # Candidates above the threshold rejected because they ask something different, by reason
+            "guard_misses": dict(self.guard_misses),
+            "threshold": self.threshold,
+            "size": len(self),
+            "max_entries": self.max_entries
+        }
+
+
+def create_coach_semantic_cache() -> Optional[CoachSemanticCache]:
+    """The coach's answer cache, or None unless COACH_SEMANTIC_CACHE_ENABLED=true"""
+    config = Config()
+    if not config.coach_semantic_cache_enabled:
+        return None
+    cache = CoachSemanticCache(
+        max_entries=config.coach_semantic_cache_max_entries,
+        threshold=config.coach_semantic_cache_threshold,
+        ttl=config.coach_semantic_cache_ttl,
+        dim=config.coach_semantic_cache_dim,
+        verify_rate=config.coach_semantic_cache_verify_rate
+    )
+    register_cache("coach_answers", lambda: (cache.exact_hits + cache.semantic_hits, cache.misses))
+    return cache
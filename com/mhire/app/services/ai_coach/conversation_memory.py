@@ -0,0 +1,186 @@
+import asyncio
+import time
+import uuid
+from collections import OrderedDict, deque
+from typing import Deque, List, NamedTuple, Optional
+
+from com.mhire.app.config.config import Config
+from com.mhire.app.prompts.token_budget import estimate_tokens
+
+# Rough per-object overhead added to the text size when accounting a session's memory
+_TURN_OVERHEAD_BYTES = 160
+_SESSION_OVERHEAD_BYTES = 1024
+# Once over the cap, history is compacted down to this share of it, so summaries run every few turns, not every turn
+_LOW_WATER = 0.5
+
+
+class ConversationTurn(NamedTuple):
+    user: str
+    assistant: str
+    tokens: int
+
+
+class ConversationSession:
+    """
+    One conversation: the most recent turns verbatim plus a running summary of everything before them.
+    Turns past the token cap stay in the buffer until their summary is ready, so a slow summary never
+    loses context; they are then dropped together.
+    """
+
+    def __init__(self, session_id: str):
+        self.session_id = session_id
+        self.turns: Deque[ConversationTurn] = deque()
+        self.summary = ""
+        self.history_tokens = 0
+        self.turn_count = 0
+        self.size_bytes = _SESSION_OVERHEAD_BYTES
+        self.last_active = time.time()
+        self.compaction: Optional[asyncio.Task] = None
+
+    @property
+    def is_empty(self) -> bool:
+        return not self.turns and not self.summary
+
+    def add_turn(self, user: str, assistant: str) -> int:
+        """Append a turn and return the change in the session's accounted size"""
+        turn = ConversationTurn(user, assistant, estimate_tokens(user, assistant))
+        self.turns.append(turn)
+        self.history_tokens += turn.tokens
+        self.turn_count += 1
+        self.last_active = time.time()
+        added = len(user) + len(assistant) + _TURN_OVERHEAD_BYTES
+        self.size_bytes += added
+        return added
+
+    def overflow(self, token_cap: int, max_turns: int) -> List[ConversationTurn]:
+        """Oldest turns to roll into the summary once over the token cap or turn limit; the newest always stays"""
+        tokens, count = self.history_tokens, len(self.turns)
+        if tokens <= token_cap and count <= max_turns:
+            return []
+        token_cap, max_turns = token_cap * _LOW_WATER, max(1, int(max_turns * _LOW_WATER))
+        overflow = []
+        for turn in self.turns:
+            if count <= 1 or (tokens <= token_cap and count <= max_turns):
+                break
+            overflow.append(turn)
+            tokens -= turn.tokens
+            count -= 1
+        return overflow
+
+    def replace_with_summary(self, turns: int, summary: str) -> int:
+        """Drop the oldest `turns` turns in favour of a new summary and return the change in accounted size"""
+        change = len(summary) - len(self.summary)
+        for _ in range(turns):
+            turn = self.turns.popleft()
+            self.history_tokens -= turn.tokens
+            change -= len(turn.user) + len(turn.assistant) + _TURN_OVERHEAD_BYTES
+        self.summary = summary
+        self.size_bytes += change
+        return change
+
+
+class ConversationStore:
+    """In-process session registry; idle sessions expire and the least recently active go first when over budget"""
+
+    def __init__(self, max_turns: int, history_token_cap: int, summary_token_cap: int,
+                 memory_budget_bytes: int, idle_ttl: float):
+        self.max_turns = max_turns
+        self.history_token_cap = history_token_cap
+        self.summary_token_cap = summary_token_cap
+        self.memory_budget_bytes = memory_budget_bytes
+        self.idle_ttl = idle_ttl
+        self.memory_bytes = 0
+        self.evicted_idle = 0
+        self.evicted_budget = 0
+        self.compactions = 0
+        self.summary_failures = 0
+        self._sessions: "OrderedDict[str, ConversationSession]" = OrderedDict()
+
+    def open(self, session_id: Optional[str] = None) -> ConversationSession:
+        """The session with this id, or a new one (under the given id, if any) when it is unknown or evicted"""
+        session = self._sessions.get(session_id) if session_id else None
+        if session is None or session.last_active + self.idle_ttl <= time.time():
+            if session is not None:
+                self._remove(session.session_id)
+                self.evicted_idle += 1
+            session = ConversationSession(session_id or uuid.uuid4().hex)
+            self._sessions[session.session_id] = session
+            self.memory_bytes += session.size_bytes
+            self._enforce_budget()
+        self._sessions.move_to_end(session.session_id)
+        session.last_active = time.time()
+        return session
+
+    def record_turn(self, session: ConversationSession, user: str, assistant: str) -> List[ConversationTurn]:
+        """Store a finished turn and return the turns that should now be rolled into the summary"""
+        added = session.add_turn(user, assistant)
+        # A session evicted while its reply was generated keeps working for this request but is no longer held
+        if self._sessions.get(session.session_id) is session:
+            self.memory_bytes += added
+            self._sessions.move_to_end(session.session_id)
+            self._enforce_budget()
+        return session.overflow(self.history_token_cap, self.max_turns)
+
+    def apply_summary(self, session: ConversationSession, turns: int, summary: str):
+        # Hard cap in case the model ignored the length limit
+        summary = summary.strip()[:self.summary_token_cap * 4]
+        change = session.replace_with_summary(turns, summary)
+        if self._sessions.get(session.session_id) is session:
+            self.memory_bytes += change
+        self.compactions += 1
+
+    def delete(self, session_id: str) -> bool:
+        return self._remove(session_id) is not None
+
+    def _remove(self, session_id: str) -> Optional[ConversationSession]:
+        session = self._sessions.pop(session_id, None)
+        if session is not None:
+            self.memory_bytes -= session.size_bytes
+        return session
+
+    def _enforce_budget(self):
+        now = time.time()
+        # Oldest activity first, so expired sessions are all at the front
+        while self._sessions:
+            session = next(iter(self._sessions.values()))
+            if session.last_active + self.idle_ttl <= now:
+                self.evicted_idle += 1
+            elif self.memory_bytes > self.memory_budget_bytes and len(self._sessions) > 1:
+                self.evicted_budget += 1
+            else:
+                break
+            self._remove(session.session_id)
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def stats(self) -> dict:
+        return {
+            "sessions": len(self._sessions),
+            "turns": sum(len(session.turns) for session in self._sessions.values()),
+            "memory_bytes": self.memory_bytes,
+            "memory_budget_bytes": self.memory_budget_bytes,
+            "evicted_idle": self.evicted_idle,
+            "evicted_budget": self.evicted_budget,
+            "compactions": self.compactions,
+            "summary_failures": self.summary_failures
+        }
+
+
+def fallback_summary(summary: str, turns: List[ConversationTurn], token_cap: int) -> str:
+    """Summary kept without the model: the user's questions, newest kept when over the cap"""
+    lines = [line for line in summary.splitlines() if line] + [f"- User asked: {turn.user[:200]}" for turn in turns]
+    while len(lines) > 1 and estimate_tokens("\n".join(lines)) > token_cap:
+        lines.pop(0)
+    return "\n".join(lines)
+
+
+def create_conversation_store() -> ConversationStore:
+    config = Config()
+    return ConversationStore(
+        max_turns=config.coach_session_max_turns,
+        history_token_cap=config.coach_history_token_cap,
+        summary_token_cap=config.coach_summary_token_cap,
+        memory_budget_bytes=int(config.coach_session_memory_budget_mb * 2 ** 20),
+        idle_ttl=config.coach_session_idle_ttl
+    )
@@ -0,0 +1,57 @@
+import asyncio
+import io
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Tuple
+
+from PIL import Image, ImageOps
+
+from com.mhire.app.config.config import Config
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Decoding and re-encoding photos is CPU bound, so it runs on a small dedicated pool
+# instead of the event loop
+_executor = ThreadPoolExecutor(max_workers=Config().image_workers, thread_name_prefix="image-preprocess")
+
+
+def _preprocess_sync(content: bytes, max_edge: int, image_format: str, quality: int) -> bytes:
+    """EXIF-orient, downscale to max_edge, drop metadata and re-encode"""
+    with Image.open(io.BytesIO(content)) as original:
+        image = ImageOps.exif_transpose(original)
+        image.thumbnail((max_edge, max_edge), Image.Resampling.LANCZOS)
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+
+        # Saving without exif/icc arguments writes a metadata-free file
+        output = io.BytesIO()
+        image.save(output, format=image_format, quality=quality, optimize=True)
+        return output.getvalue()
+
+
+async def run_in_image_pool(func, *args):
+    """Run a blocking image function on the bounded preprocessing pool"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, func, *args)
+
+
+async def preprocess_image(content: bytes, content_type: str) -> Tuple[bytes, str]:
+    """Shrink an uploaded photo before it is sent to the vision model; returns the new bytes and content type"""
+    config = Config()
+    if not config.image_preprocess_enabled:
+        return content, content_type
+
+    image_format = config.image_format.upper()
+    try:
+        processed = await run_in_image_pool(
+            _preprocess_sync, content, config.image_max_edge, image_format, config.image_quality
+        )
+    except Exception as e:
+        # Formats Pillow cannot decode are passed through untouched
+        logger.warning(f"Image preprocessing skipped: {str(e)}")
+        return content, content_type
+
+    logger.info(f"Image preprocessed: {len(content)} -> {len(processed)} bytes")
+    return processed, f"image/{image_format.lower()}"
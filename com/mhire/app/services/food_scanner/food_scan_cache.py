@@ -0,0 +1,107 @@
+import hashlib
+import io
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from PIL import Image
+
+from com.mhire.app.cache.cache import MemoryCache
+from com.mhire.app.config.config import Config
+from com.mhire.app.metrics.metrics import register_cache
+
+
+def image_fingerprint(content: bytes, perceptual: bool) -> Tuple[str, Optional[int]]:
+    """SHA-256 of the normalized bytes plus, optionally, a 64-bit dHash of the picture"""
+    content_hash = hashlib.sha256(content).hexdigest()
+    if not perceptual:
+        return content_hash, None
+
+    try:
+        with Image.open(io.BytesIO(content)) as image:
+            # Let the JPEG decoder downsample while decoding; a 9x8 grid is all dHash needs
+            image.draft("L", (64, 64))
+            pixels = list(image.convert("L").resize((9, 8), Image.Resampling.LANCZOS).getdata())
+    except (OSError, Image.DecompressionBombError):
+        # Formats Pillow cannot decode (e.g. HEIC) are passed through by preprocessing; dedupe them by exact hash
+        return content_hash, None
+
+    dhash = 0
+    for row in range(8):
+        for col in range(8):
+            dhash = (dhash << 1) | (pixels[row * 9 + col] > pixels[row * 9 + col + 1])
+    return content_hash, dhash
+
+
+class FoodScanCache:
+    """Bounded TTL cache of food analyses keyed by image content, with optional near-duplicate matching"""
+
+    def __init__(self, max_entries: int, ttl: float, hamming_threshold: int):
+        self.exact = MemoryCache(max_entries=max_entries, default_ttl=ttl)
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hamming_threshold = hamming_threshold
+        self.exact_hits = 0
+        self.perceptual_hits = 0
+        self.misses = 0
+        # content hash -> (dhash, expires_at), oldest first
+        self._dhashes: "OrderedDict[str, Tuple[int, float]]" = OrderedDict()
+
+    def get(self, content_hash: str, dhash: Optional[int] = None) -> Optional[dict]:
+        analysis = self.exact.get(content_hash)
+        if analysis is not None:
+            self.exact_hits += 1
+            return analysis
+
+        if dhash is not None:
+            match = self._nearest(dhash)
+            if match is not None:
+                analysis = self.exact.get(match)
+                if analysis is not None:
+                    self.perceptual_hits += 1
+                    return analysis
+
+        self.misses += 1
+        return None
+
+    def set(self, content_hash: str, analysis: dict, dhash: Optional[int] = None):
+        self.exact.set(content_hash, analysis)
+        if dhash is not None:
+            self._dhashes[content_hash] = (dhash, time.time() + self.ttl)
+            self._dhashes.move_to_end(content_hash)
+            while len(self._dhashes) > self.max_entries:
+                self._dhashes.popitem(last=False)
+
+    def _nearest(self, dhash: int) -> Optional[str]:
+        now = time.time()
+        best_key, best_distance = None, self.hamming_threshold + 1
+        for key, (candidate, expires_at) in list(self._dhashes.items()):
+            if expires_at <= now:
+                del self._dhashes[key]
+                continue
+            distance = (candidate ^ dhash).bit_count()
+            if distance < best_distance:
+                best_key, best_distance = key, distance
+        return best_key
+
+    def stats(self) -> dict:
+        lookups = self.exact_hits + self.perceptual_hits + self.misses
+        hits = self.exact_hits + self.perceptual_hits
+        return {
+            "exact_hits": self.exact_hits,
+            "perceptual_hits": self.perceptual_hits,
+            "misses": self.misses,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "size": len(self.exact)
+        }
+
+
+def create_food_scan_cache() -> FoodScanCache:
+    config = Config()
+    cache = FoodScanCache(
+        max_entries=config.food_scan_cache_max_entries,
+        ttl=config.food_scan_cache_ttl,
+        hamming_threshold=config.food_scan_hamming_threshold
+    )
+    register_cache("food_scans", lambda: (cache.exact_hits + cache.perceptual_hits, cache.misses))
+    return cache
@@ -1,37 +1,83 @@
+import asyncio
 import logging
-import re
 import base64
+from contextlib import nullcontext
+from typing import List, Optional, Union
 from fastapi import HTTPException, UploadFile
-from openai import OpenAI
+from com.mhire.app.clients.clients import ClientRegistry, get_client_registry
 from com.mhire.app.config.config import Config
-from com.mhire.app.services.food_scanner.food_scanner_schema import FoodScanResponse, FoodAnalysis, NutritionInfo
+from com.mhire.app.metrics.metrics import timed
+from com.mhire.app.parsing.llm_output_parser import parse_food_analysis
+from com.mhire.app.prompts.prompts import get_prompt
+from com.mhire.app.prompts.token_budget import (
+    check_prompt_budget, completion_budget, expected_call_tokens, usage_tracker
+)
+from com.mhire.app.services.food_scanner.food_image_preprocessor import preprocess_image, run_in_image_pool
+from com.mhire.app.services.food_scanner.food_scan_cache import create_food_scan_cache, image_fingerprint
+from com.mhire.app.services.food_scanner.food_scanner_schema import FoodScanResponse, FoodAnalysis, ItemNutrition, NutritionInfo
+from com.mhire.app.services.food_scanner.nutrition_reference import get_nutrition_reference, mark_dish_name, sum_item_nutrition
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+MACROS = ("calories", "protein", "carbs", "fat")
+# Differences below these amounts are never flagged, however large they are relative to the total
+_DISCREPANCY_FLOOR = {"calories": 50, "protein": 5, "carbs": 10, "fat": 5}
+
 class FoodScanner:
-    def __init__(self):
+    def __init__(self, clients: Optional[ClientRegistry] = None):
         try:
             config = Config()
-            self.client = OpenAI(api_key=config.openai_api_key)
+            clients = clients or get_client_registry()
+            self.client = clients.openai
+            self.openai_guard = clients.openai_guard
             self.model = config.model_name
+            self.perceptual_dedupe = config.food_scan_perceptual_dedupe
+            self.scan_cache = create_food_scan_cache()
+            self.batch_concurrency = max(1, config.food_scan_batch_concurrency)
+            self.scan_mode = config.food_scan_mode
+            self.discrepancy_tolerance = config.food_scan_discrepancy_tolerance
+            self.reference = get_nutrition_reference()
         except Exception as e:
             logger.error(f"Error initializing FoodScanner: {str(e)}")
             raise HTTPException(status_code=500, detail=f"Failed to initialize Food Scanner: {str(e)}")
 
-    async def analyze_food_image(self, image: UploadFile) -> FoodAnalysis:
+    async def analyze_food_image(self, image: UploadFile, semaphore: Optional[asyncio.Semaphore] = None) -> FoodAnalysis:
+        # Read image content
+        image_content = await image.read()
+        
+        # Get image type - if content_type not available, default to jpeg
+        content_type = image.content_type if image.content_type else "image/jpeg"
+        
+        return await self.analyze_image_content(image_content, content_type, semaphore)
+
+    async def analyze_food_images(self, images: List[UploadFile]) -> List[Union[FoodAnalysis, Exception]]:
+        """Analyze several photos at once; preprocessing runs in parallel and vision calls share one concurrency limit"""
+        semaphore = asyncio.Semaphore(self.batch_concurrency)
+        return await asyncio.gather(
+            *(self.analyze_food_image(image, semaphore) for image in images),
+            return_exceptions=True
+        )
+
+    async def analyze_image_content(self, image_content: bytes, content_type: str,
+                                    semaphore: Optional[asyncio.Semaphore] = None) -> FoodAnalysis:
         try:
-            # Read image content
-            image_content = await image.read()
-            
-            # Get image type - if content_type not available, default to jpeg
-            content_type = image.content_type if image.content_type else "image/jpeg"
-            
             # Ensure the content type is correctly formatted
             if "/" not in content_type:
                 content_type = f"image/{content_type}"
             
+            # Orient, downscale and re-encode before paying for upload and vision tokens
+            with timed("food_scanner.preprocess"):
+                image_content, content_type = await preprocess_image(image_content, content_type)
+            
+            # Serve repeat scans of the same (or, in perceptual mode, a near-identical) photo from cache
+            content_hash, dhash = await run_in_image_pool(image_fingerprint, image_content, self.perceptual_dedupe)
+            cached_analysis = self.scan_cache.get(content_hash, dhash)
+            if cached_analysis is not None:
+                logger.info(f"Serving cached food analysis for image {content_hash[:12]}")
+                return FoodAnalysis.model_validate(cached_analysis)
+            
             # Generate base64 encoding of the image
             base64_image = base64.b64encode(image_content).decode('utf-8')
             
@@ -39,63 +85,57 @@ class FoodScanner:
             logger.info(f"Processing image with content type: {content_type}")
             logger.info(f"Image size: {len(image_content)} bytes")
             
+            if self.scan_mode == "identify":
+                call = "food_scanner.identify"
+                system_prompt = get_prompt("food_scanner.identify_system").text
+                user_prompt = get_prompt("food_scanner.identify_user").text
+            else:
+                call = "food_scanner.analyze"
+                system_prompt = get_prompt("food_scanner.system").text
+                user_prompt = get_prompt("food_scanner.user").text
+            check_prompt_budget(call, system_prompt, user_prompt)
+            
             try:
-                response = self.client.chat.completions.create(
-                    model=self.model,
-                    messages=[
-                        {
-                            "role": "system",
-                            "content": """You are a professional nutritionist and food analyst specializing in visual food analysis. For ANY food image (simple or complex):
-
-                            1. First, identify ALL ingredients and components
-                            2. Then, considering the COMPLETE dish, provide TOTAL nutritional values
-                            3. Follow this EXACT format:
-
-                            FOOD ITEMS AND INGREDIENTS:
-                            - [Dish name]
-                            - [List all visible ingredients]
-                            - [List garnishes/sides if any]
-
-                            TOTAL NUTRITIONAL VALUES:
-                            Calories: [X] kcal
-                            Protein: [X] g
-                            Carbohydrates: [X] g
-                            Fat: [X] g
-
-                            HEALTH BENEFITS:
-                            - [List key benefits]
-
-                            DIETARY CONCERNS:
-                            - [List allergens or concerns]
-
-                            IMPORTANT RULES:
-                            - ALWAYS analyze the COMPLETE dish
-                            - ALWAYS provide numerical values
-                            - If exact values unknown, provide educated estimates
-                            - Keep responses focused and concise
-                            - For complex dishes, provide ONE total nutritional value"""
-                        },
-                        {
-                            "role": "user",
-                            "content": [
-                                {
-                                    "type": "text",
-                                    "text": "Analyze this food image and provide total nutritional values. If exact values are unknown, provide your best estimates based on visual analysis."
-                                },
-                                {
-                                    "type": "image_url",
-                                    "image_url": {
-                                        "url": f"data:{content_type};base64,{base64_image}"
+                async with semaphore or nullcontext():
+                    with timed("food_scanner.llm", upstream="openai"):
+                        response = await self.openai_guard.call(
+                            lambda timeout: self.client.chat.completions.create(
+                                model=self.model,
+                                messages=[
+                                    {
+                                        "role": "system",
+                                        "content": system_prompt
+                                    },
+                                    {
+                                        "role": "user",
+                                        "content": [
+                                            {
+                                                "type": "text",
+                                                "text": user_prompt
+                                            },
+                                            {
+                                                "type": "image_url",
+                                                "image_url": {
+                                                    "url": f"data:{content_type};base64,{base64_image}"
+                                                }
+                                            }
+                                        ]
                                     }
-                                }
-                            ]
-                        }
-                    ],
-                )
+                                ],
+                                timeout=timeout,
+                                **completion_budget(call)
+                            ),
+                            call=call,
+                            # The image is billed by size rather than by its base64 length; settling the reservation
+                            # against the reported usage accounts for it
+                            tokens=expected_call_tokens(call, system_prompt, user_prompt)
+                        )
             except Exception as api_error:
                 logger.error(f"OpenAI API error: {str(api_error)}")
                 raise HTTPException(status_code=500, detail=f"Error calling OpenAI API: {str(api_error)}")
             
+            usage_tracker.record_openai(call, response)
+            
             # Extract the analysis text
             analysis_text = response.choices[0].message.content.strip()
             
@@ -106,110 +146,65 @@ class FoodScanner:
             logger.info(f"Raw analysis text (first 200 chars): {analysis_text[:200]}...")
             
             # Parse the response to extract structured information
-            parsed_info = self._parse_analysis(analysis_text)
+            with timed("food_scanner.parse"):
+                parsed_info = self._parse_analysis(analysis_text)
             
-            # Additional validation to ensure we have values
-            if parsed_info["calories"] == 0 or parsed_info["protein"] == 0:
-                raise HTTPException(status_code=500, detail="Failed to extract nutritional values from analysis")
+            # Look every item up in the local nutrition table to fill gaps and cross-check the model's totals
+            with timed("food_scanner.reference"):
+                item_nutrition = [self.reference.estimate(item) for item in parsed_info["item_details"]]
+                if self.scan_mode != "identify":
+                    # A full analysis usually opens with the dish name; its ingredients are what gets summed
+                    mark_dish_name(item_nutrition)
+                nutrition, nutrition_source, discrepancies = self._reconcile_nutrition(parsed_info, item_nutrition)
             
-            return FoodAnalysis(
-                food_items=parsed_info["food_items"],
-                nutrition=NutritionInfo(
-                    calories=parsed_info["calories"],
-                    protein=parsed_info["protein"],
-                    carbs=parsed_info["carbs"],
-                    fat=parsed_info["fat"]
-                ),
-                health_benefits=parsed_info["health_benefits"],
-                concerns=parsed_info["concerns"]
-            )
+            with timed("food_scanner.build"):
+                analysis = FoodAnalysis(
+                    food_items=parsed_info["food_items"],
+                    nutrition=nutrition,
+                    health_benefits=parsed_info["health_benefits"],
+                    concerns=parsed_info["concerns"],
+                    item_nutrition=item_nutrition,
+                    nutrition_source=nutrition_source,
+                    discrepancies=discrepancies
+                )
+            self.scan_cache.set(content_hash, analysis.model_dump(mode="json"), dhash)
+            return analysis
         except Exception as e:
             logger.error(f"Error analyzing food image: {str(e)}")
             raise HTTPException(status_code=500, detail=f"Failed to analyze food image: {str(e)}")
 
-    def _parse_analysis(self, text: str) -> dict:
-        """Parse the AI response with improved nutrition value extraction"""    
-        result = {
-            "food_items": [],
-            "calories": 0.0,
-            "protein": 0.0,
-            "carbs": 0.0,
-            "fat": 0.0,
-            "health_benefits": [],
-            "concerns": []
-        }
-        
-        # Split text into sections using headers
-        sections = {}
-        current_section = None
-        
-        for line in text.split('\n'):
-            line = line.strip()
-            if not line:
-                continue
-            
-            # Detect section headers
-            lower_line = line.lower()
-            if "food items and ingredients:" in lower_line:
-                current_section = "items"
-            elif "total nutritional values" in lower_line:
-                current_section = "nutrition"
-            elif "health benefits:" in lower_line:
-                current_section = "benefits"
-            elif "dietary concerns:" in lower_line:
-                current_section = "concerns"
-            
-            # Add content to sections
-            if current_section and current_section not in sections:
-                sections[current_section] = []
-            if current_section:
-                sections[current_section].append(line)
-        
-        # Process food items
-        if "items" in sections:
-            for line in sections["items"]:
-                if line.strip().startswith(("-", "•", "*", "○")):
-                    item = line.lstrip("- •*○").strip()
-                    if item and not any(x.lower() in item.lower() for x in ["food items", "ingredients"]):
-                        result["food_items"].append(item)
-        
-        # Process nutrition values
-        if "nutrition" in sections:
-            for line in sections["nutrition"]:
-                if ":" in line:
-                    key, value = [x.strip() for x in line.split(":", 1)]
-                    key = key.lower()
-                    if "calories" in key:
-                        result["calories"] = self._extract_number(value)
-                    elif "protein" in key:
-                        result["protein"] = self._extract_number(value)
-                    elif "carbs" in key or "carbohydrates" in key:
-                        result["carbs"] = self._extract_number(value)
-                    elif "fat" in key:
-                        result["fat"] = self._extract_number(value)
-        
-        # Process other sections
-        if "benefits" in sections:
-            for line in sections["benefits"]:
-                if line.strip().startswith(("-", "•", "*", "○")):
-                    benefit = line.lstrip("- •*○").strip()
-                    if benefit:
-                        result["health_benefits"].append(benefit)
-        
-        if "concerns" in sections:
-            for line in sections["concerns"]:
-                if line.strip().startswith(("-", "•", "*", "○")):
-                    concern = line.lstrip("- •*○").strip()
-                    if concern:
-                        result["concerns"].append(concern)
-        
-        # Validate nutritional values
-        if result["calories"] == 0 or result["protein"] == 0 or result["carbs"] == 0 or result["fat"] == 0:
-            raise ValueError("Failed to extract complete nutritional information from the analysis")
-        
-        return result
+    def _reconcile_nutrition(self, parsed_info: dict, item_nutrition: List[ItemNutrition]):
+        """
+        Fill values the model left out (or reported as 0) from the table total, and flag model totals
+        that disagree with it when every ingredient was found in the table
+        """
+        table_total, complete = sum_item_nutrition(item_nutrition)
+        values = {macro: parsed_info[macro] for macro in MACROS}
+        filled = [macro for macro in MACROS if not values[macro] and table_total is not None]
+        for macro in filled:
+            values[macro] = getattr(table_total, macro)
 
-    def _extract_number(self, text: str) -> float:
-        """Extract the first number from text, handling various formats"""
-        matches = re.findall(r'(\d+(?:\.\d+)?)', text)
-        return float(matches[0]) if matches else 0.0
\ No newline at end of file
+        if not values["calories"]:
+            raise ValueError("Failed to extract nutritional values from analysis")
+
+        discrepancies = []
+        if table_total is not None and complete:
+            for macro in MACROS:
+                if macro in filled:
+                    continue
+                model_value, table_value = values[macro], getattr(table_total, macro)
+                difference = abs(model_value - table_value)
+                if difference > _DISCREPANCY_FLOOR[macro] and difference > self.discrepancy_tolerance * max(model_value, table_value):
+                    discrepancies.append(f"{macro}: model estimate {model_value:g} vs reference {table_value:g}")
+
+        if len(filled) == len(MACROS):
+            source = "reference"
+        elif filled:
+            source = "model+reference"
+        else:
+            source = "model"
+        return NutritionInfo(**values), source, discrepancies
+
+    def _parse_analysis(self, text: str) -> dict:
+        """Parse the AI response; missing values stay 0 and are filled from the nutrition reference table"""
+        return parse_food_analysis(text)
\ No newline at end of file
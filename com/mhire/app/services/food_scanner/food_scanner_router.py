@@ -1,9 +1,13 @@
 import logging
-from fastapi import APIRouter, HTTPException, UploadFile, File
+from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Request, UploadFile, File
 from fastapi.responses import JSONResponse
 
+from com.mhire.app.config.config import Config
 from com.mhire.app.services.food_scanner.food_scanner import FoodScanner
-from com.mhire.app.services.food_scanner.food_scanner_schema import FoodScanResponse
+from com.mhire.app.services.food_scanner.food_scanner_schema import (
+    BatchScanItem, FoodBatchScanResponse, FoodScanResponse, NutritionInfo
+)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -15,11 +19,12 @@ router = APIRouter(
     responses={404: {"description": "Not found"}}
 )
 
-# Initialize Food Scanner
-food_scanner = FoodScanner()
+def get_food_scanner(request: Request) -> FoodScanner:
+    """Food Scanner built once in the app lifespan on the shared client registry"""
+    return request.app.state.food_scanner
 
 @router.post("/analyze", response_model=FoodScanResponse)
-async def analyze_food(image: UploadFile = File(...)):
+async def analyze_food(image: UploadFile = File(...), food_scanner: FoodScanner = Depends(get_food_scanner)):
     """
     Analyze a food image and return detailed nutritional information including:
     - Food items identified
@@ -42,4 +47,56 @@ async def analyze_food(image: UploadFile = File(...)):
         return FoodScanResponse(
             success=False,
             error=str(e)
-        )
\ No newline at end of file
+        )
+
+@router.post("/analyze-batch", response_model=FoodBatchScanResponse)
+async def analyze_food_batch(images: List[UploadFile] = File(...), food_scanner: FoodScanner = Depends(get_food_scanner)):
+    """
+    Analyze several food images in one request, e.g. a full day of meals.
+    Returns a result per image in upload order plus the summed nutrition of every
+    image that was analyzed; a failed image is reported in its own entry instead of failing the batch.
+    """
+    try:
+        max_images = Config().food_scan_batch_max_images
+        if len(images) > max_images:
+            raise HTTPException(status_code=400, detail=f"At most {max_images} images per batch")
+
+        valid_images = [image for image in images if image.content_type and image.content_type.startswith('image/')]
+        analyses = iter(await food_scanner.analyze_food_images(valid_images))
+
+        results = []
+        for image in images:
+            if image not in valid_images:
+                results.append(BatchScanItem(filename=image.filename, success=False, error="File must be an image"))
+                continue
+            analysis = next(analyses)
+            if isinstance(analysis, Exception):
+                logger.error(f"Error analyzing {image.filename} in batch: {str(analysis)}")
+                results.append(BatchScanItem(filename=image.filename, success=False, error=str(analysis)))
+            else:
+                results.append(BatchScanItem(filename=image.filename, success=True, analysis=analysis))
+
+        succeeded = [item.analysis.nutrition for item in results if item.success]
+        return FoodBatchScanResponse(
+            success=bool(succeeded),
+            results=results,
+            total_nutrition=NutritionInfo(
+                calories=sum(n.calories for n in succeeded),
+                protein=sum(n.protein for n in succeeded),
+                carbs=sum(n.carbs for n in succeeded),
+                fat=sum(n.fat for n in succeeded)
+            )
+        )
+    except Exception as e:
+        logger.error(f"Error in analyze batch endpoint: {str(e)}")
+        return FoodBatchScanResponse(
+            success=False,
+            error=str(e)
+        )
+
+@router.get("/cache/stats")
+async def food_scan_cache_stats(food_scanner: FoodScanner = Depends(get_food_scanner)):
+    """
+    Exact/perceptual hit and miss counters for the food analysis cache
+    """
+    return food_scanner.scan_cache.stats()
\ No newline at end of file
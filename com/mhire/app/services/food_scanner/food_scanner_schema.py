@@ -7,13 +7,35 @@ class NutritionInfo(BaseModel):
     carbs: float
     fat: float
 
+class ItemNutrition(BaseModel):
+    item: str
+    reference: Optional[str] = None  # Matched entry of the nutrition reference table
+    grams: Optional[float] = None
+    dish: bool = False
+    nutrition: Optional[NutritionInfo] = None
+
 class FoodAnalysis(BaseModel):
     food_items: List[str]
     nutrition: NutritionInfo
     health_benefits: List[str]
     concerns: List[str]
+    item_nutrition: List[ItemNutrition] = []
+    nutrition_source: str = "model"  # "model", "reference" or "model+reference" when the table filled gaps
+    discrepancies: List[str] = []
 
 class FoodScanResponse(BaseModel):
     success: bool
     analysis: Optional[FoodAnalysis] = None
+    error: Optional[str] = None
+
+class BatchScanItem(BaseModel):
+    filename: Optional[str] = None
+    success: bool
+    analysis: Optional[FoodAnalysis] = None
+    error: Optional[str] = None
+
+class FoodBatchScanResponse(BaseModel):
+    success: bool
+    results: List[BatchScanItem] = []
+    total_nutrition: Optional[NutritionInfo] = None
     error: Optional[str] = None
\ No newline at end of file
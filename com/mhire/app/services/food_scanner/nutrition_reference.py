@@ -0,0 +1,148 @@
+import json
+import os
+import re
+from collections import Counter, defaultdict
+from functools import lru_cache
+from typing import Dict, List, Optional, Set, Tuple
+
+from pydantic import BaseModel
+
+from com.mhire.app.services.food_scanner.food_scanner_schema import ItemNutrition, NutritionInfo
+
+REFERENCE_PATH = os.path.join(os.path.dirname(__file__), "nutrition_reference.json")
+
+# A reference name must have at least this share of its trigrams in the item to count as a match
+MIN_CONTAINMENT = 0.8
+
+_WORD = re.compile(r"[a-z]+")
+_GRAMS = re.compile(r"(\d+(?:\.\d+)?)\s*(g|grams?|ml|oz|ounces?)\b", re.IGNORECASE)
+_COUNT = re.compile(r"^\s*(\d+(?:\.\d+)?|an?|one|two|three|four|half)\s+(?!g\b|grams?\b|ml\b|oz\b)", re.IGNORECASE)
+_COUNT_WORDS = {"a": 1, "an": 1, "one": 1, "two": 2, "three": 3, "four": 4, "half": 0.5}
+
+
+class ReferenceFood(BaseModel):
+    name: str
+    aliases: List[str]
+    serving_g: float
+    per_100g: NutritionInfo
+    dish: bool
+
+
+def _tokens(text: str) -> List[str]:
+    """Lower-case words with a simple plural 's' removed, so "eggs" and "egg" index the same"""
+    return [word[:-1] if len(word) > 3 and word.endswith("s") and not word.endswith("ss") else word
+            for word in _WORD.findall(text.lower())]
+
+
+def _trigrams(text: str) -> Set[str]:
+    # Padding each word keeps matches on word boundaries: "ham" does not match "hamburger"
+    return {f"  {token} "[i:i + 3] for token in _tokens(text) for i in range(len(token) + 1)}
+
+
+def parse_quantity(item: str, serving_g: float) -> float:
+    """Grams described by an item ("150 g rice", "6 oz steak", "2 eggs"), or one typical serving"""
+    grams = _GRAMS.search(item)
+    if grams:
+        value, unit = float(grams.group(1)), grams.group(2).lower()
+        return value * 28.35 if unit.startswith(("oz", "ounce")) else value
+    count = _COUNT.match(item)
+    if count:
+        value = count.group(1).lower()
+        return (_COUNT_WORDS[value] if value in _COUNT_WORDS else float(value)) * serving_g
+    return serving_g
+
+
+class NutritionReference:
+    """Bundled food-composition table with a word-trigram index for fuzzy item-name lookup"""
+
+    def __init__(self, foods: List[ReferenceFood]):
+        self.foods = foods
+        # One entry per name or alias: (food index, trigram count)
+        self._names: List[Tuple[int, int]] = []
+        self._index: Dict[str, List[int]] = defaultdict(list)
+        for food_id, food in enumerate(foods):
+            for name in [food.name, *food.aliases]:
+                trigrams = _trigrams(name)
+                name_id = len(self._names)
+                self._names.append((food_id, len(trigrams)))
+                for trigram in trigrams:
+                    self._index[trigram].append(name_id)
+
+    @classmethod
+    def load(cls, path: str = REFERENCE_PATH) -> "NutritionReference":
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return cls([ReferenceFood.model_validate(food) for food in data["foods"]])
+
+    @lru_cache(maxsize=4096)
+    def match(self, item: str) -> Optional[ReferenceFood]:
+        """Best reference food for a free-text item, or None when nothing is close enough"""
+        query = _trigrams(item)
+        shared = Counter(name_id for trigram in query for name_id in self._index.get(trigram, ()))
+        best, best_score = None, (MIN_CONTAINMENT, 0.0)
+        for name_id, count in shared.items():
+            food_id, size = self._names[name_id]
+            # Containment of the reference name first, then overall similarity to prefer the most specific name
+            score = (count / size, 2 * count / (size + len(query)))
+            if score >= best_score:
+                best, best_score = self.foods[food_id], score
+        return best
+
+    def estimate(self, item: str) -> ItemNutrition:
+        """Per-item macros from the table, scaled to the stated or typical portion"""
+        food = self.match(item)
+        if food is None:
+            return ItemNutrition(item=item)
+        grams = parse_quantity(item, food.serving_g)
+        factor = grams / 100
+        return ItemNutrition(
+            item=item,
+            reference=food.name,
+            grams=round(grams, 1),
+            dish=food.dish,
+            nutrition=NutritionInfo(
+                calories=round(food.per_100g.calories * factor, 1),
+                protein=round(food.per_100g.protein * factor, 1),
+                carbs=round(food.per_100g.carbs * factor, 1),
+                fat=round(food.per_100g.fat * factor, 1)
+            )
+        )
+
+
+def mark_dish_name(items: List[ItemNutrition]) -> None:
+    """
+    Treat the opening line of a full analysis as the dish name when the table says so, either because it matched
+    a dish entry or because its matched food is listed again as an ingredient. A plain first ingredient stays counted.
+    """
+    first = items[0] if len(items) > 1 else None
+    if first is not None and first.reference is not None:
+        first.dish = first.dish or any(item.reference == first.reference for item in items[1:])
+
+
+def sum_item_nutrition(items: List[ItemNutrition]) -> Tuple[Optional[NutritionInfo], bool]:
+    """
+    Table total for the matched items and whether it covers the whole meal.
+    Matched ingredients are summed instead of a matched dish name so the dish is not counted twice.
+    """
+    matched = [item for item in items if item.nutrition is not None]
+    ingredients = [item for item in matched if not item.dish]
+    counted = ingredients or matched
+    if not counted:
+        return None, False
+
+    total = NutritionInfo(
+        calories=round(sum(item.nutrition.calories for item in counted), 1),
+        protein=round(sum(item.nutrition.protein for item in counted), 1),
+        carbs=round(sum(item.nutrition.carbs for item in counted), 1),
+        fat=round(sum(item.nutrition.fat for item in counted), 1)
+    )
+    # The first line of a full analysis is the dish name, which may legitimately have no table entry
+    unmatched = [index for index, item in enumerate(items) if item.nutrition is None]
+    complete = not unmatched or (unmatched == [0] and len(items) > 1)
+    return total, complete
+
+
+@lru_cache(maxsize=1)
+def get_nutrition_reference() -> NutritionReference:
+    """The bundled table, loaded once per process"""
+    return NutritionReference.load()
@@ -1,24 +1,79 @@
+import asyncio
 import logging
 import re
 import json
+from typing import Optional
 from fastapi import HTTPException
-from langchain_openai import ChatOpenAI
-from langchain.prompts import ChatPromptTemplate
+from com.mhire.app.clients.clients import ClientRegistry, get_client_registry
 from com.mhire.app.config.config import Config
-from .meal_planner_schema import UserProfile, DailyMealPlan, Meal
+from com.mhire.app.metrics.metrics import degraded_responses, timed
+from com.mhire.app.prompts.prompts import get_prompt, profile_values
+from com.mhire.app.prompts.token_budget import (
+    check_prompt_budget, completion_budget, expected_call_tokens, usage_tracker
+)
+from com.mhire.app.resilience.deadline import generation_budget
+from .meal_planner_schema import UserProfile, DailyMealPlan, Meal, MealPlanResponse, NutritionTargets
+from .meal_templates import get_meal_templates
+from .nutrition_targets import compute_targets, meal_problems, scale_meal, target_prompt_values, validate_meal_plan
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+MEAL_TYPES = ["breakfast", "lunch", "snack", "dinner"]
+
+_FENCE_PATTERN = re.compile(r"```(?:json)?\s*(.*?)```", re.DOTALL)
+
+def extract_json_object(text: str):
+    """Decode the first JSON value in text, tolerating code fences and prose before or after it"""
+    fenced = _FENCE_PATTERN.search(text)
+    if fenced:
+        text = fenced.group(1)
+    start = text.find("{")
+    if start == -1:
+        raise ValueError("No JSON object found in LLM response")
+    try:
+        value, _ = json.JSONDecoder().raw_decode(text[start:])
+    except json.JSONDecodeError as e:
+        logger.error(f"Failed to parse JSON from LLM response: {e}")
+        raise ValueError(f"Invalid JSON format from LLM: {e}")
+    return value
+
+def _strict_schema(schema: dict) -> dict:
+    """OpenAI strict mode requires every object to forbid extra keys"""
+    if schema.get("type") == "object":
+        schema["additionalProperties"] = False
+    for value in schema.values():
+        if isinstance(value, dict):
+            _strict_schema(value)
+    return schema
+
+def json_schema_response_format(model) -> dict:
+    """response_format for OpenAI structured outputs, derived from a Pydantic model"""
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": model.__name__,
+            "schema": _strict_schema(model.model_json_schema()),
+            "strict": True
+        }
+    }
+
 class MealPlanner:
-    def __init__(self):
+    def __init__(self, clients: Optional[ClientRegistry] = None):
         try:
+            clients = clients or get_client_registry()
+            self.llm = clients.chat_llm(temperature=1)  # Lower temperature for more consistent formatting
+            self.openai_guard = clients.openai_guard
             config = Config()
-            self.llm = ChatOpenAI(
-                openai_api_key=config.openai_api_key,
-                model=config.model_name,
-                temperature=1  # Lower temperature for more consistent formatting
-            )
+            self.structured_output = config.meal_planner_structured_output
+            self.validate_plans = config.meal_plan_validation
+            self.target_tolerance = config.meal_plan_target_tolerance
+            # Native JSON-schema output, so the model cannot drop keys or wrap the JSON in prose
+            self.structured_llm = self.llm.bind(response_format=json_schema_response_format(DailyMealPlan))
+            self.structured_meal_llm = self.llm.bind(response_format=json_schema_response_format(Meal))
+            self.templates = get_meal_templates()
+            self.stats = {"plans": 0, "failed_plans": 0, "repaired_meals": 0, "adjusted_plans": 0,
+                          "plans_missing_targets": 0, "degraded_plans": 0, "prompt_tokens": 0, "completion_tokens": 0}
         except Exception as e:
             logger.error(f"Error initializing MealPlanner: {str(e)}")
             raise HTTPException(status_code=500, detail=f"Failed to initialize Meal Planner: {str(e)}")
@@ -36,104 +91,147 @@ class MealPlanner:
             preparation_steps=meal_json["preparation_steps"]
         )
     
-    async def generate_meal_plan(self, profile: UserProfile) -> DailyMealPlan:
+    def _create_meal_prompt(self, profile: UserProfile, targets: NutritionTargets) -> str:
+        # With structured output the response schema carries the structure, so the prompt skips the JSON skeleton
+        prompt_name = "meal_planner.plan" if self.structured_output else "meal_planner.plan_json"
+        prompt = get_prompt(prompt_name).render(**profile_values(profile), **target_prompt_values(targets))
+        check_prompt_budget("meal_planner.plan", prompt)
+        return prompt
+
+    async def generate_meal_plan(self, profile: UserProfile) -> MealPlanResponse:
+        """
+        Generate a plan, or serve one from the template library when the request has a deadline and
+        generation would run past it
+        """
         try:
-            user_prompt = f"""Create a personalized daily meal plan based on these user details:
-            Goal: {profile.primary_goal}
-            Weight: {profile.weight_kg}kg
-            Height: {profile.height_cm}cm
-            Meat Eater: {profile.is_meat_eater}
-            Lactose Intolerant: {profile.is_lactose_intolerant}
-            Allergies: {', '.join(profile.allergies)}
-            Eating Style: {profile.eating_style}
-            Caffeine: {profile.caffeine_consumption}
-            Sugar: {profile.sugar_consumption}
-
-            You MUST respond with a valid JSON object containing personalized meal recommendations appropriate for this specific user. Return ONLY a JSON object matching this structure:
-        
-            {{
-              "breakfast": {{
-                "name": "[GENERATE APPROPRIATE NAME]",
-                "description": "[GENERATE BRIEF DESCRIPTION]",
-                "calories": [APPROPRIATE CALORIE NUMBER],
-                "protein": [APPROPRIATE PROTEIN GRAMS],
-                "carbs": [APPROPRIATE CARB GRAMS],
-                "fat": [APPROPRIATE FAT GRAMS],
-                "rationale": "[EXPLAIN WHY THIS MEAL FITS USER'S NEEDS]",
-                "preparation_steps": ["[STEP 1]", "[STEP 2]", "..."]
-              }},
-              "lunch": {{
-                "name": "[GENERATE APPROPRIATE NAME]",
-                "description": "[GENERATE BRIEF DESCRIPTION]",
-                "calories": [APPROPRIATE CALORIE NUMBER],
-                "protein": [APPROPRIATE PROTEIN GRAMS],
-                "carbs": [APPROPRIATE CARB GRAMS],
-                "fat": [APPROPRIATE FAT GRAMS],
-                "rationale": "[EXPLAIN WHY THIS MEAL FITS USER'S NEEDS]",
-                "preparation_steps": ["[STEP 1]", "[STEP 2]", "..."]
-              }},
-              "snack": {{
-                "name": "[GENERATE APPROPRIATE NAME]",
-                "description": "[GENERATE BRIEF DESCRIPTION]",
-                "calories": [APPROPRIATE CALORIE NUMBER],
-                "protein": [APPROPRIATE PROTEIN GRAMS],
-                "carbs": [APPROPRIATE CARB GRAMS],
-                "fat": [APPROPRIATE FAT GRAMS],
-                "rationale": "[EXPLAIN WHY THIS MEAL FITS USER'S NEEDS]",
-                "preparation_steps": ["[STEP 1]", "[STEP 2]", "..."]
-              }},
-              "dinner": {{
-                "name": "[GENERATE APPROPRIATE NAME]",
-                "description": "[GENERATE BRIEF DESCRIPTION]",
-                "calories": [APPROPRIATE CALORIE NUMBER],
-                "protein": [APPROPRIATE PROTEIN GRAMS],
-                "carbs": [APPROPRIATE CARB GRAMS],
-                "fat": [APPROPRIATE FAT GRAMS],
-                "rationale": "[EXPLAIN WHY THIS MEAL FITS USER'S NEEDS]",
-                "preparation_steps": ["[STEP 1]", "[STEP 2]", "..."]
-              }}
-            }}
-        
-            IMPORTANT: 
-            - Create realistic, nutritionally appropriate meals for this user's specific profile and goal
-            - All nutritional values must be numbers without units (no "g" suffix)
-            - Ensure preparation_steps is an array of strings with clear cooking/preparation instructions
-            - Provide accurate nutritional values based on the ingredients
-            - The response must be a valid JSON object with NO text outside the JSON
-            - For a user trying to {profile.primary_goal}, adjust calories and macros accordingly
-            """
-
-            response = self.llm.invoke(user_prompt)
-            content = response.content.strip()
-        
-            # Log response for debugging
-            logger.info(f"LLM response starts with: {content[:100]}...")
-        
+            targets = compute_targets(profile)
+            budget = generation_budget()
             try:
-                meal_plan_data = json.loads(content)
-            
-                # Validate required keys
-                required_keys = ["breakfast", "lunch", "snack", "dinner"]
-                for key in required_keys:
-                    if key not in meal_plan_data:
-                        raise ValueError(f"Missing required key: {key}")
-                
-                    # Validate meal object structure
-                    meal_keys = ["name", "description", "calories", "protein", "carbs", "fat", "rationale", "preparation_steps"]
-                    for meal_key in meal_keys:
-                        if meal_key not in meal_plan_data[key]:
-                            raise ValueError(f"Missing required key in {key}: {meal_key}")
-            
-                return DailyMealPlan(
-                    breakfast=self._create_meal_from_json(meal_plan_data["breakfast"]),
-                    lunch=self._create_meal_from_json(meal_plan_data["lunch"]),
-                    snack=self._create_meal_from_json(meal_plan_data["snack"]),
-                    dinner=self._create_meal_from_json(meal_plan_data["dinner"])
-                )
-            except json.JSONDecodeError as e:
-                logger.error(f"Failed to parse JSON from LLM response: {e}")
-                raise ValueError(f"Invalid JSON format from LLM: {e}")
+                meal_plan = await asyncio.wait_for(self._generate_meal_plan(profile, targets), budget)
+            except TimeoutError:
+                if budget is None:
+                    raise
+                self.stats["degraded_plans"] += 1
+                degraded_responses.inc(service="meal_planner")
+                logger.warning("Meal plan generation would miss the request deadline, serving a template plan")
+                return MealPlanResponse(**self.templates.plan(profile, targets).model_dump(), degraded=True)
+
+            self.stats["plans"] += 1
+            return meal_plan
 
         except Exception as e:
+            self.stats["failed_plans"] += 1
             logger.error(f"Error generating meal plan: {str(e)}")
-            raise HTTPException(status_code=500, detail=f"Failed to generate meal plan: {str(e)}")
\ No newline at end of file
+            raise HTTPException(status_code=500, detail=f"Failed to generate meal plan: {str(e)}")
+
+    async def _generate_meal_plan(self, profile: UserProfile, targets: NutritionTargets) -> MealPlanResponse:
+        llm = self.structured_llm if self.structured_output else self.llm
+        prompt = self._create_meal_prompt(profile, targets)
+        with timed("meal_planner.llm", upstream="openai"):
+            response = await self.openai_guard.call(
+                lambda timeout: llm.ainvoke(prompt, timeout=timeout, **completion_budget("meal_planner.plan")),
+                call="meal_planner.plan",
+                tokens=expected_call_tokens("meal_planner.plan", prompt)
+            )
+        self._record_usage("meal_planner.plan", response)
+        content = response.content.strip()
+
+        # Log response for debugging
+        logger.info(f"LLM response starts with: {content[:100]}...")
+
+        with timed("meal_planner.parse"):
+            meal_plan_data = extract_json_object(content)
+        if not isinstance(meal_plan_data, dict):
+            raise ValueError("LLM response is not a JSON object")
+
+        # Keep every valid meal and repair only the ones that are missing or malformed
+        meals = {}
+        repaired = set()
+        for meal_type in MEAL_TYPES:
+            try:
+                meals[meal_type] = self._create_meal_from_json(meal_plan_data[meal_type])
+            except (KeyError, TypeError, ValueError) as e:
+                logger.warning(f"Invalid {meal_type} in meal plan ({str(e)}), requesting a repair")
+                meals[meal_type] = await self._repair_meal(
+                    profile, meal_type, meal_plan_data.get(meal_type), targets
+                )
+                repaired.add(meal_type)
+
+        with timed("meal_planner.build"):
+            meal_plan = DailyMealPlan(**meals)
+        # Checked locally against the computed targets, so a plan that meets them costs no extra LLM call
+        problems = []
+        if self.validate_plans:
+            with timed("meal_planner.validate"):
+                problems = validate_meal_plan(meal_plan, targets, self.target_tolerance)
+            if problems:
+                meal_plan, problems = await self._adjust_meal_plan(profile, meals, targets, repaired, problems)
+        return MealPlanResponse(**meal_plan.model_dump(), target_misses=problems)
+
+    async def _adjust_meal_plan(self, profile: UserProfile, meals: dict, targets: NutritionTargets,
+                                repaired: set, problems: list) -> tuple:
+        """
+        Bring a plan that misses the targets closer to them instead of discarding it: meals whose own numbers
+        are broken are regenerated (once), the rest have their portions scaled to their calorie targets.
+        Returns the adjusted plan and whatever it still misses.
+        """
+        self.stats["adjusted_plans"] += 1
+        logger.warning(f"Meal plan misses its targets ({'; '.join(problems)}), adjusting it")
+        for meal_type in MEAL_TYPES:
+            if meal_type in repaired or not meal_problems(meal_type, meals[meal_type], self.target_tolerance):
+                continue
+            try:
+                meals[meal_type] = await self._repair_meal(profile, meal_type, meals[meal_type].model_dump(), targets)
+            except Exception as e:
+                logger.warning(f"Could not repair {meal_type}, keeping it as generated: {str(e)}")
+
+        with timed("meal_planner.scale"):
+            meals = {
+                meal_type: meal if meal_problems(meal_type, meal, self.target_tolerance)
+                else scale_meal(meal_type, meal, targets.meals[meal_type])
+                for meal_type, meal in meals.items()
+            }
+            meal_plan = DailyMealPlan(**meals)
+            problems = validate_meal_plan(meal_plan, targets, self.target_tolerance)
+        if problems:
+            self.stats["plans_missing_targets"] += 1
+            logger.warning(f"Adjusted meal plan still misses its targets: {'; '.join(problems)}")
+        return meal_plan, problems
+
+    async def _repair_meal(self, profile: UserProfile, meal_type: str, invalid_meal, targets: NutritionTargets) -> Meal:
+        """Regenerate a single meal instead of the whole plan"""
+        self.stats["repaired_meals"] += 1
+        meal_target = targets.meals[meal_type]
+        prompt = get_prompt("meal_planner.repair").render(
+            meal_type=meal_type,
+            invalid_meal=json.dumps(invalid_meal),
+            meal_calories=round(meal_target.calories),
+            meal_protein=round(meal_target.protein),
+            **profile_values(profile)
+        )
+        check_prompt_budget("meal_planner.repair", prompt)
+
+        llm = self.structured_meal_llm if self.structured_output else self.llm
+        with timed("meal_planner.repair_llm", upstream="openai"):
+            response = await self.openai_guard.call(
+                lambda timeout: llm.ainvoke(prompt, timeout=timeout, **completion_budget("meal_planner.repair")),
+                call="meal_planner.repair",
+                tokens=expected_call_tokens("meal_planner.repair", prompt)
+            )
+        self._record_usage("meal_planner.repair", response)
+        return self._create_meal_from_json(extract_json_object(response.content))
+
+    def _record_usage(self, call: str, response):
+        usage_tracker.record_langchain(call, response)
+        usage = getattr(response, "usage_metadata", None) or {}
+        self.stats["prompt_tokens"] += usage.get("input_tokens", 0)
+        self.stats["completion_tokens"] += usage.get("output_tokens", 0)
+
+    def generation_stats(self) -> dict:
+        """Counters for generated, adjusted and repaired plans and token usage"""
+        plans = self.stats["plans"]
+        return {
+            **self.stats,
+            "repair_rate": self.stats["repaired_meals"] / plans if plans else 0.0,
+            "structured_output": self.structured_output
+        }
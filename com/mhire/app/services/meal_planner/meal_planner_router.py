@@ -1,27 +1,164 @@
+import hashlib
 import logging
-from fastapi import APIRouter, HTTPException
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Header, Request, Response
+from com.mhire.app.cache.cache import create_response_cache, profile_cache_key, should_bypass_cache
+from com.mhire.app.cache.single_flight import create_single_flight
+from com.mhire.app.config.config import Config
+from com.mhire.app.jobs.jobs import IdempotencyConflictError, Job, JobManager, QueueFullError
+from com.mhire.app.resilience.deadline import deadline_scope, request_deadline
 from com.mhire.app.services.meal_planner.meal_planner import MealPlanner
-from com.mhire.app.services.meal_planner.meal_planner_schema import UserProfile, DailyMealPlan
+from com.mhire.app.services.meal_planner.meal_planner_schema import UserProfile, MealPlanResponse, NutritionTargets
+from com.mhire.app.services.meal_planner.nutrition_targets import compute_targets
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+def get_meal_planner(request: Request) -> MealPlanner:
+    """Meal Planner built once in the app lifespan on the shared client registry"""
+    return request.app.state.meal_planner
+
+def get_meal_plan_jobs(request: Request) -> JobManager:
+    """Meal plan job pool started in the app lifespan"""
+    return request.app.state.meal_plan_jobs
+
 router = APIRouter(
     prefix="/meal-planner",
     tags=["Meal Planner"],
     responses={404: {"description": "Not found"}}
 )
 
-meal_planner = MealPlanner()
+meal_plan_cache = create_response_cache("meal_plans")
+meal_plan_flights = create_single_flight("meal_plans")
 
-@router.post("/generate", response_model=DailyMealPlan)
-async def generate_meal_plan(profile: UserProfile):
+async def _generate_shared(profile: UserProfile, cache_key: str, meal_planner: MealPlanner):
     """
-    Generate a customized daily meal plan based on user profile
+    Generate and cache a plan, sharing one generation between concurrent equivalent profiles.
+    Callers that join a generation already in flight share its deadline, and so its template fallback.
     """
-    try:
+    async def generate() -> MealPlanResponse:
         meal_plan = await meal_planner.generate_meal_plan(profile)
+        # Template plans are served but never cached, so the next request gets a generated plan
+        if not meal_plan.degraded:
+            await meal_plan_cache.aset(cache_key, meal_plan.model_dump(mode="json"))
+        return meal_plan
+
+    return await meal_plan_flights.do(cache_key, generate)
+
+@router.post("/generate", response_model=MealPlanResponse)
+async def generate_meal_plan(profile: UserProfile, response: Response, cache_control: Optional[str] = Header(None),
+                             x_request_timeout: Optional[float] = Header(None, gt=0),
+                             meal_planner: MealPlanner = Depends(get_meal_planner)):
+    """
+    Generate a customized daily meal plan based on user profile.
+    Plans for equivalent profiles are served from cache unless `Cache-Control: no-cache` is sent,
+    and concurrent requests for an equivalent profile share one generation.
+    When generation would run past MEAL_PLAN_DEADLINE, or the `X-Request-Timeout` header in seconds if it is
+    shorter, a plan from the template library sized to the user's targets is returned with `degraded: true`.
+    """
+    try:
+        cache_key = profile_cache_key(profile)
+        if not should_bypass_cache(cache_control):
+            cached_plan = await meal_plan_cache.aget(cache_key)
+            if cached_plan is not None:
+                response.headers["X-Cache"] = "HIT"
+                return MealPlanResponse.model_validate(cached_plan)
+
+        with deadline_scope(request_deadline(x_request_timeout, Config().meal_plan_deadline)):
+            meal_plan, shared = await _generate_shared(profile, cache_key, meal_planner)
+        response.headers["X-Cache"] = "MISS"
+        response.headers["X-Coalesced"] = "true" if shared else "false"
+        response.headers["X-Degraded"] = "true" if meal_plan.degraded else "false"
         return meal_plan
     except Exception as e:
         logger.error(f"Error in generate meal plan endpoint: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/jobs", status_code=202)
+async def submit_meal_plan_job(profile: UserProfile, response: Response, cache_control: Optional[str] = Header(None),
+                               idempotency_key: Optional[str] = Header(None, max_length=128),
+                               meal_planner: MealPlanner = Depends(get_meal_planner),
+                               jobs: JobManager = Depends(get_meal_plan_jobs)):
+    """
+    Queue meal plan generation and return the job straight away; poll GET /meal-planner/jobs/{job_id}.
+    Resubmitting with the same `Idempotency-Key` header returns the original job instead of starting
+    another generation.
+    """
+    cache_key = profile_cache_key(profile)
+    bypass_cache = should_bypass_cache(cache_control)
+
+    async def run(job: Job) -> dict:
+        job.set_progress(0, 1)
+        cached_plan = None if bypass_cache else await meal_plan_cache.aget(cache_key)
+        if cached_plan is None:
+            meal_plan, _ = await _generate_shared(profile, cache_key, meal_planner)
+            cached_plan = meal_plan.model_dump(mode="json")
+        job.set_progress(1)
+        return cached_plan
+
+    try:
+        job = jobs.submit(run, hashlib.sha256(profile.model_dump_json().encode("utf-8")).hexdigest(), idempotency_key)
+    except IdempotencyConflictError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    response.headers["Location"] = f"{router.prefix}/jobs/{job.job_id}"
+    return job.view()
+
+@router.get("/jobs/stats")
+async def meal_plan_job_stats(jobs: JobManager = Depends(get_meal_plan_jobs)):
+    """
+    Worker count, queue depth and jobs per status for meal plan jobs
+    """
+    return jobs.stats()
+
+@router.get("/jobs/{job_id}")
+async def get_meal_plan_job(job_id: str, wait: float = 0, version: int = -1,
+                            jobs: JobManager = Depends(get_meal_plan_jobs)):
+    """
+    Status and, once done, the plan of a meal plan job.
+    With `wait=N` the request long-polls: it returns as soon as the job changes past `version`
+    (send the last version seen) or finishes, or after N seconds (at most JOB_MAX_WAIT).
+    """
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if wait > 0:
+        await job.wait(min(wait, Config().job_max_wait), version)
+    return job.view()
+
+@router.delete("/jobs/{job_id}")
+async def cancel_meal_plan_job(job_id: str, jobs: JobManager = Depends(get_meal_plan_jobs)):
+    """
+    Cancel a queued or running meal plan job
+    """
+    job = jobs.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.view()
+
+@router.post("/targets", response_model=NutritionTargets)
+async def meal_plan_targets(profile: UserProfile):
+    """
+    BMR, TDEE and daily/per-meal calorie and macro targets, computed locally without calling the LLM
+    """
+    try:
+        return compute_targets(profile)
+    except Exception as e:
+        logger.error(f"Error in meal plan targets endpoint: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/cache/stats")
+async def meal_plan_cache_stats():
+    """
+    Hit/miss counters and size of the meal plan response cache
+    """
+    return meal_plan_cache.stats()
+
+
+@router.get("/generation/stats")
+async def meal_plan_generation_stats(meal_planner: MealPlanner = Depends(get_meal_planner)):
+    """
+    Generated plans, targeted meal repairs and token usage since startup
+    """
+    return meal_planner.generation_stats()
\ No newline at end of file
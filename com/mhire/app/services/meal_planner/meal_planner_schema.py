@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List
+from typing import Dict, List, Optional
 from enum import Enum
 
 class PrimaryGoal(str, Enum):
@@ -20,6 +20,17 @@ class ConsumptionFrequency(str, Enum):
     OCCASIONALLY = "Occasionally"
     REGULARLY = "Regularly"
 
+class Sex(str, Enum):
+    MALE = "Male"
+    FEMALE = "Female"
+
+class ActivityLevel(str, Enum):
+    SEDENTARY = "Sedentary"
+    LIGHT = "Light"
+    MODERATE = "Moderate"
+    ACTIVE = "Active"
+    VERY_ACTIVE = "Very active"
+
 class UserProfile(BaseModel):
     primary_goal: PrimaryGoal
     weight_kg: float
@@ -30,6 +41,10 @@ class UserProfile(BaseModel):
     eating_style: EatingStyle
     caffeine_consumption: ConsumptionFrequency
     sugar_consumption: ConsumptionFrequency
+    # Optional inputs for the calorie targets; population defaults are used when they are missing
+    age: Optional[int] = None
+    sex: Optional[Sex] = None
+    activity_level: Optional[ActivityLevel] = None
 
 class Meal(BaseModel):
     name: str
@@ -45,4 +60,22 @@ class DailyMealPlan(BaseModel):
     breakfast: Meal
     lunch: Meal
     snack: Meal
-    dinner: Meal
\ No newline at end of file
+    dinner: Meal
+
+class MealPlanResponse(DailyMealPlan):
+    # True when the plan came from the template library because generation would have missed the deadline
+    degraded: bool = False
+    # Where the plan still misses the computed targets after its meals were repaired or their portions scaled
+    target_misses: List[str] = []
+
+class MacroTargets(BaseModel):
+    calories: float
+    protein: float
+    carbs: float
+    fat: float
+
+class NutritionTargets(BaseModel):
+    bmr: float
+    tdee: float
+    daily: MacroTargets
+    meals: Dict[str, MacroTargets]
@@ -0,0 +1,91 @@
+import json
+import os
+from functools import lru_cache
+from typing import Dict, List
+
+from pydantic import BaseModel
+
+from com.mhire.app.services.meal_planner.meal_planner_schema import (
+    DailyMealPlan, EatingStyle, Meal, NutritionTargets, UserProfile
+)
+
+TEMPLATES_PATH = os.path.join(os.path.dirname(__file__), "meal_templates.json")
+
+# Styles with meat or fish in their options that a non-meat-eater is served from the vegetarian set instead
+_MEAT_STYLES = {EatingStyle.BALANCED.value, EatingStyle.KETO.value, EatingStyle.PALEO.value}
+
+
+class MealTemplate(BaseModel):
+    name: str
+    description: str
+    contains: List[str]
+    preparation_steps: List[str]
+
+
+class MealTemplates:
+    """Bundled meals per eating style, sized to a user's targets when a generated plan cannot be waited for"""
+
+    def __init__(self, styles: Dict[str, Dict[str, List[MealTemplate]]]):
+        self.styles = styles
+
+    @classmethod
+    def load(cls, path: str = TEMPLATES_PATH) -> "MealTemplates":
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return cls({
+            style: {meal_type: [MealTemplate.model_validate(option) for option in options]
+                    for meal_type, options in meals.items()}
+            for style, meals in data["styles"].items()
+        })
+
+    def _style(self, profile: UserProfile) -> str:
+        style = profile.eating_style.value
+        if style not in self.styles:
+            style = EatingStyle.BALANCED.value
+        if not profile.is_meat_eater and style in _MEAT_STYLES:
+            style = EatingStyle.VEGETARIAN.value
+        return style
+
+    def choose(self, profile: UserProfile, meal_type: str) -> MealTemplate:
+        """
+        The first option of the profile's style that fits its diet and allergies, then the first vegan one;
+        when nothing fits the style's first option is served
+        """
+        avoided = {allergy.strip().lower() for allergy in profile.allergies if allergy.strip()}
+        if profile.is_lactose_intolerant:
+            avoided.add("dairy")
+        if not profile.is_meat_eater:
+            avoided.update(("meat", "fish"))
+
+        def fits(option: MealTemplate) -> bool:
+            return not any(avoid in tag or tag in avoid for tag in option.contains for avoid in avoided)
+
+        options = self.styles[self._style(profile)][meal_type]
+        for option in options + self.styles[EatingStyle.VEGAN.value][meal_type]:
+            if fits(option):
+                return option
+        return options[0]
+
+    def plan(self, profile: UserProfile, targets: NutritionTargets) -> DailyMealPlan:
+        """A plan of template meals with each meal's macros set to its share of the daily targets"""
+        meals = {}
+        for meal_type, meal_target in targets.meals.items():
+            template = self.choose(profile, meal_type)
+            meals[meal_type] = Meal(
+                name=template.name,
+                description=template.description,
+                calories=round(meal_target.calories),
+                protein=round(meal_target.protein),
+                carbs=round(meal_target.carbs),
+                fat=round(meal_target.fat),
+                rationale=(f"Standard {meal_type} from the template library, portioned to your "
+                           f"{round(meal_target.calories)} kcal {meal_type} target"),
+                preparation_steps=template.preparation_steps
+            )
+        return DailyMealPlan(**meals)
+
+
+@lru_cache(maxsize=1)
+def get_meal_templates() -> MealTemplates:
+    """The bundled templates, loaded once per process"""
+    return MealTemplates.load()
@@ -0,0 +1,175 @@
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from .meal_planner_schema import (
+    ActivityLevel, DailyMealPlan, EatingStyle, MacroTargets, Meal, NutritionTargets, PrimaryGoal, Sex, UserProfile
+)
+
+# Integer codes for the categorical inputs of the bulk API are positions in these tuples
+GOALS = tuple(PrimaryGoal)
+SEXES = tuple(Sex)
+ACTIVITY_LEVELS = tuple(ActivityLevel)
+EATING_STYLES = tuple(EatingStyle)
+
+# Share of the daily calories per meal
+MEAL_SPLIT = {"breakfast": 0.25, "lunch": 0.35, "snack": 0.10, "dinner": 0.30}
+
+# Bounds on resizing a generated meal's portion to its calorie target
+MIN_PORTION_SCALE = 0.5
+MAX_PORTION_SCALE = 2.0
+
+DEFAULT_AGE = 30
+DEFAULT_ACTIVITY = ActivityLevel.MODERATE
+MIN_CALORIES = 1200.0
+
+# Mifflin-St Jeor sex constant; an unknown sex uses the midpoint of the two
+_SEX_OFFSET = np.array([5.0, -161.0, -78.0])
+_ACTIVITY_FACTOR = np.array([1.2, 1.375, 1.55, 1.725, 1.9])
+# Per goal: calories as a share of TDEE and protein in g per kg of body weight
+_GOAL_CALORIE_FACTOR = np.array([1.10, 0.80, 1.00])
+_GOAL_PROTEIN_PER_KG = np.array([1.8, 2.0, 1.4])
+# Per eating style: fat share of calories and the bounds of the carb share (keto pins carbs at 5%)
+_STYLE_FAT_SHARE = np.array([0.25, 0.70, 0.35, 0.30, 0.30, 0.30])
+_STYLE_CARB_FLOOR = np.array([0.00, 0.05, 0.00, 0.00, 0.00, 0.00])
+_STYLE_CARB_CAP = np.array([1.00, 0.05, 1.00, 1.00, 1.00, 1.00])
+
+
+def compute_targets_bulk(
+    weight_kg: np.ndarray,
+    height_cm: np.ndarray,
+    goal: np.ndarray,
+    age: Optional[np.ndarray] = None,
+    sex: Optional[np.ndarray] = None,
+    activity: Optional[np.ndarray] = None,
+    eating_style: Optional[np.ndarray] = None
+) -> Dict[str, np.ndarray]:
+    """
+    Daily BMR, TDEE, calorie and macro targets for many profiles at once.
+    Categorical inputs are integer codes into GOALS, SEXES, ACTIVITY_LEVELS and EATING_STYLES;
+    a sex code of -1 (or len(SEXES)) means unknown.
+    """
+    weight_kg = np.asarray(weight_kg, dtype=np.float64)
+    height_cm = np.asarray(height_cm, dtype=np.float64)
+    n = weight_kg.shape[0]
+    goal = np.asarray(goal, dtype=np.intp)
+    age = np.full(n, DEFAULT_AGE, dtype=np.float64) if age is None else np.asarray(age, dtype=np.float64)
+    sex = np.full(n, len(SEXES), dtype=np.intp) if sex is None else np.asarray(sex, dtype=np.intp)
+    activity = (np.full(n, ACTIVITY_LEVELS.index(DEFAULT_ACTIVITY), dtype=np.intp)
+                if activity is None else np.asarray(activity, dtype=np.intp))
+    eating_style = (np.full(n, EATING_STYLES.index(EatingStyle.NONE), dtype=np.intp)
+                    if eating_style is None else np.asarray(eating_style, dtype=np.intp))
+
+    bmr = 10.0 * weight_kg + 6.25 * height_cm - 5.0 * age + _SEX_OFFSET[np.where(sex < 0, len(SEXES), sex)]
+    tdee = bmr * _ACTIVITY_FACTOR[activity]
+    calories = np.maximum(tdee * _GOAL_CALORIE_FACTOR[goal], MIN_CALORIES)
+
+    protein_kcal = np.minimum(weight_kg * _GOAL_PROTEIN_PER_KG[goal] * 4.0, calories * 0.35)
+    fat_kcal = calories * _STYLE_FAT_SHARE[eating_style]
+    carbs_kcal = np.clip(
+        calories - protein_kcal - fat_kcal,
+        calories * _STYLE_CARB_FLOOR[eating_style],
+        calories * _STYLE_CARB_CAP[eating_style]
+    )
+    # Fat takes whatever the carb bounds leave over, so the macros always add up to the calories
+    fat_kcal = np.maximum(calories - protein_kcal - carbs_kcal, 0.0)
+
+    return {
+        "bmr": bmr,
+        "tdee": tdee,
+        "calories": calories,
+        "protein": protein_kcal / 4.0,
+        "carbs": carbs_kcal / 4.0,
+        "fat": fat_kcal / 9.0
+    }
+
+
+def encode_profiles(profiles: Iterable[UserProfile]) -> Dict[str, np.ndarray]:
+    """Column arrays for compute_targets_bulk from profile models"""
+    profiles = list(profiles)
+    return {
+        "weight_kg": np.fromiter((p.weight_kg for p in profiles), dtype=np.float64, count=len(profiles)),
+        "height_cm": np.fromiter((p.height_cm for p in profiles), dtype=np.float64, count=len(profiles)),
+        "goal": np.fromiter((GOALS.index(p.primary_goal) for p in profiles), dtype=np.intp, count=len(profiles)),
+        "age": np.fromiter((p.age or DEFAULT_AGE for p in profiles), dtype=np.float64, count=len(profiles)),
+        "sex": np.fromiter((SEXES.index(p.sex) if p.sex else -1 for p in profiles), dtype=np.intp, count=len(profiles)),
+        "activity": np.fromiter((ACTIVITY_LEVELS.index(p.activity_level or DEFAULT_ACTIVITY) for p in profiles),
+                                dtype=np.intp, count=len(profiles)),
+        "eating_style": np.fromiter((EATING_STYLES.index(p.eating_style) for p in profiles),
+                                    dtype=np.intp, count=len(profiles))
+    }
+
+
+def _macros(calories: float, protein: float, carbs: float, fat: float) -> MacroTargets:
+    return MacroTargets(calories=round(calories), protein=round(protein), carbs=round(carbs), fat=round(fat))
+
+
+def compute_targets(profile: UserProfile) -> NutritionTargets:
+    """Daily and per-meal targets for one profile"""
+    row = {key: float(values[0]) for key, values in compute_targets_bulk(**encode_profiles([profile])).items()}
+    return NutritionTargets(
+        bmr=round(row["bmr"]),
+        tdee=round(row["tdee"]),
+        daily=_macros(row["calories"], row["protein"], row["carbs"], row["fat"]),
+        meals={
+            meal_type: _macros(row["calories"] * share, row["protein"] * share, row["carbs"] * share, row["fat"] * share)
+            for meal_type, share in MEAL_SPLIT.items()
+        }
+    )
+
+
+def target_prompt_values(targets: NutritionTargets) -> dict:
+    """Template values that put the targets into the meal plan prompts"""
+    values = {f"target_{macro}": round(value) for macro, value in targets.daily.model_dump().items()}
+    for meal_type, meal in targets.meals.items():
+        values[f"{meal_type}_calories"] = round(meal.calories)
+        values[f"{meal_type}_protein"] = round(meal.protein)
+    return values
+
+
+def meal_problems(meal_type: str, meal: Meal, tolerance: float) -> List[str]:
+    """Problems with a meal's own numbers, which only regenerating the meal can fix"""
+    if min(meal.calories, meal.protein, meal.carbs, meal.fat) < 0:
+        return [f"{meal_type} has negative nutrition values"]
+    # The stated calories have to roughly match the energy in the stated macros
+    macro_kcal = 4 * meal.protein + 4 * meal.carbs + 9 * meal.fat
+    if meal.calories and abs(macro_kcal - meal.calories) > max(2 * tolerance * meal.calories, 50):
+        return [f"{meal_type} lists {meal.calories:.0f} kcal but its macros add up to {macro_kcal:.0f} kcal"]
+    return []
+
+
+def scale_meal(meal_type: str, meal: Meal, target: MacroTargets) -> Meal:
+    """The meal with its portion resized towards its calorie target, the macros scaled with it"""
+    if meal.calories <= 0:
+        return meal
+    scale = min(max(target.calories / meal.calories, MIN_PORTION_SCALE), MAX_PORTION_SCALE)
+    if abs(scale - 1) < 0.01:
+        return meal
+    return meal.model_copy(update={
+        "calories": round(meal.calories * scale),
+        "protein": round(meal.protein * scale),
+        "carbs": round(meal.carbs * scale),
+        "fat": round(meal.fat * scale),
+        "rationale": f"{meal.rationale} Portions scaled by {scale:.2f}x to fit your "
+                     f"{round(target.calories)} kcal {meal_type} target."
+    })
+
+
+def validate_meal_plan(plan: DailyMealPlan, targets: NutritionTargets, tolerance: float) -> List[str]:
+    """Problems that keep a generated plan from meeting the user's targets; empty when the plan is acceptable"""
+    problems = []
+    meals = {meal_type: getattr(plan, meal_type) for meal_type in MEAL_SPLIT}
+
+    for meal_type, meal in meals.items():
+        problems += meal_problems(meal_type, meal, tolerance)
+
+    total = {macro: sum(getattr(meal, macro) for meal in meals.values()) for macro in ("calories", "protein", "carbs", "fat")}
+    if abs(total["calories"] - targets.daily.calories) > tolerance * targets.daily.calories:
+        problems.append(f"plan has {total['calories']:.0f} kcal, target is {targets.daily.calories:.0f} kcal")
+    if total["protein"] < (1 - tolerance) * targets.daily.protein:
+        problems.append(f"plan has {total['protein']:.0f}g protein, target is at least {targets.daily.protein:.0f}g")
+    for macro in ("carbs", "fat"):
+        target = getattr(targets.daily, macro)
+        if abs(total[macro] - target) > max(2 * tolerance * target, 15):
+            problems.append(f"plan has {total[macro]:.0f}g {macro}, target is {target:.0f}g")
+    return problems
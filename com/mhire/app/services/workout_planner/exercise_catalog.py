@@ -0,0 +1,92 @@
+import json
+import os
+from collections import defaultdict
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+from com.mhire.app.services.workout_planner.workout_planner_schema import Exercise
+
+CATALOG_PATH = os.path.join(os.path.dirname(__file__), "exercise_catalog.json")
+
+SEGMENTS = ("warm_up", "main_routine", "cool_down")
+SEGMENT_SIZES = {"warm_up": 3, "main_routine": 5, "cool_down": 3}
+
+# Catalog intensities that suit each structure intensity in WORKOUT_STRUCTURES
+INTENSITY_BANDS = {
+    "High": {"Moderate", "High"},
+    "Moderate-High": {"Moderate", "High"},
+    "Moderate": {"Low", "Moderate"}
+}
+
+
+class CatalogExercise(BaseModel):
+    id: str
+    name: str
+    segment: str
+    splits: List[str]
+    equipment: List[str]
+    intensity: str
+    contraindications: List[str]
+    sets: int
+    reps: str
+    rest: str
+    instructions: str
+
+    def to_exercise(self, rest: Optional[str] = None) -> Exercise:
+        return Exercise(name=self.name, sets=self.sets, reps=self.reps, rest=rest or self.rest, instructions=self.instructions)
+
+
+class ExerciseCatalog:
+    """Bundled exercise dataset indexed by workout split and segment"""
+
+    def __init__(self, exercises: List[CatalogExercise]):
+        self.by_id: Dict[str, CatalogExercise] = {exercise.id: exercise for exercise in exercises}
+        self._by_split: Dict[Tuple[str, str], List[CatalogExercise]] = defaultdict(list)
+        self._by_segment: Dict[str, List[CatalogExercise]] = defaultdict(list)
+        for exercise in exercises:
+            self._by_segment[exercise.segment].append(exercise)
+            for split in exercise.splits:
+                self._by_split[(split, exercise.segment)].append(exercise)
+
+    @classmethod
+    def load(cls, path: str = CATALOG_PATH) -> "ExerciseCatalog":
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return cls([CatalogExercise.model_validate(exercise) for exercise in data["exercises"]])
+
+    def candidates(self, split: str, segment: str, equipment: Optional[Iterable[str]] = None,
+                   limitations: Iterable[str] = (), intensity: Optional[str] = None) -> List[CatalogExercise]:
+        """
+        Exercises for a split and segment that need only the available equipment and avoid the user's limitations.
+        Exercises in the structure's intensity band come first; when the split has too few options,
+        suitable exercises from other splits of the same segment are appended.
+        """
+        available = None if equipment is None else {getattr(item, "value", item) for item in equipment}
+        avoided = {getattr(limitation, "value", limitation) for limitation in limitations}
+
+        def allowed(exercise: CatalogExercise) -> bool:
+            if available is not None and not available.issuperset(exercise.equipment):
+                return False
+            return avoided.isdisjoint(exercise.contraindications)
+
+        options = [exercise for exercise in self._by_split[(split, segment)] if allowed(exercise)]
+        band = INTENSITY_BANDS.get(intensity)
+        if band:
+            options.sort(key=lambda exercise: exercise.intensity not in band)
+
+        if len(options) < SEGMENT_SIZES[segment]:
+            chosen = {exercise.id for exercise in options}
+            options += [exercise for exercise in self._by_segment[segment] if exercise.id not in chosen and allowed(exercise)]
+        return options
+
+    def select(self, split: str, segment: str, **filters) -> List[CatalogExercise]:
+        """Pick a segment's exercises straight from the catalog"""
+        return self.candidates(split, segment, **filters)[:SEGMENT_SIZES[segment]]
+
+
+@lru_cache(maxsize=1)
+def get_exercise_catalog() -> ExerciseCatalog:
+    """The bundled catalog, loaded once per process"""
+    return ExerciseCatalog.load()
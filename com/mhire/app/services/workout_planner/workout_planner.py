@@ -1,37 +1,120 @@
+import asyncio
 import logging
+import re
 import httpx
-from openai import OpenAI
-from tavily import TavilyClient
+from typing import AsyncIterator, Dict, List, Tuple, Union
+from com.mhire.app.clients.clients import ClientRegistry, get_client_registry
 from com.mhire.app.config.config import Config
+from com.mhire.app.metrics.metrics import degraded_responses, timed
+from com.mhire.app.parsing.llm_output_parser import parse_workout_response
+from com.mhire.app.prompts.prompts import get_prompt, profile_values
+from com.mhire.app.prompts.token_budget import (
+    check_prompt_budget, completion_budget, expected_call_tokens, usage_tracker
+)
+from com.mhire.app.resilience.deadline import generation_budget
+from com.mhire.app.services.workout_planner.exercise_catalog import SEGMENTS, SEGMENT_SIZES, get_exercise_catalog
 from com.mhire.app.services.workout_planner.workout_planner_schema import *
+from com.mhire.app.services.workout_planner.workout_video_cache import get_video_cache
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Days in every generated plan
+PLAN_DAYS = 3
+
+# Base structure based on primary goal
+WORKOUT_STRUCTURES = {
+    PrimaryGoal.BUILD_MUSCLE: {
+        "splits": ["Upper Body Push", "Lower Body", "Upper Body Pull"],
+        "intensity": "High",
+        "rest": "60-90s"
+    },
+    PrimaryGoal.LOSE_WEIGHT: {
+        "splits": ["HIIT Cardio", "Full Body Strength", "Metabolic Conditioning"],
+        "intensity": "Moderate-High",
+        "rest": "30-45s"
+    },
+    PrimaryGoal.EAT_HEALTHIER: {
+        "splits": ["Full Body", "Mobility & Flexibility", "Light Cardio"],
+        "intensity": "Moderate",
+        "rest": "45-60s"
+    }
+}
+
+# One "segment: ID, ID" line per segment in a catalog-mode reply
+_CATALOG_LINE = re.compile(r"^\W*(warm[\s_-]?up|main[\s_-]?routine|cool[\s_-]?down)\W*:(.*)$", re.IGNORECASE | re.MULTILINE)
+_CATALOG_ID = re.compile(r"\b[WMC]\d+\b")
+
+def video_search_queries(focus: str, primary_goal: PrimaryGoal) -> dict:
+    """Tavily queries for the demonstration video of each workout segment"""
+    return {
+        "warm_up": f"{focus} warm up exercises",
+        "main_routine": f"{focus} {primary_goal} workout",
+        "cool_down": f"{focus} cool down stretches"
+    }
+
 class WorkoutPlanner:
-    def __init__(self):
+    def __init__(self, clients: Optional[ClientRegistry] = None):
         config = Config()
-        self.openai_client = OpenAI(api_key=config.openai_api_key)
+        clients = clients or get_client_registry()
+        self.openai_client = clients.openai
+        self.openai_guard = clients.openai_guard
         self.model = config.model_name
-        self.tavily_client = TavilyClient(api_key=config.tavily_api_key)
+        self.tavily_client = clients.tavily
         self.tavily_api_key = config.tavily_api_key
+        self.tavily_guard = clients.tavily_guard
+        self.max_concurrency = max(1, config.workout_max_concurrency)
+        self.video_cache = get_video_cache()
+        self.video_cache_miss_ttl = config.video_cache_miss_ttl
+        self.plan_mode = config.workout_plan_mode
+        self.catalog = get_exercise_catalog()
         
     async def generate_workout_plan(self, profile: UserProfileRequest) -> WorkoutResponse:
+        """
+        Generate every day of the plan. When the request has a deadline, days still being generated once
+        it is about to pass are built from the exercise catalog instead and the plan is marked degraded.
+        """
         try:
             # Consider all profile aspects when creating workout structure
             workout_structure = self._create_workout_structure(profile)
-            daily_workouts = []
+            splits = workout_structure["splits"]
             
-            for day_num in range(3):
-                focus = workout_structure["splits"][day_num % len(workout_structure["splits"])]
-                daily_workout = await self._generate_daily_workout(profile, focus, day_num + 1)
-                daily_workouts.append(daily_workout)
+            # Generate all days at once, sharing one limit on in-flight upstream calls
+            semaphore = asyncio.Semaphore(self.max_concurrency)
+            tasks = [
+                asyncio.create_task(self._generate_daily_workout(
+                    profile, splits[day_num % len(splits)], day_num + 1, semaphore
+                ))
+                for day_num in range(PLAN_DAYS)
+            ]
+            try:
+                done, pending = await asyncio.wait(tasks, timeout=generation_budget(),
+                                                   return_when=asyncio.FIRST_EXCEPTION)
+            finally:
+                for task in tasks:
+                    task.cancel()
+
+            failed = [task for task in done if task.exception() is not None]
+            if failed:
+                raise failed[0].exception()
+
+            # Days that finished in time are kept; only the late ones come from the catalog
+            daily_workouts = [
+                await self._local_daily_workout(profile, splits[day_num % len(splits)], day_num + 1)
+                if task in pending else task.result()
+                for day_num, task in enumerate(tasks)
+            ]
+            if pending:
+                degraded_responses.inc(service="workout_planner")
+                logger.warning(f"{len(pending)} of {PLAN_DAYS} workout days would miss the request deadline, "
+                               "serving them from the exercise catalog")
             
             return WorkoutResponse(
                 success=True,
                 workout_plan=daily_workouts,
-                error=None
+                error=None,
+                degraded=bool(pending)
             )
         except Exception as e:
             logger.error(f"Error generating workout plan: {str(e)}")
@@ -41,27 +124,46 @@ class WorkoutPlanner:
                 error=str(e)
             )
 
+    async def generate_local_workout_plan(self, profile: UserProfileRequest) -> WorkoutResponse:
+        """Build a plan straight from the exercise catalog, with cached videos only and no upstream calls"""
+        try:
+            splits = self._create_workout_structure(profile)["splits"]
+            return WorkoutResponse(
+                success=True,
+                workout_plan=await asyncio.gather(*(
+                    self._local_daily_workout(profile, splits[day_num % len(splits)], day_num + 1)
+                    for day_num in range(PLAN_DAYS)
+                )),
+                error=None
+            )
+        except Exception as e:
+            logger.error(f"Error generating local workout plan: {str(e)}")
+            return WorkoutResponse(success=False, workout_plan=[], error=str(e))
+
+    async def stream_workout_plan(self, profile: UserProfileRequest) -> AsyncIterator[Tuple[int, Union[DailyWorkout, Exception]]]:
+        """Yield (day index, DailyWorkout or the exception that failed it) as each day finishes, in completion order"""
+        workout_structure = self._create_workout_structure(profile)
+        splits = workout_structure["splits"]
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def run_day(day_num: int):
+            try:
+                return day_num, await self._generate_daily_workout(profile, splits[day_num % len(splits)], day_num + 1, semaphore)
+            except Exception as e:
+                return day_num, e
+
+        tasks = [asyncio.create_task(run_day(day_num)) for day_num in range(PLAN_DAYS)]
+        try:
+            for next_day in asyncio.as_completed(tasks):
+                yield await next_day
+        finally:
+            # Stop outstanding upstream calls if the client goes away mid-stream
+            for task in tasks:
+                task.cancel()
+
     def _create_workout_structure(self, profile: UserProfileRequest) -> dict:
-        # Base structure based on primary goal
-        base_structures = {
-            PrimaryGoal.BUILD_MUSCLE: {
-                "splits": ["Upper Body Push", "Lower Body", "Upper Body Pull"],
-                "intensity": "High",
-                "rest": "60-90s"
-            },
-            PrimaryGoal.LOSE_WEIGHT: {
-                "splits": ["HIIT Cardio", "Full Body Strength", "Metabolic Conditioning"],
-                "intensity": "Moderate-High",
-                "rest": "30-45s"
-            },
-            PrimaryGoal.EAT_HEALTHIER: {
-                "splits": ["Full Body", "Mobility & Flexibility", "Light Cardio"],
-                "intensity": "Moderate",
-                "rest": "45-60s"
-            }
-        }
-        
-        structure = base_structures.get(profile.primary_goal)
+        # Copy so profile adjustments don't leak into the shared base structures
+        structure = dict(WORKOUT_STRUCTURES.get(profile.primary_goal))
         
         # Adjust based on dietary profile
         if profile.eating_style == EatingStyle.VEGAN or profile.eating_style == EatingStyle.VEGETARIAN:
@@ -74,17 +176,27 @@ class WorkoutPlanner:
         return structure
 
     async def _search_tavily_video(self, query: str) -> Optional[str]:
-        """Search for exercise videos using Tavily API"""
+        """Search for exercise videos using Tavily API, serving repeat queries from the video cache"""
+        cached_url = await self.video_cache.aget(query)
+        if cached_url is not None:
+            # An empty string records a recent search that found nothing
+            return cached_url or None
+        
         try:
             logging.info(f"Searching for video: {query}")
             
             # Using the official Tavily client library
-            search_result = self.tavily_client.search(
-                query=f"{query} exercise video tutorial demonstration",
-                search_depth="advanced",
-                include_domains=["youtube.com"],
-                max_results=5
-            )
+            with timed("workout_planner.search", upstream="tavily"):
+                search_result = await self.tavily_guard.call(
+                    lambda timeout: self.tavily_client.search(
+                        query=f"{query} exercise video tutorial demonstration",
+                        search_depth="advanced",
+                        include_domains=["youtube.com"],
+                        max_results=5,
+                        timeout=timeout
+                    ),
+                    call="workout_planner.search"
+                )
             
             if search_result and search_result.get("results"):
                 # Filter for YouTube videos
@@ -92,207 +204,175 @@ class WorkoutPlanner:
                 if videos:
                     video_url = videos[0]["url"]
                     logging.info(f"Found video: {video_url}")
+                    await self.video_cache.aset(query, video_url)
                     return video_url
                 
             logging.warning(f"No suitable video found for: {query}")
+            # Failed searches are not cached, only answers without a video, and only briefly
+            await self.video_cache.aset(query, "", ttl=self.video_cache_miss_ttl)
             return None
                 
         except Exception as e:
             logging.error(f"Tavily API error for {query}: {str(e)}")
             return None
 
-    async def _get_ai_response(self, prompt: str) -> str:
+    async def _get_ai_response(self, prompt: str, call: str = "workout_planner.daily") -> str:
         """Get workout plan from OpenAI"""
         try:
-            response = self.openai_client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "You are a professional fitness coach creating detailed workout plans."},
-                    {"role": "user", "content": prompt}
-                ]
-                # Removed temperature parameter as it's not supported
-            )
+            system_prompt = get_prompt("workout_planner.system").text
+            check_prompt_budget(call, system_prompt, prompt)
+            with timed("workout_planner.llm", upstream="openai"):
+                response = await self.openai_guard.call(
+                    lambda timeout: self.openai_client.chat.completions.create(
+                        model=self.model,
+                        messages=[
+                            {"role": "system", "content": system_prompt},
+                            {"role": "user", "content": prompt}
+                        ],
+                        # Removed temperature parameter as it's not supported
+                        timeout=timeout,
+                        **completion_budget(call)
+                    ),
+                    call=call,
+                    tokens=expected_call_tokens(call, system_prompt, prompt)
+                )
+            usage_tracker.record_openai(call, response)
             return response.choices[0].message.content
         except Exception as e:
             logger.error(f"OpenAI API error: {str(e)}")
             raise
 
-    async def _generate_daily_workout(self, profile: UserProfileRequest, focus: str, day: int) -> DailyWorkout:
+    async def _run_limited(self, semaphore: asyncio.Semaphore, coro):
+        """Await a coroutine once a slot in the plan's concurrency limit is free"""
+        async with semaphore:
+            return await coro
+
+    async def _generate_daily_workout(self, profile: UserProfileRequest, focus: str, day: int,
+                                      semaphore: Optional[asyncio.Semaphore] = None) -> DailyWorkout:
         try:
-            # Get AI-generated workout content
-            prompt = self._create_workout_prompt(profile, focus, day)
-            workout_content = await self._get_ai_response(prompt)
-            
-            # Search for demonstration videos
-            warm_up_video = await self._search_tavily_video(f"{focus} warm up exercises")
-            main_video = await self._search_tavily_video(f"{focus} {profile.primary_goal} workout")
-            cool_down_video = await self._search_tavily_video(f"{focus} cool down stretches")
+            if self.plan_mode == "local":
+                return await self._local_daily_workout(profile, focus, day)
+
+            semaphore = semaphore or asyncio.Semaphore(self.max_concurrency)
+            if self.plan_mode == "catalog":
+                workout_source = self._get_catalog_workout(profile, focus, day)
+            else:
+                workout_source = self._get_llm_workout(profile, focus, day)
             
-            # Parse the workout data
-            workout_data = self._parse_workout_response(workout_content)
+            queries = video_search_queries(focus, profile.primary_goal)
             
-            return DailyWorkout(
-                day=f"Day {day}",
-                focus=focus,
-                warm_up=WorkoutSegment(
-                    motto="Keep moving—you've got this.",
-                    exercises=workout_data["warm_up"],
-                    duration="10-15 minutes",
-                    video_url=warm_up_video
-                ),
-                main_routine=WorkoutSegment(
-                    motto="You're doing awesome—keep the energy up.",
-                    exercises=workout_data["main_routine"],
-                    duration="30-45 minutes",
-                    video_url=main_video
-                ),
-                cool_down=WorkoutSegment(
-                    motto="Breathe in peace—breathe out strength.",
-                    exercises=workout_data["cool_down"],
-                    duration="10-15 minutes",
-                    video_url=cool_down_video
-                )
+            # Get AI-generated workout content and search for demonstration videos concurrently
+            workout_data, warm_up_video, main_video, cool_down_video = await asyncio.gather(
+                self._run_limited(semaphore, workout_source),
+                self._run_limited(semaphore, self._search_tavily_video(queries["warm_up"])),
+                self._run_limited(semaphore, self._search_tavily_video(queries["main_routine"])),
+                self._run_limited(semaphore, self._search_tavily_video(queries["cool_down"]))
             )
+            
+            with timed("workout_planner.build"):
+                return self._build_daily_workout(day, focus, workout_data, warm_up_video, main_video, cool_down_video)
         except Exception as e:
             logger.error(f"Error generating daily workout: {str(e)}")
             raise
 
-    def _create_workout_prompt(self, profile: UserProfileRequest, focus: str, day: int) -> str:
-        return f"""Create a detailed {focus} workout for Day {day} considering:
-        User Profile:
-        - Primary Goal: {profile.primary_goal}
-        - Weight: {profile.weight_kg}kg
-        - Height: {profile.height_cm}cm
-        - Diet: {profile.eating_style}
-        - Meat Eater: {profile.is_meat_eater}
-        - Lactose Intolerant: {profile.is_lactose_intolerant}
-        - Allergies: {', '.join(profile.allergies)}
-        - Caffeine: {profile.caffeine_consumption}
-        - Sugar: {profile.sugar_consumption}
+    def _build_daily_workout(self, day: int, focus: str, workout_data: dict, warm_up_video: Optional[str],
+                             main_video: Optional[str], cool_down_video: Optional[str]) -> DailyWorkout:
+        return DailyWorkout(
+            day=f"Day {day}",
+            focus=focus,
+            warm_up=WorkoutSegment(
+                motto="Keep moving—you've got this.",
+                exercises=workout_data["warm_up"],
+                duration="10-15 minutes",
+                video_url=warm_up_video
+            ),
+            main_routine=WorkoutSegment(
+                motto="You're doing awesome—keep the energy up.",
+                exercises=workout_data["main_routine"],
+                duration="30-45 minutes",
+                video_url=main_video
+            ),
+            cool_down=WorkoutSegment(
+                motto="Breathe in peace—breathe out strength.",
+                exercises=workout_data["cool_down"],
+                duration="10-15 minutes",
+                video_url=cool_down_video
+            )
+        )
 
-        Provide the workout plan in this format:
-        
-        Warm-up:
-        - [Exercise Name] | [Instructions]
-        - [Exercise Name] | [Instructions]
-        
-        Main Routine:
-        - [Exercise Name] | Sets: [X] | Reps: [X] | Rest: [Xs] | [Instructions]
-        - [Exercise Name] | Sets: [X] | Reps: [X] | Rest: [Xs] | [Instructions]
-        
-        Cool-down:
-        - [Exercise Name] | [Instructions]
-        - [Exercise Name] | [Instructions]
-        """
+    async def _get_llm_workout(self, profile: UserProfileRequest, focus: str, day: int) -> dict:
+        """Let the LLM write every exercise and parse its reply into segments"""
+        content = await self._get_ai_response(self._create_workout_prompt(profile, focus, day))
+        with timed("workout_planner.parse"):
+            return self._parse_workout_response(content)
 
-    def _parse_workout_response(self, content: str) -> dict:
-        """Parse the AI-generated workout content into structured segments"""
-        segments = {
-            "warm_up": [],
-            "main_routine": [],
-            "cool_down": []
+    def _catalog_candidates(self, profile: UserProfileRequest, focus: str) -> Dict[str, list]:
+        intensity = self._create_workout_structure(profile)["intensity"]
+        return {
+            segment: self.catalog.candidates(
+                focus, segment, equipment=profile.equipment, limitations=profile.limitations, intensity=intensity
+            )
+            for segment in SEGMENTS
         }
-        current_section = None
-        
-        try:
-            lines = [line.strip() for line in content.split('\n') if line.strip()]
-            
-            for line in lines:
-                lower_line = line.lower()
-                
-                # Detect section headers
-                if "warm-up:" in lower_line or "warmup:" in lower_line:
-                    current_section = "warm_up"
-                    continue
-                elif "main routine:" in lower_line or "main workout:" in lower_line:
-                    current_section = "main_routine"
-                    continue
-                elif "cool-down:" in lower_line or "cooldown:" in lower_line:
-                    current_section = "cool_down"
-                    continue
-                
-                # Skip lines that don't start with bullet point or dash
-                if not line.lstrip().startswith(('-', '•', '*')):
-                    continue
-                
-                # Only process if we're in a valid section
-                if current_section:
-                    try:
-                        # Split on pipe and clean up each part
-                        parts = [p.strip() for p in line.lstrip('- •*').split('|')]
-                        
-                        # Extract exercise name (required)
-                        name = parts[0].strip() if parts else "Unnamed Exercise"
-                        
-                        if current_section == "main_routine":
-                            # Parse main routine with more detailed info
-                            exercise_data = {
-                                'sets': '3',  # Default values
-                                'reps': '10-12',
-                                'rest': '60s',
-                                'instructions': ''
-                            }
-                            
-                            # Process each part looking for specific keywords
-                            for part in parts[1:]:
-                                part = part.lower().strip()
-                                if 'sets:' in part:
-                                    sets_str = ''.join(filter(str.isdigit, part))
-                                    exercise_data['sets'] = sets_str if sets_str else '3'
-                                elif 'reps:' in part:
-                                    exercise_data['reps'] = part.split(':')[-1].strip()
-                                elif 'rest:' in part:
-                                    exercise_data['rest'] = part.split(':')[-1].strip()
-                                else:
-                                    exercise_data['instructions'] = part
-                            
-                            # Create exercise with extracted or default values
-                            exercise = Exercise(
-                                name=name,
-                                sets=int(exercise_data['sets']),
-                                reps=exercise_data['reps'],
-                                rest=exercise_data['rest'],
-                                instructions=exercise_data['instructions']
-                            )
-                        else:
-                            # Simpler parsing for warm-up and cool-down
-                            instructions = parts[1].strip() if len(parts) > 1 else "Perform at a comfortable pace"
-                            exercise = Exercise(
-                                name=name,
-                                sets=1,
-                                reps="As needed",
-                                rest="None",
-                                instructions=instructions
-                            )
-                        
-                        segments[current_section].append(exercise)
-                    except Exception as e:
-                        logger.warning(f"Error parsing exercise line '{line}': {str(e)}")
-                        # Continue with next line instead of failing completely
-                        continue
-            
-            # Ensure each section has at least one exercise
-            for section in segments:
-                if not segments[section]:
-                    segments[section].append(Exercise(
-                        name=f"Basic {section.replace('_', ' ').title()}",
-                        sets=1,
-                        reps="As needed",
-                        rest="None",
-                        instructions="Perform at a comfortable pace"
-                    ))
-            
-            return segments
-            
-        except Exception as e:
-            logger.error(f"Error parsing workout response: {str(e)}")
-            # Return a minimal valid structure rather than failing
-            return {
-                section: [Exercise(
-                    name=f"Basic {section.replace('_', ' ').title()}",
-                    sets=1,
-                    reps="As needed",
-                    rest="None",
-                    instructions="Perform at a comfortable pace"
-                )] for section in ["warm_up", "main_routine", "cool_down"]
-            }
\ No newline at end of file
+
+    def _catalog_segments(self, profile: UserProfileRequest, chosen: Dict[str, list]) -> dict:
+        """Turn chosen catalog exercises into response exercises, using the goal's rest period for the main routine"""
+        rest = self._create_workout_structure(profile)["rest"]
+        return {
+            segment: [exercise.to_exercise(rest if segment == "main_routine" else None) for exercise in exercises]
+            for segment, exercises in chosen.items()
+        }
+
+    async def _local_daily_workout(self, profile: UserProfileRequest, focus: str, day: int) -> DailyWorkout:
+        """A day built from the catalog alone; videos come from the cache when they are already known"""
+        candidates = self._catalog_candidates(profile, focus)
+        workout_data = self._catalog_segments(
+            profile, {segment: options[:SEGMENT_SIZES[segment]] for segment, options in candidates.items()}
+        )
+        queries = video_search_queries(focus, profile.primary_goal)
+        videos = await asyncio.gather(*(
+            self.video_cache.aget(queries[segment]) for segment in ("warm_up", "main_routine", "cool_down")
+        ))
+        return self._build_daily_workout(day, focus, workout_data, *(video or None for video in videos))
+
+    async def _get_catalog_workout(self, profile: UserProfileRequest, focus: str, day: int) -> dict:
+        """Have the LLM pick catalog IDs only, which needs a few dozen completion tokens instead of a full plan"""
+        candidates = self._catalog_candidates(profile, focus)
+        prompt = get_prompt("workout_planner.catalog").render(
+            focus=focus,
+            day=day,
+            intensity=self._create_workout_structure(profile)["intensity"],
+            **{f"{segment}_options": "; ".join(f"{e.id}={e.name}" for e in options) for segment, options in candidates.items()},
+            **{f"{segment}_count": SEGMENT_SIZES[segment] for segment in SEGMENTS},
+            **profile_values(profile)
+        )
+        content = await self._get_ai_response(prompt, call="workout_planner.catalog")
+        with timed("workout_planner.parse"):
+            return self._catalog_segments(profile, self._parse_catalog_response(content, candidates))
+
+    def _parse_catalog_response(self, content: str, candidates: Dict[str, list]) -> Dict[str, list]:
+        """Keep only IDs that were offered for their segment; a segment left empty falls back to the catalog's own pick"""
+        picked: Dict[str, List[str]] = {}
+        for label, ids in _CATALOG_LINE.findall(content):
+            segment = SEGMENTS[["w", "m", "c"].index(label[0].lower())]
+            picked.setdefault(segment, []).extend(_CATALOG_ID.findall(ids.upper()))
+
+        chosen = {}
+        for segment, options in candidates.items():
+            offered = {exercise.id: exercise for exercise in options}
+            exercises = []
+            for exercise_id in picked.get(segment, []):
+                if exercise_id in offered and offered[exercise_id] not in exercises:
+                    exercises.append(offered[exercise_id])
+            if not exercises:
+                logger.warning(f"No usable catalog IDs for {segment}, using the catalog's default selection")
+                exercises = options[:SEGMENT_SIZES[segment]]
+            chosen[segment] = exercises[:SEGMENT_SIZES[segment] * 2]
+        return chosen
+
+    def _create_workout_prompt(self, profile: UserProfileRequest, focus: str, day: int) -> str:
+        return get_prompt("workout_planner.daily").render(focus=focus, day=day, **profile_values(profile))
+
+    def _parse_workout_response(self, content: str) -> dict:
+        """Parse the AI-generated workout content into exercise fields per segment"""
+        return parse_workout_response(content)
@@ -1,20 +1,216 @@
-from fastapi import APIRouter, HTTPException
-from com.mhire.app.services.workout_planner.workout_planner import WorkoutPlanner
+import hashlib
+import json
+import logging
+import time
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Header, Request, Response
+from fastapi.responses import StreamingResponse
+from com.mhire.app.cache.cache import create_response_cache, profile_cache_key, should_bypass_cache
+from com.mhire.app.cache.single_flight import create_single_flight
+from com.mhire.app.config.config import Config
+from com.mhire.app.jobs.jobs import IdempotencyConflictError, Job, JobManager, QueueFullError
+from com.mhire.app.resilience.deadline import deadline_scope, request_deadline
+from com.mhire.app.services.workout_planner.workout_planner import PLAN_DAYS, WorkoutPlanner
 from com.mhire.app.services.workout_planner.workout_planner_schema import UserProfileRequest, WorkoutResponse
+from com.mhire.app.services.workout_planner.workout_video_cache import get_video_cache
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def get_workout_planner(request: Request) -> WorkoutPlanner:
+    """Workout Planner built once in the app lifespan on the shared client registry"""
+    return request.app.state.workout_planner
+
+def get_workout_plan_jobs(request: Request) -> JobManager:
+    """Workout plan job pool started in the app lifespan"""
+    return request.app.state.workout_plan_jobs
 
 router = APIRouter(
     prefix="/workout-planner",
     tags=["workout-planner"]
 )
 
+workout_plan_cache = create_response_cache("workout_plans")
+workout_plan_flights = create_single_flight("workout_plans")
+
 @router.post("/generate", response_model=WorkoutResponse)
-async def generate_workout_plan(request: UserProfileRequest):
+async def generate_workout_plan(request: UserProfileRequest, response: Response, cache_control: Optional[str] = Header(None),
+                                x_request_timeout: Optional[float] = Header(None, gt=0),
+                                planner: WorkoutPlanner = Depends(get_workout_planner)):
     """
-    Generate a personalized workout plan based on user parameters
+    Generate a personalized workout plan based on user parameters.
+    Plans for equivalent profiles are served from cache unless `Cache-Control: no-cache` is sent,
+    and concurrent requests for an equivalent profile share one generation.
+    Days that would not be ready by WORKOUT_PLAN_DEADLINE, or the `X-Request-Timeout` header in seconds if it is
+    shorter, are built from the exercise catalog and the plan is returned with `degraded: true`.
     """
     try:
-        planner = WorkoutPlanner()
-        plan = await planner.generate_workout_plan(request)
+        cache_key = profile_cache_key(request)
+        if not should_bypass_cache(cache_control):
+            cached_plan = await workout_plan_cache.aget(cache_key)
+            if cached_plan is not None:
+                response.headers["X-Cache"] = "HIT"
+                return WorkoutResponse.model_validate(cached_plan)
+
+        async def generate() -> WorkoutResponse:
+            plan = await planner.generate_workout_plan(request)
+            # Failed and degraded generations are returned but never cached
+            if plan.success and not plan.degraded:
+                await workout_plan_cache.aset(cache_key, plan.model_dump(mode="json"))
+            return plan
+
+        # Callers that join a generation already in flight share its deadline
+        with deadline_scope(request_deadline(x_request_timeout, Config().workout_plan_deadline)):
+            plan, shared = await workout_plan_flights.do(cache_key, generate)
+        response.headers["X-Cache"] = "MISS"
+        response.headers["X-Coalesced"] = "true" if shared else "false"
+        response.headers["X-Degraded"] = "true" if plan.degraded else "false"
         return plan
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.post("/generate/local", response_model=WorkoutResponse)
+async def generate_local_workout_plan(request: UserProfileRequest, planner: WorkoutPlanner = Depends(get_workout_planner)):
+    """
+    Build a workout plan from the bundled exercise catalog without calling the LLM or Tavily.
+    Demonstration videos are included only when they are already in the video cache.
+    """
+    return await planner.generate_local_workout_plan(request)
+
+@router.post("/generate/stream")
+async def stream_workout_plan(request: UserProfileRequest, cache_control: Optional[str] = Header(None),
+                              planner: WorkoutPlanner = Depends(get_workout_planner)):
+    """
+    Stream a personalized workout plan as newline-delimited JSON events.
+    Each day is sent as {"type": "day", "index": ..., "workout": ...} as soon as it is ready,
+    in completion order, followed by one {"type": "summary", ...} event.
+    """
+    cache_key = profile_cache_key(request)
+    cached_plan = None if should_bypass_cache(cache_control) else await workout_plan_cache.aget(cache_key)
+
+    async def event_stream():
+        start = time.perf_counter()
+        if cached_plan is not None:
+            for index, workout in enumerate(cached_plan["workout_plan"]):
+                yield json.dumps({"type": "day", "index": index, "workout": workout}) + "\n"
+            yield json.dumps({
+                "type": "summary", "success": True, "days_completed": len(cached_plan["workout_plan"]),
+                "errors": [], "cached": True, "total_ms": (time.perf_counter() - start) * 1000
+            }) + "\n"
+            return
+
+        daily_workouts = {}
+        errors = []
+        async for index, result in planner.stream_workout_plan(request):
+            if isinstance(result, Exception):
+                logger.error(f"Error generating day {index + 1} of streamed workout plan: {str(result)}")
+                errors.append({"index": index, "error": str(result)})
+                yield json.dumps({"type": "day_error", "index": index, "error": str(result)}) + "\n"
+            else:
+                daily_workouts[index] = result
+                yield json.dumps({"type": "day", "index": index, "workout": result.model_dump(mode="json")}) + "\n"
+
+        if not errors:
+            plan = WorkoutResponse(success=True, workout_plan=[daily_workouts[i] for i in sorted(daily_workouts)])
+            await workout_plan_cache.aset(cache_key, plan.model_dump(mode="json"))
+        yield json.dumps({
+            "type": "summary", "success": not errors, "days_completed": len(daily_workouts),
+            "errors": errors, "cached": False, "total_ms": (time.perf_counter() - start) * 1000
+        }) + "\n"
+
+    return StreamingResponse(event_stream(), media_type="application/x-ndjson")
+
+@router.get("/video-cache/stats")
+async def video_cache_stats():
+    """
+    Hit/miss counters and size of the exercise video URL cache
+    """
+    return get_video_cache().stats()
+
+@router.get("/cache/stats")
+async def workout_plan_cache_stats():
+    """
+    Hit/miss counters and size of the workout plan response cache
+    """
+    return workout_plan_cache.stats()
+
+@router.post("/jobs", status_code=202)
+async def submit_workout_plan_job(request: UserProfileRequest, response: Response,
+                                  cache_control: Optional[str] = Header(None),
+                                  idempotency_key: Optional[str] = Header(None, max_length=128),
+                                  planner: WorkoutPlanner = Depends(get_workout_planner),
+                                  jobs: JobManager = Depends(get_workout_plan_jobs)):
+    """
+    Queue workout plan generation and return the job straight away; poll GET /workout-planner/jobs/{job_id}.
+    Days show up in partial_results as they finish. Resubmitting with the same `Idempotency-Key` header
+    returns the original job instead of starting another generation.
+    """
+    cache_key = profile_cache_key(request)
+    bypass_cache = should_bypass_cache(cache_control)
+
+    async def run(job: Job) -> dict:
+        cached_plan = None if bypass_cache else await workout_plan_cache.aget(cache_key)
+        if cached_plan is not None:
+            job.set_progress(len(cached_plan["workout_plan"]), len(cached_plan["workout_plan"]))
+            return cached_plan
+
+        job.set_progress(0, PLAN_DAYS)
+        daily_workouts = {}
+        errors = []
+        async for index, result in planner.stream_workout_plan(request):
+            if isinstance(result, Exception):
+                logger.error(f"Error generating day {index + 1} of workout plan job {job.job_id}: {str(result)}")
+                errors.append(f"Day {index + 1}: {str(result)}")
+            else:
+                daily_workouts[index] = result
+                job.add_partial({"index": index, "workout": result.model_dump(mode="json")})
+        # The finished days stay available in partial_results
+        if errors:
+            raise RuntimeError("; ".join(errors))
+
+        plan = WorkoutResponse(success=True, workout_plan=[daily_workouts[i] for i in sorted(daily_workouts)])
+        plan_data = plan.model_dump(mode="json")
+        await workout_plan_cache.aset(cache_key, plan_data)
+        return plan_data
+
+    try:
+        job = jobs.submit(run, hashlib.sha256(request.model_dump_json().encode("utf-8")).hexdigest(), idempotency_key)
+    except IdempotencyConflictError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    response.headers["Location"] = f"{router.prefix}/jobs/{job.job_id}"
+    return job.view()
+
+@router.get("/jobs/stats")
+async def workout_plan_job_stats(jobs: JobManager = Depends(get_workout_plan_jobs)):
+    """
+    Worker count, queue depth and jobs per status for workout plan jobs
+    """
+    return jobs.stats()
+
+@router.get("/jobs/{job_id}")
+async def get_workout_plan_job(job_id: str, wait: float = 0, version: int = -1,
+                               jobs: JobManager = Depends(get_workout_plan_jobs)):
+    """
+    Status, progress, finished days and, once done, the plan of a workout plan job.
+    With `wait=N` the request long-polls: it returns as soon as the job changes past `version`
+    (send the last version seen) or finishes, or after N seconds (at most JOB_MAX_WAIT).
+    """
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if wait > 0:
+        await job.wait(min(wait, Config().job_max_wait), version)
+    return job.view()
+
+@router.delete("/jobs/{job_id}")
+async def cancel_workout_plan_job(job_id: str, jobs: JobManager = Depends(get_workout_plan_jobs)):
+    """
+    Cancel a queued or running workout plan job
+    """
+    job = jobs.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.view()
\ No newline at end of file
@@ -21,6 +21,23 @@ class ConsumptionFrequency(str, Enum):
     REGULARLY = "Regularly"
     CRAVINGS = "Cravings"
 
+class Equipment(str, Enum):
+    DUMBBELLS = "Dumbbells"
+    BARBELL = "Barbell"
+    KETTLEBELL = "Kettlebell"
+    BENCH = "Bench"
+    RESISTANCE_BAND = "Resistance band"
+    PULL_UP_BAR = "Pull-up bar"
+    MACHINE = "Machine"
+    JUMP_ROPE = "Jump rope"
+
+class Limitation(str, Enum):
+    KNEE = "Knee"
+    LOWER_BACK = "Lower back"
+    SHOULDER = "Shoulder"
+    WRIST = "Wrist"
+    HIGH_IMPACT = "High impact"
+
 class UserProfileRequest(BaseModel):
     primary_goal: PrimaryGoal
     weight_kg: float
@@ -31,6 +48,9 @@ class UserProfileRequest(BaseModel):
     eating_style: EatingStyle
     caffeine_consumption: ConsumptionFrequency
     sugar_consumption: ConsumptionFrequency
+    # Used to filter the exercise catalog; no equipment list means a fully equipped gym
+    equipment: Optional[List[Equipment]] = None
+    limitations: List[Limitation] = []
 
 # Workout specific response models
 class Exercise(BaseModel):
@@ -56,4 +76,6 @@ class DailyWorkout(BaseModel):
 class WorkoutResponse(BaseModel):
     success: bool = True
     workout_plan: List[DailyWorkout] = []  # Changed to required field with default empty list
-    error: Optional[str] = None
\ No newline at end of file
+    error: Optional[str] = None
+    # True when some days came from the exercise catalog because generation would have missed the deadline
+    degraded: bool = False
\ No newline at end of file
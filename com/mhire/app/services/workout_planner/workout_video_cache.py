@@ -0,0 +1,82 @@
+"""
+Persistent cache of exercise demonstration video URLs.
+
+The Tavily queries issued by WorkoutPlanner come from a small fixed space
+(splits x primary goals x segments), so results are kept in a SQLite file
+that every worker process shares. Pre-warm it for all combinations with:
+
+    python -m com.mhire.app.services.workout_planner.workout_video_cache --prewarm
+"""
+import argparse
+import asyncio
+import logging
+from typing import Optional
+
+from com.mhire.app.cache.cache import SQLiteCache
+from com.mhire.app.clients.clients import close_client_registry
+from com.mhire.app.config.config import Config
+from com.mhire.app.metrics.metrics import register_cache
+
+# Configure logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+_video_cache: Optional[SQLiteCache] = None
+
+
+def get_video_cache() -> SQLiteCache:
+    """Return the process-wide video URL cache"""
+    global _video_cache
+    if _video_cache is None:
+        config = Config()
+        _video_cache = SQLiteCache(
+            path=config.video_cache_path,
+            table="video_urls",
+            max_entries=config.video_cache_max_entries,
+            default_ttl=config.video_cache_ttl
+        )
+        register_cache("video_urls", lambda: (_video_cache.hits, _video_cache.misses))
+    return _video_cache
+
+
+async def prewarm(concurrency: int = 4) -> dict:
+    """Search and cache a video for every split/goal/segment combination that is not cached yet"""
+    from com.mhire.app.services.workout_planner.workout_planner import (
+        WORKOUT_STRUCTURES, WorkoutPlanner, video_search_queries
+    )
+
+    planner = WorkoutPlanner()
+    queries = {
+        query
+        for goal, structure in WORKOUT_STRUCTURES.items()
+        for focus in structure["splits"]
+        for query in video_search_queries(focus, goal).values()
+    }
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def warm(query: str) -> bool:
+        async with semaphore:
+            return await planner._search_tavily_video(query) is not None
+
+    results = await asyncio.gather(*(warm(query) for query in sorted(queries)))
+    summary = {"queries": len(queries), "cached": sum(results), "missing": len(results) - sum(results)}
+    logger.info(f"Video cache pre-warm finished: {summary}")
+    return summary
+
+
+async def _run_prewarm(concurrency: int) -> dict:
+    try:
+        return await prewarm(concurrency)
+    finally:
+        await close_client_registry()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage the exercise video URL cache")
+    parser.add_argument("--prewarm", action="store_true", help="Look up every split/goal combination")
+    parser.add_argument("--concurrency", type=int, default=4, help="Parallel Tavily searches while pre-warming")
+    args = parser.parse_args()
+
+    if args.prewarm:
+        print(asyncio.run(_run_prewarm(args.concurrency)))
+    print(get_video_cache().stats())